@@ -19,6 +19,7 @@ from ui_components import (
     render_crawl_grid,
     render_headings_table,
     render_suggestions_board,
+    render_topic_gap,
     legend_block,
     toast_success,
 )
@@ -135,6 +136,10 @@ def init_state():
         st.session_state.crawl_result = None
     if "headings_detail" not in st.session_state:
         st.session_state.headings_detail = None
+    if "competitors" not in st.session_state:
+        st.session_state.competitors = []   # URLs para el topic gap (opcional)
+    if "topic_gap_result" not in st.session_state:
+        st.session_state.topic_gap_result = None
     if "suggestions" not in st.session_state:
         st.session_state.suggestions = []
     if "plan_df" not in st.session_state:
@@ -158,11 +163,13 @@ def init_state():
 # =======================================================
 # Auditorías
 # =======================================================
-from utils import normalize_url
+import config
+from utils import normalize_url, fetch_snapshot
 from audit_meta import audit_metadata, audit_headings_detail
 from audit_social import audit_social
 from audit_perf import audit_performance
 from audit_crawl import audit_crawl_indexability
+from topic_gap import audit_topic_gap
 
 def _safe_audit_call(name: str, fn, url: str, **kwargs):
     """
@@ -189,15 +196,26 @@ def _safe_audit_call(name: str, fn, url: str, **kwargs):
             }]
         }
 
-def audit_all(url: str, keywords: list[str] | None = None):
-    meta = _safe_audit_call("Metadatos", audit_metadata, url, keywords=keywords)
-    social = _safe_audit_call("Social", audit_social, url, keywords=keywords)
-    perf = _safe_audit_call("WPO", audit_performance, url)
-    crawl = _safe_audit_call("Indexabilidad", audit_crawl_indexability, url)
-    headings = _safe_audit_call("Encabezados", audit_headings_detail, url)
+def audit_all(url: str, keywords: list[str] | None = None, competitors: list[str] | None = None):
+    # Una sola descarga + un solo parseo compartidos por todas las auditorías
+    snapshot = fetch_snapshot(url)
+    meta = _safe_audit_call("Metadatos", audit_metadata, url, keywords=keywords, snapshot=snapshot)
+    social = _safe_audit_call("Social", audit_social, url, keywords=keywords, snapshot=snapshot)
+    perf = _safe_audit_call(
+        "WPO", audit_performance, url, snapshot=snapshot,
+        ttfb_samples=config.PERF_TTFB_SAMPLES,
+        cold_sample=config.PERF_TTFB_COLD_SAMPLE,
+        sample_concurrency=config.PERF_SAMPLE_CONCURRENCY,
+        page_weight=config.ENABLE_PAGE_WEIGHT,
+    )
+    crawl = _safe_audit_call("Indexabilidad", audit_crawl_indexability, url, snapshot=snapshot)
+    headings = _safe_audit_call("Encabezados", audit_headings_detail, url, snapshot=snapshot)
+    topic_gap = None
+    if config.ENABLE_TOPIC_GAP and competitors:
+        topic_gap = _safe_audit_call("Contenido", audit_topic_gap, url, competitors=competitors, snapshot=snapshot)
 
     suggestions = []
-    for block in (meta, social, perf, crawl):
+    for block in (meta, social, perf, crawl, topic_gap):
         if isinstance(block, dict):
             suggestions.extend(block.get("suggestions", []))
 
@@ -206,6 +224,7 @@ def audit_all(url: str, keywords: list[str] | None = None):
     st.session_state.perf_result = perf
     st.session_state.crawl_result = crawl
     st.session_state.headings_detail = headings
+    st.session_state.topic_gap_result = topic_gap
     st.session_state.suggestions = suggestions
 
 # =======================================================
@@ -305,6 +324,11 @@ def _parse_keywords(raw: str) -> list[str]:
             break
     return kws
 
+def _parse_competitors(raw: str) -> list[str]:
+    # una URL por línea (o separadas por coma); se normalizan y deduplican
+    urls = [normalize_url(p.strip()) for p in re_split(r"[,\n;\s]", raw or "") if p.strip()]
+    return list(dict.fromkeys(u for u in urls if u))
+
 def add_task_to_plan(task):
     df = ensure_plan_schema(st.session_state.plan_df)
     row = {
@@ -347,13 +371,18 @@ def render_auditoria():
         url = st.text_input("URL a auditar", st.session_state.url, placeholder="https://www.ejemplo.com/")
     with col_kw:
         raw_kws = st.text_input("Keywords (opcional, máx. 5, separadas por coma)", ", ".join(st.session_state.keywords))
+    raw_comp = ""
+    if config.ENABLE_TOPIC_GAP:
+        with st.expander("Competidores para topic gap (opcional)"):
+            raw_comp = st.text_area("URLs de competidores, una por línea", "\n".join(st.session_state.competitors))
     with col_btn:
         if st.button("Auditar", use_container_width=True):
             if url.strip():
                 st.session_state.url = normalize_url(url)
                 st.session_state.keywords = _parse_keywords(raw_kws)
+                st.session_state.competitors = _parse_competitors(raw_comp)
                 with st.spinner("Auditando..."):
-                    audit_all(st.session_state.url, st.session_state.keywords)
+                    audit_all(st.session_state.url, st.session_state.keywords, st.session_state.competitors)
             else:
                 st.warning("Introduce una URL válida.")
 
@@ -410,6 +439,11 @@ def render_auditoria():
     st.subheader("Metadatos y encabezados (detalle)")
     render_headings_table(st.session_state.headings_detail)
 
+    # --- Topic gap (si hay competidores)
+    if st.session_state.topic_gap_result:
+        st.subheader("Topic gap frente a competidores")
+        render_topic_gap(st.session_state.topic_gap_result)
+
     # --- Sugerencias
     st.subheader("Sugerencias (agrega al plan con un clic)")
     render_suggestions_board(st.session_state.suggestions, on_add=add_task_to_plan)
@@ -0,0 +1,149 @@
+# opun_seo_lite/async_fetch.py
+"""
+Backend asyncio (aiohttp) equivalente a utils.fetch_url para lotes grandes:
+miles de peticiones en vuelo desde un solo proceso, sin un hilo por página.
+Mismo contrato: (response, history, ttfb_ms), donde `response` es un
+requests.Response construido a partir de la respuesta de aiohttp, de modo que
+get_html_soup, header_value y las auditorías funcionan sin cambios.
+Cada intento pasa por el mismo limitador por host que la ruta síncrona
+(ratelimit.limited_async); la caché HTTP (http_cache) no se usa aquí.
+"""
+import asyncio
+import ssl
+import time
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import aiohttp
+import certifi
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import ratelimit
+from utils import (
+    DEFAULT_HEADERS,
+    MAX_DOWNLOAD,
+    REQUEST_TIMEOUT,
+    STREAM_CHUNK,
+    is_non_html_type,
+    normalize_url,
+    _swap_scheme,
+)
+
+# Mismos códigos y backoff que el Retry de utils._build_session
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.6
+
+# keep-alive: el conector reutiliza conexiones entre peticiones al mismo host
+ASYNC_HEADERS = {k: v for k, v in DEFAULT_HEADERS.items() if k.lower() != "connection"}
+
+_ssl_verified = ssl.create_default_context(cafile=certifi.where())
+
+
+async def _read_capped(aresp: aiohttp.ClientResponse, max_bytes: int):
+    """Igual que utils._read_capped: lectura en streaming con tope y corte temprano si no es HTML."""
+    if is_non_html_type(aresp.headers.get("Content-Type")):
+        return b"", False, True
+    buf = bytearray()
+    async for chunk in aresp.content.iter_chunked(STREAM_CHUNK):
+        buf += chunk
+        if len(buf) >= max_bytes:
+            truncated = len(buf) > max_bytes or not aresp.content.at_eof()
+            return bytes(buf[:max_bytes]), truncated, False
+    return bytes(buf), False, False
+
+
+def _to_requests_response(aresp: aiohttp.ClientResponse, body: bytes, elapsed: float) -> requests.Response:
+    r = requests.Response()
+    r.status_code = aresp.status
+    r.reason = aresp.reason
+    r.headers = CaseInsensitiveDict(aresp.headers)
+    r.url = str(aresp.url)
+    r._content = body
+    r._content_consumed = True
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.elapsed = timedelta(seconds=elapsed)
+    return r
+
+
+async def _get_once(session: aiohttp.ClientSession, url: str, verify: bool, max_bytes: int):
+    """Un intento con reintentos sobre RETRY_STATUS (respeta Retry-After numérico)."""
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    for attempt in range(RETRY_TOTAL + 1):
+        # mismo limitador por host que la ruta síncrona (ratelimit): cada intento ocupa un hueco
+        async with ratelimit.limited_async(url) as report:
+            start = time.perf_counter()
+            async with session.get(
+                url,
+                allow_redirects=True,
+                timeout=timeout,
+                ssl=_ssl_verified if verify else False,
+            ) as aresp:
+                ttfb = time.perf_counter() - start
+                retry_after = aresp.headers.get("Retry-After", "")
+                report(status=aresp.status, ttfb_ms=int(ttfb * 1000), retry_after=retry_after)
+                if not (aresp.status in RETRY_STATUS and attempt < RETRY_TOTAL):
+                    body, truncated, skipped = await _read_capped(aresp, max_bytes)
+                    resp = _to_requests_response(aresp, body, ttfb)
+                    resp.truncated, resp.body_skipped = truncated, skipped
+                    history = [(h.status, str(h.url)) for h in aresp.history]
+                    return resp, history, int(ttfb * 1000)
+        delay = float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * (2 ** attempt)
+        await asyncio.sleep(delay)
+
+
+async def fetch_url_async(url: str, session: Optional[aiohttp.ClientSession] = None, max_bytes: int = MAX_DOWNLOAD):
+    """
+    Versión asyncio de utils.fetch_url con los mismos fallbacks:
+      1) https verify=True
+      2) http  verify=True
+      3) https verify=False  (último recurso)
+    Devuelve: (response, history, ttfb_ms). Lanza RuntimeError si todo falla.
+    """
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(headers=ASYNC_HEADERS)
+
+    base = normalize_url(url)
+    attempts = [
+        (base, True),
+        (_swap_scheme(base, "http"), True),
+        (base, False),
+    ]
+    last_exc = None
+    try:
+        for try_url, verify_flag in attempts:
+            try:
+                return await _get_once(session, try_url, verify_flag, max_bytes)
+            except Exception as e:
+                last_exc = e
+    finally:
+        if own_session:
+            await session.close()
+
+    raise RuntimeError(f"Error al solicitar la URL (con fallbacks): {last_exc!r}")
+
+
+async def fetch_many_async(urls: Iterable[str], concurrency: int = 200, per_host: int = 0) -> List[Tuple[str, object]]:
+    """
+    Descarga un lote con como máximo `concurrency` peticiones en vuelo
+    (y `per_host` por host si > 0). Devuelve [(url, (resp, history, ttfb_ms) | Exception)]
+    en el mismo orden de entrada.
+    """
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    connector = aiohttp.TCPConnector(limit=max(1, int(concurrency)), limit_per_host=max(0, int(per_host)))
+    async with aiohttp.ClientSession(headers=ASYNC_HEADERS, connector=connector) as session:
+        async def _one(u: str):
+            async with sem:
+                try:
+                    return u, await fetch_url_async(u, session=session)
+                except Exception as e:
+                    return u, e
+        return await asyncio.gather(*(_one(u) for u in urls))
+
+
+def fetch_many(urls: Iterable[str], concurrency: int = 200, per_host: int = 0) -> List[Tuple[str, object]]:
+    """Envoltorio síncrono de fetch_many_async (para CLI/scripts sin event loop propio)."""
+    return asyncio.run(fetch_many_async(list(urls), concurrency=concurrency, per_host=per_host))
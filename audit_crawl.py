@@ -1,10 +1,12 @@
 # opun_seo_lite/audit_crawl.py
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import re
 
+import config
+from sitemap import sitemap_summary
 from utils import (
-    fetch_url,
-    get_html_soup,
+    PageSnapshot,
+    ensure_snapshot,
     header_value,
     guess_sitemap_and_robots,
 )
@@ -27,13 +29,14 @@ def _chain_status(chain: List[Tuple[int, str]], final_status: int) -> str:
     return "red"
 
 
-def audit_crawl_indexability(url: str) -> Dict:
+def audit_crawl_indexability(url: str, snapshot: Optional[PageSnapshot] = None) -> Dict:
     """
     Rastreo e indexabilidad:
     - Cadena de redirects + status final
     - Cabeceras clave
     - x-robots-tag
     - robots.txt y sitemap
+    Si se pasa `snapshot`, reutiliza esa descarga en lugar de pedir la URL otra vez.
     """
     # Estructura base para no romper UI en caso de error
     base: Dict = {
@@ -45,13 +48,15 @@ def audit_crawl_indexability(url: str) -> Dict:
         "chain_status": "red",
         "headers": [{"key": k, "value": ""} for k in _HEADER_KEYS],
         "x_robots_tag": "",
-        "robots_info": {"declared": "", "ok": False, "final_url": "", "status": None},
-        "sitemap_info": {"declared": "", "ok": False, "final_url": "", "status": None},
+        "robots_info": {"declared": "", "ok": False, "final_url": "", "status": None,
+                        "allowed": None, "rule": "", "line": None, "crawl_delay": None, "sitemaps": []},
+        "sitemap_info": {"declared": "", "ok": False, "final_url": "", "status": None,
+                         "urls": None, "contains_url": None, "truncated": False},
         "suggestions": [],
     }
 
     try:
-        resp, history, _ = fetch_url(url)
+        snap = ensure_snapshot(url, snapshot)
     except Exception as e:
         base["status"] = "error"
         base["error"] = f"{e}"
@@ -65,7 +70,7 @@ def audit_crawl_indexability(url: str) -> Dict:
         }]
         return base
 
-    soup = get_html_soup(resp)
+    resp, history, soup = snap.resp, snap.history, snap.soup
 
     chain = [(s, u) for (s, u) in history]  # list of tuples
     final_status = resp.status_code
@@ -79,6 +84,15 @@ def audit_crawl_indexability(url: str) -> Dict:
 
     # robots / sitemap (esta función ya maneja errores internos con try_fetch)
     rs = guess_sitemap_and_robots(resp.url, soup)
+    sitemap_info = {**base["sitemap_info"], **rs.get("sitemap", {})}
+    if sitemap_info.get("ok"):
+        # lectura en streaming (acotada) para contar URLs y ver si la auditada está listada
+        try:
+            summary = sitemap_summary(sitemap_info.get("final_url") or sitemap_info["declared"], resp.url)
+            sitemap_info.update(urls=summary["urls"], contains_url=summary["contains_url"],
+                                truncated=summary["truncated"])
+        except Exception:
+            pass
 
     result = {
         **base,
@@ -89,8 +103,8 @@ def audit_crawl_indexability(url: str) -> Dict:
         "chain_status": _chain_status(chain, final_status),
         "headers": headers_list,
         "x_robots_tag": xrobots,
-        "robots_info": rs.get("robots_txt", {}),
-        "sitemap_info": rs.get("sitemap", {}),
+        "robots_info": {**base["robots_info"], **rs.get("robots_txt", {})},
+        "sitemap_info": sitemap_info,
         "suggestions": [],
     }
 
@@ -128,8 +142,28 @@ def audit_crawl_indexability(url: str) -> Dict:
         })
 
     # Robots.txt
-    robots_ok = result["robots_info"].get("ok")
-    if not robots_ok:
+    robots_info = result["robots_info"]
+    if robots_info.get("allowed") is False:
+        suggestions.append({
+            "prioridad": "Alta",
+            "categoria": "Indexabilidad",
+            "tarea": "Permitir el rastreo de la URL en robots.txt.",
+            "impacto": "Alto",
+            "esfuerzo": "Bajo",
+            "nota": f"Bloqueada para {config.ROBOTS_USER_AGENT} por «{robots_info.get('rule')}»"
+                    + (f" (línea {robots_info['line']})" if robots_info.get("line") else "") + "."
+        })
+    robots_ok = robots_info.get("ok")
+    if (robots_info.get("status") or 0) >= 500:
+        suggestions.append({
+            "prioridad": "Alta",
+            "categoria": "Indexabilidad",
+            "tarea": "Corregir el error del servidor en robots.txt.",
+            "impacto": "Alto",
+            "esfuerzo": "Bajo",
+            "nota": f"robots.txt responde {robots_info['status']}: los buscadores tratan el sitio como bloqueado."
+        })
+    elif not robots_ok:
         suggestions.append({
             "prioridad": "Baja",
             "categoria": "Indexabilidad",
@@ -150,6 +184,25 @@ def audit_crawl_indexability(url: str) -> Dict:
             "esfuerzo": "Bajo",
             "nota": f"Intentado: {result['sitemap_info'].get('declared')}"
         })
+    elif sitemap_info.get("urls") == 0:
+        suggestions.append({
+            "prioridad": "Media",
+            "categoria": "Indexabilidad",
+            "tarea": "Corregir el sitemap: responde pero no contiene URLs legibles.",
+            "impacto": "Medio",
+            "esfuerzo": "Bajo",
+            "nota": f"Sitemap: {sitemap_info.get('final_url') or sitemap_info.get('declared')}"
+        })
+    elif sitemap_info.get("contains_url") is False and final_status == 200 and "noindex" not in (xrobots or ""):
+        suggestions.append({
+            "prioridad": "Media",
+            "categoria": "Indexabilidad",
+            "tarea": "Incluir la URL en el sitemap.",
+            "impacto": "Medio",
+            "esfuerzo": "Bajo",
+            "nota": f"No aparece entre las {sitemap_info['urls']} URLs leídas"
+                    + (" (lectura parcial)" if sitemap_info.get("truncated") else "") + "."
+        })
 
     result["suggestions"] = suggestions
     return result
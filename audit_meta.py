@@ -2,9 +2,11 @@ from typing import Dict, List, Tuple, Optional
 import re
 from urllib.parse import urlparse
 
+from kw_match import KeywordMatcher, best_match
+from token_index import TokenIndex
 from utils import (
-    fetch_url,
-    get_html_soup,
+    PageSnapshot,
+    ensure_snapshot,
     parse_meta_tags,
     header_value,
 )
@@ -30,38 +32,6 @@ def _bool_status(ok: bool, warn: bool = False) -> str:
 def _abs_url(u: str) -> bool:
     return bool(re.match(r"^https?://", (u or "").strip(), re.I))
 
-def _contains(text: str, kw: str) -> bool:
-    if not text or not kw:
-        return False
-    return kw.lower() in (text or "").lower()
-
-def _match_type(text: str, kw: str) -> str:
-    """Devuelve exact|partial|none (exact coincide por palabra/frase completa con límites)."""
-    if not text or not kw:
-        return "none"
-    t = text.lower()
-    k = kw.lower().strip()
-    # Exact (palabra/frase con límites aproximados)
-    # Permite espacios dentro de la frase pero respeta delimitadores alrededor
-    # Ej: kw="abogado laboral" → busca límites no alfanuméricos
-    pat_exact = r"(?<![0-9a-záéíóúñü])" + re.escape(k) + r"(?![0-9a-záéíóúñü])"
-    if re.search(pat_exact, t):
-        return "exact"
-    # Parcial
-    return "partial" if k in t else "none"
-
-def _tokenize(text: str) -> List[str]:
-    return re.findall(r"[0-9a-záéíóúñü]+", (text or "").lower())
-
-def _density_simple(corpus: str, kw: str) -> float:
-    """Densidad simple: apariciones / nº de palabras (0..1). Corpus = title+desc+H1+H2."""
-    toks = _tokenize(corpus)
-    if not toks:
-        return 0.0
-    # Contamos ocurrencias del término completo (no por palabras sueltas)
-    occurrences = len(re.findall(re.escape(kw.lower()), " ".join(toks)))
-    return occurrences / max(1, len(toks))
-
 def _slug_from_url(url: str) -> str:
     try:
         path = urlparse(url).path or ""
@@ -88,6 +58,9 @@ def _score_from_matches(mt_title: str, mt_desc: str, mt_h1: str, mt_h2_best: str
     )
     return int(round(score))
 
+MAX_COOC_KWS = 15   # pares keyword × keyword a calcular como mucho (n² / 2)
+COOC_WINDOW = 10    # palabras de distancia para contar co-ocurrencia en el cuerpo
+
 def _status_from_density(d: float) -> str:
     """
     Heurística sencilla:
@@ -101,7 +74,8 @@ def _status_from_density(d: float) -> str:
         return "amber"
     return "red"
 
-def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) -> dict:
+def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]],
+                        index: Optional[TokenIndex] = None) -> dict:
     """
     Bloque enriquecido y compatible:
     - Conserva {"keywords": [...], "score": total} (legacy)
@@ -115,12 +89,16 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
             "h2": {"present": bool, "match": ..., "count": n},
             "url_slug": {"present": bool, "match": ...},
             "density": {"value": float, "status": "green|amber|red"},
+            "body": {"count": n, "density": float, "status": ..., "prominence": 0..1},  # si hay `index`
             "score": 0..100,
             "suggestions": [...]
           }, ...
         },
-        "overall_score": 0..100
+        "overall_score": 0..100,
+        "cooccurrence": [{"a", "b", "count"}]  # si hay `index` y 2..MAX_COOC_KWS keywords
       }
+    `index` es el TokenIndex del texto visible de la página (PageSnapshot.token_index):
+    las métricas de cuerpo son búsquedas en el índice, no re-escaneos del texto.
     """
     legacy_items = []
     legacy_total = 0
@@ -141,30 +119,49 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
     h2s = headings.get("h2", []) or []
     slug = _slug_from_url(meta.get("url") or url)
 
-    # Corpus para densidad (simple)
-    corpus = " ".join([title, description] + h1s + h2s).strip()
+    # Un solo recorrido por campo para todas las keywords, sobre texto plegado
+    # (sin mayúsculas/acentos/variantes tipográficas, ver kw_match.py y text_norm.py)
+    matcher = KeywordMatcher(keywords)
+
+    # Densidad en cabeceras: índice de tokens del corpus title + description + H1 + H2
+    head_index = TokenIndex.from_text(" ".join([title, description] + h1s + h2s), matcher.strip_accents)
+    sc_title = matcher.scan(title)
+    sc_desc = matcher.scan(description)
+    sc_h1s = [matcher.scan(x) for x in h1s]
+    sc_h2s = [matcher.scan(x) for x in h2s]
+    sc_slug = matcher.scan(slug.replace("-", " "))
 
     per_kw_scores: List[int] = []
 
     for kw in keywords:
         # Presencias (legacy boolean)
-        r_title = _contains(title, kw)
-        r_desc  = _contains(description, kw)
-        r_h1    = any(_contains(x, kw) for x in h1s)
-        r_h2    = any(_contains(x, kw) for x in h2s)
+        r_title = kw in sc_title.present
+        r_desc  = kw in sc_desc.present
+        r_h1    = any(kw in x.present for x in sc_h1s)
+        r_h2    = any(kw in x.present for x in sc_h2s)
 
         # Tipos de match enriquecidos
-        mt_title = _match_type(title, kw)
-        mt_desc  = _match_type(description, kw)
-        mt_h1s   = [_match_type(x, kw) for x in h1s]
-        mt_h2s   = [_match_type(x, kw) for x in h2s]
-        mt_h1_best = "none" if not mt_h1s else sorted(mt_h1s, key=lambda m: {"exact":0,"partial":1,"none":2}[m])[0]
-        mt_h2_best = "none" if not mt_h2s else sorted(mt_h2s, key=lambda m: {"exact":0,"partial":1,"none":2}[m])[0]
-        mt_slug  = _match_type(slug.replace("-", " "), kw)
-
-        # Densidad naive
-        dens = _density_simple(corpus, kw)
+        mt_title = sc_title.match(kw)
+        mt_desc  = sc_desc.match(kw)
+        mt_h1s   = [x.match(kw) for x in sc_h1s]
+        mt_h2s   = [x.match(kw) for x in sc_h2s]
+        mt_h1_best = best_match(mt_h1s)
+        mt_h2_best = best_match(mt_h2s)
+        mt_slug  = sc_slug.match(kw)
+
+        # Densidad: apariciones de la frase completa / nº de palabras
+        dens = head_index.density(kw)
         dens_status = _status_from_density(dens)
+        body = None
+        if index is not None:
+            b_count = index.count(kw)
+            b_dens = b_count / index.n_tokens if index.n_tokens else 0.0
+            body = {
+                "count": b_count,
+                "density": round(b_dens, 4),
+                "status": _status_from_density(b_dens),
+                "prominence": index.prominence(kw) if b_count else 0.0,
+            }
 
         # Score ponderado 0..100
         score = _score_from_matches(mt_title, mt_desc, mt_h1_best, mt_h2_best, mt_slug)
@@ -217,6 +214,15 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
                 "esfuerzo": "Bajo",
                 "nota": "Baja densidad por debajo de ~2.5% y varía el lenguaje."
             })
+        if body is not None and index.n_tokens and body["count"] == 0:
+            sug.append({
+                "prioridad": "Media",
+                "categoria": "Contenido",
+                "tarea": f"Tratar «{kw}» en el cuerpo del contenido.",
+                "impacto": "Medio",
+                "esfuerzo": "Medio",
+                "nota": f"No aparece en el texto visible ({index.n_tokens} palabras)."
+            })
 
         # Estructura enriquecida por KW
         by_kw[kw] = {
@@ -229,6 +235,8 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
             "score": score,
             "suggestions": sug,
         }
+        if body is not None:
+            by_kw[kw]["body"] = body
 
         # Estructura legacy por compatibilidad
         legacy_score = (3 if r_title else 0) + (2 if r_desc else 0) + (2 if r_h1 else 0) + (1 if r_h2 else 0)
@@ -244,7 +252,7 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
 
     overall_score = int(round(sum(per_kw_scores) / max(1, len(per_kw_scores))))
 
-    return {
+    out = {
         # Compatibilidad con renderizadores antiguos
         "keywords": legacy_items,
         "score": legacy_total,
@@ -252,13 +260,22 @@ def _kw_relevance_block(url: str, meta: dict, keywords: Optional[List[str]]) ->
         "by_keyword": by_kw,
         "overall_score": overall_score,
     }
+    if index is not None and 1 < len(by_kw) <= MAX_COOC_KWS:
+        kws = list(by_kw)
+        out["cooccurrence"] = [
+            {"a": a, "b": b, "count": c}
+            for i, a in enumerate(kws) for b in kws[i + 1:]
+            if (c := index.cooccurrence(a, b, COOC_WINDOW))
+        ]
+    return out
 
 # ---------------------------
 # Auditoría principal
 # ---------------------------
-def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
+def audit_metadata(url: str, keywords: Optional[List[str]] = None, snapshot: Optional[PageSnapshot] = None) -> Dict:
     """
     Auditoría de Metadatos con relevancia por keywords opcionales.
+    Si se pasa `snapshot`, reutiliza esa descarga en lugar de pedir la URL otra vez.
     Retorna estructura con:
       - semáforos title/description/robots/canonical
       - headings_top
@@ -281,7 +298,7 @@ def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
     }
 
     try:
-        resp, _, _ = fetch_url(url)
+        snap = ensure_snapshot(url, snapshot)
     except Exception as e:
         base["status"] = "error"
         base["error"] = f"{e}"
@@ -295,10 +312,11 @@ def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
         }]
         return base
 
+    resp = snap.resp
     base["http_status"] = resp.status_code
     base["content_type"] = header_value(resp.headers, "content-type")
 
-    soup = get_html_soup(resp)
+    soup = snap.soup
     if soup is None:
         base["suggestions"] = [{
             "prioridad": "Media",
@@ -329,7 +347,7 @@ def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
     canonical_abs = _abs_url(canonical)
     canonical_status = _bool_status(canonical_abs)
 
-    kw_rel = _kw_relevance_block(url, meta, keywords)
+    kw_rel = _kw_relevance_block(url, meta, keywords, snap.token_index if keywords else None)
 
     result = {
         **base,
@@ -397,14 +415,15 @@ def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
 
     # Sugerencias guiadas por keywords (enriquecidas)
     if keywords:
-        headings = meta.get("headings", {})
-        h1s = headings.get("h1", []) or []
-        h2s = headings.get("h2", []) or []
+        # Reutiliza la matriz ya calculada en _kw_relevance_block (sin volver a buscar)
         for kw in keywords:
-            mt_title = _match_type(title, kw)
-            mt_desc  = _match_type(description, kw)
-            mt_h1    = "none" if not h1s else sorted([_match_type(x, kw) for x in h1s], key=lambda m: {"exact":0,"partial":1,"none":2}[m])[0]
-            mt_h2    = "none" if not h2s else sorted([_match_type(x, kw) for x in h2s], key=lambda m: {"exact":0,"partial":1,"none":2}[m])[0]
+            detail = kw_rel.get("by_keyword", {}).get(kw)
+            if not detail:
+                continue
+            mt_title = detail["title"]["match"]
+            mt_desc  = detail["meta_description"]["match"]
+            mt_h1    = detail["h1"]["match"]
+            mt_h2    = detail["h2"]["match"]
 
             if mt_title == "none":
                 suggestions.append({
@@ -458,7 +477,7 @@ def audit_metadata(url: str, keywords: Optional[List[str]] = None) -> Dict:
     return result
 
 
-def audit_headings_detail(url: str) -> Dict:
+def audit_headings_detail(url: str, snapshot: Optional[PageSnapshot] = None) -> Dict:
     """
     Devuelve un detalle de metadatos y encabezados para tabla (sin lógica de keywords).
     """
@@ -476,13 +495,13 @@ def audit_headings_detail(url: str) -> Dict:
     }
 
     try:
-        resp, _, _ = fetch_url(url)
+        snap = ensure_snapshot(url, snapshot)
     except Exception as e:
         base["status"] = "error"
         base["error"] = f"{e}"
         return base
 
-    soup = get_html_soup(resp)
+    soup = snap.soup
     if soup is None:
         return base
 
@@ -1,8 +1,25 @@
 # opun_seo_lite/audit_perf.py
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import re
+import statistics
 
-from utils import fetch_url, header_value, readable_bytes, get_html_soup, extract_links_and_images
+import requests
+
+import ratelimit
+from utils import (
+    DEFAULT_HEADERS,
+    MAX_DOWNLOAD,
+    REQUEST_TIMEOUT,
+    PageSnapshot,
+    ensure_snapshot,
+    header_value,
+    readable_bytes,
+    extract_links_and_images,
+    _read_capped,
+)
+from timing import TimingHTTPAdapter, summarize
+from page_weight import AssetCache, analyze_page_weight
 
 def _ttfb_status(ms: int) -> str:
     if ms is None:
@@ -13,6 +30,79 @@ def _ttfb_status(ms: int) -> str:
         return "amber"
     return "red"
 
+def _percentile(values: List[float], p: float) -> float:
+    """Percentil con interpolación lineal (p en 0..100)."""
+    vals = sorted(values)
+    if not vals:
+        return 0.0
+    k = (len(vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (k - lo)
+
+def _sample_once(sess: requests.Session, url: str) -> float:
+    with ratelimit.limited(url) as report:
+        resp = sess.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=False, stream=True)
+        ms = resp.elapsed.total_seconds() * 1000
+        report(status=resp.status_code, ttfb_ms=int(ms), retry_after=resp.headers.get("Retry-After"))
+        # cuerpo acotado a MAX_DOWNLOAD: si cabe, la conexión keep-alive vuelve al pool;
+        # si no, se corta y la siguiente muestra abre otra (nunca descarga páginas enormes N veces)
+        _read_capped(resp, MAX_DOWNLOAD)
+    return ms
+
+def sample_ttfb(url: str, samples: int = 5, concurrency: int = 3, cold: bool = False) -> Dict:
+    """
+    Muestreo repetido de TTFB sobre conexiones keep-alive (hasta `concurrency`
+    en paralelo) tras una petición de calentamiento; opcionalmente una muestra
+    en frío (conexión nueva: DNS + TCP + TLS + espera).
+    Devuelve min/p50/p95/max y jitter (desviación típica) en ms.
+    """
+    concurrency = max(1, min(int(concurrency), int(samples)))
+    headers = {**DEFAULT_HEADERS, "Connection": "keep-alive"}
+    out: Dict = {"n": 0, "values": [], "cold_ms": None}
+
+    if cold:
+        with requests.Session() as cold_sess:
+            cold_sess.headers.update(DEFAULT_HEADERS)  # Connection: close → siempre conexión nueva
+            try:
+                out["cold_ms"] = int(round(_sample_once(cold_sess, url)))
+            except Exception:
+                out["cold_ms"] = None
+
+    with requests.Session() as sess:
+        sess.headers.update(headers)
+        adapter = TimingHTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+        # calentamiento: abre conexiones sin contar en la muestra
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(lambda _: _safe_sample(sess, url), range(concurrency)))
+            values = [v for v in ex.map(lambda _: _safe_sample(sess, url), range(int(samples))) if v is not None]
+
+    if values:
+        out.update({
+            "n": len(values),
+            "values": [int(round(v)) for v in values],
+            "min_ms": int(round(min(values))),
+            "p50_ms": int(round(_percentile(values, 50))),
+            "p95_ms": int(round(_percentile(values, 95))),
+            "max_ms": int(round(max(values))),
+            "jitter_ms": int(round(statistics.pstdev(values))) if len(values) > 1 else 0,
+        })
+    return out
+
+def _safe_sample(sess: requests.Session, url: str) -> Optional[float]:
+    try:
+        return _sample_once(sess, url)
+    except Exception:
+        return None
+
+def _timing_note(timing: Dict) -> str:
+    if not timing:
+        return ""
+    return (f" (DNS {timing['dns_ms']:.0f} · TCP {timing['connect_ms']:.0f} · TLS {timing['tls_ms']:.0f}"
+            f" · espera {timing['ttfb_ms']:.0f} · descarga {timing['download_ms']:.0f} ms)")
+
 def _bool_status(ok: bool, warn: bool = False) -> str:
     if ok:
         return "green"
@@ -27,16 +117,29 @@ def _has_cache(headers: dict) -> bool:
     # consideramos estático si tiene max-age, s-maxage o public
     return any(k in cc for k in ["max-age", "s-maxage", "public"])
 
-def audit_performance(url: str) -> Dict:
+def audit_performance(
+    url: str,
+    snapshot: Optional[PageSnapshot] = None,
+    ttfb_samples: int = 0,
+    cold_sample: bool = False,
+    sample_concurrency: int = 3,
+    page_weight: bool = False,
+    asset_cache: Optional[AssetCache] = None,
+) -> Dict:
     """
     Auditoría ligera de rendimiento (mini WPO):
-    - TTFB (ms)
+    - TTFB (ms) + desglose DNS / TCP / TLS / TTFB / descarga por salto de redirección
     - Peso HTML
     - Nº imágenes referenciadas (en HTML)
     - ¿Compresión (gzip/br)?
     - ¿Cache-Control?
     - Nº aproximado de enlaces (para dar idea de solicitudes potenciales)
     Siempre retorna una estructura estable con 'status' y 'error'.
+    Si se pasa `snapshot`, reutiliza esa descarga (y su TTFB) en lugar de pedir la URL otra vez.
+    Con `ttfb_samples` > 0 toma N muestras de TTFB sobre keep-alive (ver sample_ttfb)
+    y el semáforo de TTFB usa la mediana (p50) en lugar de una sola medición.
+    Con `page_weight` mide además CSS/JS/imágenes/preloads (ver page_weight.py);
+    `asset_cache` comparte esas mediciones entre páginas (por defecto, page_weight.get_asset_cache()).
     """
     # Estructura base por si hay error
     base: Dict = {
@@ -45,10 +148,15 @@ def audit_performance(url: str) -> Dict:
         "url": url,
         "ttfb_ms": None,
         "ttfb_status": "red",
+        "ttfb_samples": {},    # {n, min_ms, p50_ms, p95_ms, max_ms, jitter_ms, cold_ms, values}
+        "timing": {},          # fase → ms, sumando toda la cadena de redirects
+        "timing_hops": [],     # [{url, status, dns_ms, connect_ms, tls_ms, ttfb_ms, download_ms, ...}]
         "html_size_bytes": 0,
         "html_size_readable": readable_bytes(0),
+        "html_truncated": False,
         "num_images": 0,
         "num_links": 0,
+        "page_weight": {},     # {total_bytes, by_kind, largest, uncompressed_text, uncached, assets, ...}
         "compression": {"value": False, "status": "red"},
         "cache_control": {"value": "", "status": "amber"},  # amber si no definido
         "content_type": "",
@@ -56,7 +164,7 @@ def audit_performance(url: str) -> Dict:
     }
 
     try:
-        resp, _, ttfb_ms = fetch_url(url)
+        snap = ensure_snapshot(url, snapshot)
     except Exception as e:
         # No propagamos: devolvemos bloque con error y sugerencia
         base["status"] = "error"
@@ -71,12 +179,21 @@ def audit_performance(url: str) -> Dict:
         }]
         return base
 
+    resp, ttfb_ms = snap.resp, snap.ttfb_ms
+    samples = sample_ttfb(resp.url or url, ttfb_samples, sample_concurrency, cold_sample) if ttfb_samples > 0 else {}
+    if samples.get("n"):
+        ttfb_ms = samples["p50_ms"]
+
     # Métricas básicas a partir de la respuesta
-    html_size = len(resp.content or b"")
     headers = resp.headers or {}
+    html_size = len(resp.content or b"")
+    if snap.truncated or getattr(resp, "body_skipped", False):
+        # Cuerpo cortado en MAX_DOWNLOAD (o no descargado): el tamaño real viene de Content-Length si existe
+        declared = header_value(headers, "content-length")
+        html_size = int(declared) if declared.isdigit() else html_size
     ctype = header_value(headers, "content-type")
 
-    soup = get_html_soup(resp)
+    soup = snap.soup
     if soup is not None:
         links, images = extract_links_and_images(soup, resp.url)
     else:
@@ -86,16 +203,26 @@ def audit_performance(url: str) -> Dict:
     compression = _has_compression(headers)
     caching = _has_cache(headers)
 
+    weight = {}
+    if page_weight and soup is not None:
+        weight = analyze_page_weight(soup, resp.url, html_bytes=html_size, cache=asset_cache)
+        weight["total_readable"] = readable_bytes(weight["total_bytes"])
+
     result = {
         **base,
         "status": "ok",
         "error": None,
         "ttfb_ms": ttfb_ms,
         "ttfb_status": _ttfb_status(ttfb_ms),
+        "ttfb_samples": samples,
+        "timing": summarize(snap.timings) if snap.timings else {},
+        "timing_hops": snap.timings,
         "html_size_bytes": html_size,
         "html_size_readable": readable_bytes(html_size),
+        "html_truncated": snap.truncated,
         "num_images": len(images),
         "num_links": len(links),
+        "page_weight": weight,
         "compression": {"value": compression, "status": _bool_status(compression)},
         "cache_control": {"value": header_value(headers, "cache-control"), "status": _bool_status(caching, warn=True)},
         "content_type": ctype,
@@ -111,7 +238,8 @@ def audit_performance(url: str) -> Dict:
             "tarea": "Reducir TTFB por debajo de 300 ms (caché, edge/CDN, optimización backend/DB, hosting).",
             "impacto": "Alto",
             "esfuerzo": "Medio",
-            "nota": f"TTFB actual: {ttfb_ms} ms"
+            "nota": (f"TTFB p50: {ttfb_ms} ms, p95: {samples['p95_ms']} ms" if samples.get("n")
+                     else f"TTFB actual: {ttfb_ms} ms") + _timing_note(result["timing"])
         })
 
     if not compression:
@@ -154,6 +282,36 @@ def audit_performance(url: str) -> Dict:
                 "esfuerzo": "Bajo",
                 "nota": f"Peso HTML: {readable_bytes(html_size)}"
             })
+        if weight:
+            if weight["total_bytes"] > 3_000_000:  # ~3 MB
+                top = ", ".join(f"{a['url'].rsplit('/', 1)[-1] or a['url']} ({readable_bytes(a['bytes'])})"
+                                for a in weight["largest"][:3])
+                suggestions.append({
+                    "prioridad": "Media",
+                    "categoria": "WPO",
+                    "tarea": "Reducir el peso total de la página por debajo de ~3 MB (imágenes, JS y CSS).",
+                    "impacto": "Alto",
+                    "esfuerzo": "Medio",
+                    "nota": f"Peso total: {weight['total_readable']}. Más pesados: {top}"
+                })
+            if weight["uncompressed_text"]:
+                suggestions.append({
+                    "prioridad": "Media",
+                    "categoria": "WPO",
+                    "tarea": "Servir CSS/JS comprimidos (brotli/gzip).",
+                    "impacto": "Medio",
+                    "esfuerzo": "Bajo",
+                    "nota": f"Sin compresión: {len(weight['uncompressed_text'])} recursos"
+                })
+            if weight["uncached"]:
+                suggestions.append({
+                    "prioridad": "Baja",
+                    "categoria": "WPO",
+                    "tarea": "Definir Cache-Control (max-age/immutable) en recursos estáticos.",
+                    "impacto": "Medio",
+                    "esfuerzo": "Bajo",
+                    "nota": f"Sin política de caché: {len(weight['uncached'])} de {weight['num_assets']} recursos"
+                })
     else:
         # Si no hay HTML, avisar suavemente
         suggestions.append({
@@ -1,8 +1,9 @@
 from typing import Dict, List, Optional
 import mimetypes
-import re
 
-from utils import fetch_url, get_html_soup, parse_og_twitter, absolutize
+from head_extract import HEAD_MAX_BYTES, og_twitter_from_head
+from kw_match import KeywordMatcher
+from utils import PageSnapshot, ensure_snapshot, absolutize
 
 # ---------------------------
 # Helpers
@@ -18,22 +19,6 @@ def _is_image_url(url: str) -> bool:
     guess, _ = mimetypes.guess_type(url)
     return (guess or "").startswith("image/")
 
-def _contains(text: str, kw: str) -> bool:
-    if not text or not kw:
-        return False
-    return kw.lower() in (text or "").lower()
-
-def _match_type(text: str, kw: str) -> str:
-    """Devuelve exact|partial|none (exact = frase/palabra con límites aproximados)."""
-    if not text or not kw:
-        return "none"
-    t = (text or "").lower()
-    k = (kw or "").lower().strip()
-    pat_exact = r"(?<![0-9a-záéíóúñü])" + re.escape(k) + r"(?![0-9a-záéíóúñü])"
-    if re.search(pat_exact, t):
-        return "exact"
-    return "partial" if k in t else "none"
-
 def _pts(mt: str, weight: int) -> float:
     return {"exact": 1.0, "partial": 0.6, "none": 0.0}.get(mt, 0.0) * weight
 
@@ -57,14 +42,18 @@ def _kw_relevance_social_enriched(og: dict, tw: dict, keywords: Optional[List[st
     twt = tw.get("twitter:title", "") or ""
     twd = tw.get("twitter:description", "") or ""
 
+    # Un solo recorrido por campo para todas las keywords (ver kw_match.py)
+    matcher = KeywordMatcher(keywords)
+    sc_ogt, sc_ogd, sc_twt, sc_twd = (matcher.scan(x) for x in (ogt, ogd, twt, twd))
+
     per_scores: List[int] = []
 
     for kw in keywords:
         # Legacy boolean presence
-        in_ogt = _contains(ogt, kw)
-        in_ogd = _contains(ogd, kw)
-        in_twt = _contains(twt, kw)
-        in_twd = _contains(twd, kw)
+        in_ogt = kw in sc_ogt.present
+        in_ogd = kw in sc_ogd.present
+        in_twt = kw in sc_twt.present
+        in_twd = kw in sc_twd.present
 
         legacy_score = (2 if in_ogt else 0) + (1 if in_ogd else 0) + (2 if in_twt else 0) + (1 if in_twd else 0)
         legacy_total += legacy_score
@@ -78,10 +67,10 @@ def _kw_relevance_social_enriched(og: dict, tw: dict, keywords: Optional[List[st
         })
 
         # Match types enriquecidos
-        mt_ogt = _match_type(ogt, kw)
-        mt_ogd = _match_type(ogd, kw)
-        mt_twt = _match_type(twt, kw)
-        mt_twd = _match_type(twd, kw)
+        mt_ogt = sc_ogt.match(kw)
+        mt_ogd = sc_ogd.match(kw)
+        mt_twt = sc_twt.match(kw)
+        mt_twd = sc_twd.match(kw)
 
         score = (
             _pts(mt_ogt, 35) +
@@ -147,9 +136,11 @@ def _kw_relevance_social_enriched(og: dict, tw: dict, keywords: Optional[List[st
 # ---------------------------
 # Auditoría principal
 # ---------------------------
-def audit_social(url: str, keywords: Optional[List[str]] = None) -> Dict:
+def audit_social(url: str, keywords: Optional[List[str]] = None, snapshot: Optional[PageSnapshot] = None) -> Dict:
     """
     Checklist Social (OG/Twitter) + relevancia por keywords (opcional).
+    Si se pasa `snapshot`, reutiliza esa descarga en lugar de pedir la URL otra vez;
+    si no, basta una descarga parcial (HEAD_MAX_BYTES). Solo se lee el <head>.
     """
     base_result = {
         "status": "ok",
@@ -163,7 +154,7 @@ def audit_social(url: str, keywords: Optional[List[str]] = None) -> Dict:
     }
 
     try:
-        resp, _, _ = fetch_url(url)
+        snap = ensure_snapshot(url, snapshot, max_bytes=HEAD_MAX_BYTES)
     except Exception as e:
         base_result["status"] = "error"
         base_result["error"] = f"{e}"
@@ -177,8 +168,8 @@ def audit_social(url: str, keywords: Optional[List[str]] = None) -> Dict:
         }]
         return base_result
 
-    soup = get_html_soup(resp)
-    og, tw = parse_og_twitter(soup)
+    resp = snap.resp
+    og, tw = og_twitter_from_head(snap.head)
     root = resp.url or url
 
     # Normaliza imágenes relativas
@@ -0,0 +1,267 @@
+# opun_seo_lite/bench.py
+"""
+Benchmarks locales (sin red externa).
+
+    python bench.py fetch --pages 2000 --delay-ms 50 --workers 32 --concurrency 500
+    python bench.py parsers --fixtures data/html_fixtures --repeat 5
+    python bench.py stream --sizes 1,8,32
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import config
+
+_PAGE = (
+    "<!doctype html><html><head><title>Bench</title>"
+    "<meta name='description' content='bench page'></head>"
+    "<body><h1>Bench</h1>" + "<p>lorem ipsum dolor sit amet</p>" * 200 + "</body></html>"
+).encode("utf-8")
+
+
+# ---------------------------
+# Servidor HTTP local (asyncio)
+# ---------------------------
+def start_local_server(delay_ms: int = 0, body: bytes = _PAGE):
+    """
+    Arranca un servidor HTTP/1.1 mínimo en 127.0.0.1 dentro de un hilo propio.
+    Usa asyncio para aguantar miles de conexiones simultáneas y añade `delay_ms`
+    de latencia por respuesta (simula un origen real). Devuelve (base_url, stop).
+    """
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    async def _handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                if delay_ms:
+                    await asyncio.sleep(delay_ms / 1000)
+                keep = b"connection: close" not in head.lower()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                    + (b"" if keep else b"Connection: close\r\n") + b"\r\n" + body
+                )
+                await writer.drain()
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _main():
+        server = await asyncio.start_server(_handle, "127.0.0.1", 0, backlog=4096)
+        state["port"] = server.sockets[0].getsockname()[1]
+        state["server"] = server
+        ready.set()
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # stop() cierra el servidor
+
+    t = threading.Thread(target=lambda: loop.run_until_complete(_main()), daemon=True)
+    t.start()
+    ready.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(state["server"].close)
+
+    return f"http://127.0.0.1:{state['port']}", stop
+
+
+# ---------------------------
+# fetch: sync (hilos + requests) vs async (aiohttp)
+# ---------------------------
+def bench_fetch(pages: int, delay_ms: int, workers: int, concurrency: int, limiter: bool = False) -> None:
+    from utils import fetch_url
+    from async_fetch import fetch_many
+
+    # las dos rutas pasan por ratelimit (y la síncrona además por http_cache): para medir
+    # el cliente HTTP se apagan ambos en los dos lados; --limiter los deja activos en ambos
+    config.ENABLE_RATE_LIMIT = limiter
+    config.ENABLE_HTTP_CACHE = limiter
+    base, stop = start_local_server(delay_ms=delay_ms)
+    urls = [f"{base}/p/{i}" for i in range(pages)]
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            ok_sync = sum(1 for r in ex.map(lambda u: _safe(fetch_url, u), urls) if r)
+        dt_sync = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ok_async = sum(1 for _, r in fetch_many(urls, concurrency=concurrency) if not isinstance(r, Exception))
+        dt_async = time.perf_counter() - t0
+    finally:
+        stop()
+
+    print(f"páginas={pages} latencia={delay_ms}ms limitador/caché={'sí' if limiter else 'no'} (ambos lados)")
+    print(f"sync  ({workers:>4} hilos)      : {ok_sync:>6} ok  {dt_sync:7.2f}s  {ok_sync / dt_sync:9.1f} pág/s")
+    print(f"async ({concurrency:>4} en vuelo)   : {ok_async:>6} ok  {dt_async:7.2f}s  {ok_async / dt_async:9.1f} pág/s")
+
+
+# ---------------------------
+# parsers: paridad + tiempo + memoria por backend (html_backend.py)
+# ---------------------------
+_SYNTHETIC = [
+    # casos que suelen separar a los parsers: mayúsculas, entidades, comentarios,
+    # <p> sin cerrar, noscript, <title> dentro de SVG, charset no UTF-8
+    "<!DOCTYPE html><HTML><HEAD><TITLE>Caf&eacute; &amp; t&eacute; <!-- x --></TITLE>"
+    "<META NAME='Description' CONTENT=' Tienda de café '><meta name=robots content='NoIndex, Follow'>"
+    "<link rel='Canonical alternate' href='/c'><meta property='og:title' content='OG'>"
+    "<meta name='twitter:card' content='summary'></HEAD><BODY><h1>Uno <b>dos</b></h1>"
+    "<p>texto<p>más<h2>  A\n  b </h2><noscript><img src='/px.gif'></noscript>"
+    "<svg><title>icono</title></svg><a href='/x'>x</a><a>sin href</a><img src='/i.png'><img></BODY></HTML>",
+    "<html><head><meta charset='iso-8859-1'><title>Se\xf1al</title></head>"
+    "<body><h1>Pi\xf1a</h1><h3>c</h3></body></html>",
+    "<title>solo título</title><h1>sin html ni body</h1>" + "<div><p>lorem</p><a href='#'>a</a></div>" * 2000,
+]
+
+
+def _load_corpus(fixtures: str = None):
+    corpus = []
+    for i, page in enumerate(_SYNTHETIC):
+        corpus.append((f"synthetic-{i}", page.encode("latin-1" if "iso-8859-1" in page else "utf-8")))
+    if fixtures:
+        for f in sorted(Path(fixtures).glob("**/*.htm*")):
+            corpus.append((str(f), f.read_bytes()))
+    return corpus
+
+
+def bench_parsers(fixtures: str = None, repeat: int = 3, reference: str = "lxml") -> int:
+    """Compara extract_signals de cada backend contra `reference`; devuelve nº de páginas con diferencias."""
+    from html_backend import BACKENDS, diff_signals, extract_signals
+
+    corpus = _load_corpus(fixtures)
+    total_bytes = sum(len(b) for _, b in corpus)
+    expected = {name: extract_signals(body, reference, base_url="https://example.com/") for name, body in corpus}
+    print(f"corpus: {len(corpus)} páginas, {total_bytes / 1e6:.2f} MB (referencia: {reference})")
+
+    mismatched_pages = set()
+    for backend in BACKENDS:
+        # tiempo (mejor de `repeat` pasadas) y pico de memoria (una pasada con tracemalloc)
+        best = float("inf")
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            for _, body in corpus:
+                extract_signals(body, backend, base_url="https://example.com/")
+            best = min(best, time.perf_counter() - t0)
+        tracemalloc.start()
+        diffs = {}
+        for name, body in corpus:
+            d = diff_signals(expected[name], extract_signals(body, backend, base_url="https://example.com/"))
+            if d:
+                diffs[name] = d
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        mismatched_pages.update(diffs)
+        print(f"{backend:<12} {best * 1000:9.1f} ms  {total_bytes / 1e6 / best:7.2f} MB/s  "
+              f"pico {peak / 1e6:7.1f} MB  paridad {len(corpus) - len(diffs)}/{len(corpus)}")
+        for name, d in list(diffs.items())[:5]:
+            for field, (a, b) in d.items():
+                print(f"    {name} · {field}: {reference}={a!r}  {backend}={b!r}")
+    return len(mismatched_pages)
+
+
+# ---------------------------
+# stream: MB/s y memoria del extractor en streaming (stream_extract.py)
+# ---------------------------
+_STREAM_HEAD = (
+    b"<!doctype html><html><head><title>Stream</title><meta name='description' content='d'>"
+    b"<link rel='canonical' href='/s'></head><body><h1>Stream</h1>"
+)
+_STREAM_BLOCK = (
+    b"<div class='card'><h2>Producto</h2><p>lorem ipsum dolor sit amet, consectetur "
+    b"<a href='/p'>enlace</a> <img src='/i.png' alt=''></p></div>\n"
+) * 400
+
+
+def _page_chunks(size_mb: float):
+    """Genera la página por trozos sin tenerla entera en memoria."""
+    yield _STREAM_HEAD
+    remaining = int(size_mb * 1e6)
+    while remaining > 0:
+        yield _STREAM_BLOCK
+        remaining -= len(_STREAM_BLOCK)
+    yield b"</body></html>"
+
+
+def bench_stream(sizes) -> None:
+    from html_backend import extract_signals
+    from stream_extract import extract_signals_stream
+
+    print(f"{'tamaño':>8}  {'stream MB/s':>11}  {'stream pico':>11}  {'árbol MB/s':>10}  {'árbol pico':>10}")
+    for mb in sizes:
+        # tiempo sin tracemalloc (lo ralentiza mucho); el pico se mide en otra pasada
+        t0 = time.perf_counter()
+        sig = extract_signals_stream(_page_chunks(mb))
+        dt_stream = time.perf_counter() - t0
+        tracemalloc.start()
+        extract_signals_stream(_page_chunks(mb))
+        peak_stream = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        body = b"".join(_page_chunks(mb))
+        t0 = time.perf_counter()
+        ref = extract_signals(body, "lxml-direct")
+        dt_tree = time.perf_counter() - t0
+        tracemalloc.start()
+        extract_signals(body, "lxml-direct")
+        peak_tree = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del body
+
+        ok = "" if sig == ref else "  (¡difiere de lxml-direct!)"
+        print(f"{mb:>6g}MB  {mb / dt_stream:11.1f}  {peak_stream / 1e6:9.1f}MB  "
+              f"{mb / dt_tree:10.1f}  {peak_tree / 1e6:8.1f}MB{ok}")
+
+
+def _safe(fn, *args):
+    try:
+        return fn(*args)
+    except Exception:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="opun-bench", description="Benchmarks locales de Opun SEO Lite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("fetch", help="pág/s de fetch_url (hilos) vs fetch_url_async")
+    p.add_argument("--pages", type=int, default=1000)
+    p.add_argument("--delay-ms", type=int, default=50)
+    p.add_argument("--workers", type=int, default=32)
+    p.add_argument("--concurrency", type=int, default=500)
+    p.add_argument("--limiter", action="store_true",
+                   help="mantiene ratelimit y la caché HTTP activos en ambos lados (por defecto se apagan)")
+    p = sub.add_parser("parsers", help="paridad, tiempo y memoria de los backends HTML")
+    p.add_argument("--fixtures", default=None, help="carpeta con páginas .html reales")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--reference", default="lxml")
+    p.add_argument("--strict", action="store_true", help="salir con código 1 si hay diferencias")
+    p = sub.add_parser("stream", help="MB/s y memoria del extractor en streaming frente al árbol lxml")
+    p.add_argument("--sizes", default="1,8,32", help="tamaños de página en MB, separados por comas")
+    args = ap.parse_args()
+
+    if args.cmd == "fetch":
+        bench_fetch(args.pages, args.delay_ms, args.workers, args.concurrency, args.limiter)
+    elif args.cmd == "parsers":
+        mismatches = bench_parsers(args.fixtures, args.repeat, args.reference)
+        if args.strict and mismatches:
+            sys.exit(1)
+    elif args.cmd == "stream":
+        bench_stream([float(x) for x in args.sizes.split(",") if x.strip()])
+
+
+if __name__ == "__main__":
+    main()
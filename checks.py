@@ -1,3 +1,5 @@
+from dedupe import THIN_WORDS
+
 def run_checks(result: dict) -> list[dict]:
     issues: list[dict] = []
     if result['status'] >= 400:
@@ -11,6 +13,9 @@ def run_checks(result: dict) -> list[dict]:
         issues.append({'category':'content','severity':'info','message':'No hay H1'})
     if len(h1) > 1:
         issues.append({'category':'content','severity':'warn','message':f'H1 mÃºltiples ({len(h1)})'})
+    wc = result.get('word_count')
+    if wc is not None and result['status'] < 400 and wc < THIN_WORDS:
+        issues.append({'category':'content','severity':'info','message':f'Contenido escaso ({wc} palabras)'})
     if result.get('meta_robots') and 'noindex' in result['meta_robots']:
         issues.append({'category':'indexability','severity':'warn','message':'meta robots contiene noindex'})
     return issues
\ No newline at end of file
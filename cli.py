@@ -1,50 +1,227 @@
 import argparse, json
+from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
 
 import pandas as pd
 
 from fetch import get
-from parse import head_info, headings
+from parse import ParsedDocument
 from checks import run_checks
+from dedupe import duplicate_issues, simhash
+from crawler import ConcurrentCrawler
+from frontier import SCOPES, Frontier
+from site_index import DuplicateIndex
+from sitemap import SitemapCoverage, SitemapReport, iter_sitemap_urls
+import config
+import http_cache
+import ratelimit
+from robots import get_robots, root_of
+from utils import absolutize, extract_links_and_images
+from html_backend import resolve_backend
+from stream_extract import parse_page_stream
+from token_index import TokenIndex
 
 BASE = Path(__file__).resolve().parent
 DATA = BASE / "data" / "urls.txt"
 OUT_JSON = BASE / "outputs" / "json"
 OUT_CSV = BASE / "outputs" / "csv" / "issues.csv"
+SITE_INDEX = BASE / "outputs" / "site_index.json"  # title/description/H1 por URL, persiste entre crawls
+SITEMAP_COVERAGE = BASE / "outputs" / "sitemap_coverage.json"
 
-def crawl(seed: Path, max_pages: int | None = None):
-    urls = [u.strip() for u in seed.read_text(encoding='utf-8').splitlines() if u.strip() and not u.startswith('#')]
-    if max_pages: urls = urls[:max_pages]
+def _fetch_one(url: str, follow: bool = False, obey_robots: bool = True) -> dict:
+    """Etapa de red: solo descarga; el payload viaja al pool de parseo."""
+    verdict = get_robots().check(url)  # robots.txt por host, cacheado: microsegundos por URL
+    blocked = None if verdict['allowed'] else verdict['rule']
+    if blocked and obey_robots:
+        return {'url': url, 'status': 0, 'html': None, 'follow': False, 'robots_blocked': blocked}
+    r = get(url)
+    return {'url': str(r.url), 'status': r.status_code, 'html': r.text, 'follow': follow, 'robots_blocked': blocked}
+
+def _robots_issue(rule: str) -> dict:
+    return {'category': 'robots', 'severity': 'warn', 'message': f'Bloqueada por robots.txt ({rule})'}
+
+def _parse_one(payload: dict) -> dict:
+    """Etapa de CPU (proceso aparte si --parse-workers): parseo + checks, resultado compacto."""
+    blocked = payload.get('robots_blocked')
+    if payload['html'] is None:  # no descargada por robots.txt
+        return {'url': payload['url'], 'status': payload['status'], 'robots_blocked': blocked,
+                'issues': [_robots_issue(blocked)]}
+    html = payload['html']
+    big = config.STREAM_PARSE_MIN_KB and len(html) >= config.STREAM_PARSE_MIN_KB * 1024
+    # página grande: una pasada de eventos lxml sin árbol bs4, mismos campos (stream_extract.PageCollector)
+    page = parse_page_stream(html, want_links=bool(payload.get('follow'))) \
+        if big and resolve_backend() == 'lxml' else None
+    if page is not None:
+        head_info, headings, index = page['head_info'], page['headings'], TokenIndex.from_text(page['text'])
+    else:
+        doc = ParsedDocument(html)  # un solo parseo por página
+        head_info, headings, index = doc.head_info, doc.headings, doc.token_index
+    result = {
+        'url': payload['url'],
+        'status': payload['status'],
+        **head_info,
+        'headings': headings,
+        'word_count': index.n_tokens,
+        'simhash': f'{simhash(index):016x}',  # huella para casi duplicados (export)
+    }
+    result['issues'] = run_checks(result)
+    if blocked:  # descargada con --ignore-robots
+        result['robots_blocked'] = blocked
+        result['issues'].append(_robots_issue(blocked))
+    if payload.get('follow') and 'nofollow' not in (result.get('meta_robots') or '').lower():
+        # enlaces para la frontera (--follow); se retiran antes de escribir el JSON
+        result['_links'] = ([absolutize(payload['url'], h) for h in page['hrefs']] if page is not None
+                            else extract_links_and_images(doc.soup, payload['url'])[0])
+    return result
+
+def _write_result(url: str, result: dict):
+    name = url.replace('://','_').replace('/','_')
+    (OUT_JSON / f'{name}.json').write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+
+def _iter_seed(seed: Path, max_pages: int | None = None):
+    n = 0
+    with seed.open(encoding='utf-8') as fh:
+        for line in fh:
+            u = line.strip()
+            if not u or u.startswith('#'):
+                continue
+            if max_pages and n >= max_pages:
+                return
+            n += 1
+            yield u
+
+def _iter_sitemap(roots: list, coverage: SitemapCoverage, report: SitemapReport, since: datetime | None = None):
+    """URLs de los sitemaps según se leen (streaming), registrándolas para la cobertura."""
+    for loc, lastmod in iter_sitemap_urls(roots, since=since, report=report):
+        coverage.add_listed(loc, lastmod)
+        yield loc
+
+def _chain_unique(first, then):
+    """URLs de `first` (el fichero de semillas, pequeño) y luego las de `then` que no estaban ya."""
+    seen = set()
+    for u in first:
+        seen.add(u)
+        yield u
+    for u in then:
+        if u not in seen:
+            yield u
+
+def crawl(seed: Path, max_pages: int | None = None, workers: int = 1, per_host: int = 2,
+          parse_workers: int = 0, follow: bool = False, max_depth: int = 3, scope: str = 'host',
+          sitemaps: list | None = None, since: datetime | None = None, obey_robots: bool = config.ENABLE_ROBOTS,
+          robots_sitemaps: bool = False):
     OUT_JSON.mkdir(parents=True, exist_ok=True)
-    for url in urls:
-        r = get(url)
-        info = head_info(r.text)
-        h = headings(r.text)
-        result = {
-            'url': str(r.url),
-            'status': r.status_code,
-            **info,
-            'headings': h,
-        }
-        result['issues'] = run_checks(result)
-        name = url.replace('://','_').replace('/','_')
-        (OUT_JSON / f'{name}.json').write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
-    print(f'Crawl OK: {len(urls)} pÃ¡ginas â†’ {OUT_JSON}')
+    dup_index = DuplicateIndex.load(SITE_INDEX)  # recrawl: se actualizan solo las URLs visitadas
+    robots = get_robots()
+    keep_seeds = robots_sitemaps and not sitemaps
+    if robots_sitemaps:
+        # líneas Sitemap: del robots.txt de cada host semilla
+        roots = dict.fromkeys(root_of(u) for u in (sitemaps or _iter_seed(seed)))
+        sitemaps = list(dict.fromkeys((sitemaps or []) + [sm for r in roots for sm in robots.get(r).sitemaps]))
+        if not sitemaps:
+            print('robots.txt no declara sitemaps para los hosts semilla')
+    blocked = [0]
+    # --sitemap: las URLs salen de los sitemaps en lugar de data/urls.txt;
+    # --robots-sitemaps sin --sitemap: las semillas primero y después las de sus sitemaps
+    coverage = SitemapCoverage() if sitemaps else None
+    sm_report = SitemapReport()
+    urls = _iter_sitemap(sitemaps, coverage, sm_report, since) if sitemaps else _iter_seed(seed)
+    if sitemaps and keep_seeds:
+        urls = _chain_unique(_iter_seed(seed), urls)
+    # --follow: las URLs semilla inician la frontera y los enlaces descubiertos la alimentan
+    frontier = Frontier(urls, scope=scope, max_depth=max_depth, max_pages=max_pages) if follow else None
+
+    def on_result(url: str, result: dict):
+        links = result.pop('_links', None)
+        try:
+            if result.get('robots_blocked'):
+                blocked[0] += 1
+            if coverage is not None:
+                coverage.add_crawled(url, result.get('status'), result.get('url'))
+                lastmod = coverage.lastmod(url)
+                if lastmod:
+                    result['sitemap_lastmod'] = lastmod
+                result['issues'].extend(coverage.issues_for(url, result))
+            _write_result(url, result)
+            dup_index.add_result(result)
+        finally:
+            if frontier is not None:
+                frontier.done(url, links, final_url=result.get('url'))
+
+    def on_error(url: str, e: Exception):
+        print(f'[error] {url}: {e}')
+        if coverage is not None:
+            coverage.add_crawled(url)
+        if frontier is not None:
+            frontier.done(url)
+
+    engine = ConcurrentCrawler(
+        partial(_fetch_one, follow=follow, obey_robots=obey_robots),
+        parse=_parse_one,
+        parse_workers=parse_workers,
+        workers=workers,
+        per_host=per_host,
+        on_result=on_result,
+        on_error=on_error,
+    )
+    try:
+        stats = engine.run(frontier if frontier is not None else islice(urls, max_pages))
+    finally:
+        urls.close()  # con --max-pages el sitemap queda a medias: detiene sus hilos de descarga
+        dup_index.save(SITE_INDEX)
+    print(f'Crawl OK: {stats["ok"]} pÃ¡ginas ({stats["errors"]} errores) â†’ {OUT_JSON}')
+    if frontier is not None:
+        fs = frontier.stats
+        print(f'Frontera: {fs["discovered"]} URLs descubiertas, {fs["out_of_scope"]} fuera de alcance, '
+              f'{fs["too_deep"]} por profundidad, {len(frontier.seen)} vistas'
+              f'{"" if frontier.seen.exact else " (Bloom)"}')
+    rs = robots.stats
+    print(f'robots.txt: {rs["fetched"]} descargados, {rs["from_disk"]} desde caché; {blocked[0]} URLs bloqueadas'
+          f'{"" if obey_robots else " (descargadas igualmente)"}')
+    if coverage is not None:
+        cov = {**coverage.report(), 'ingest': sm_report.to_dict()}
+        SITEMAP_COVERAGE.write_text(json.dumps(cov, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'Sitemap: {sm_report.urls} URLs de {len(sm_report.sitemaps)} sitemaps '
+              f'({len(sm_report.errors)} errores); cobertura {cov["coverage"]:.0%}, '
+              f'{cov["not_crawled"]["count"]} sin rastrear, {cov["not_in_sitemap"]["count"]} fuera del sitemap, '
+              f'{cov["listed_errors"]["count"]} con error → {SITEMAP_COVERAGE}')
+    cache = http_cache.get_cache()
+    if cache:
+        cs = cache.stats()
+        print(f'Caché HTTP: {cs["hits"]} hits / {cs["misses"]} misses, {cs["bytes_saved"]} bytes ahorrados')
+    limiter = ratelimit.get_limiter()
+    if limiter:
+        for host, st in sorted(limiter.rates().items()):
+            print(f'  {host}: {st["rate_rps"]} req/s, concurrencia {st["concurrency"]}, TTFB~{st["ttfb_ewma_ms"]} ms')
+
+def _issue_row(page: dict, issue: dict) -> dict:
+    return {
+        'url': page['url'],
+        'status': page['status'],
+        'category': issue['category'],
+        'severity': issue['severity'],
+        'message': issue['message'],
+        'title': page.get('title'),
+        'meta_description': page.get('meta_description'),
+    }
 
 def export_csv():
     rows = []
+    pages = {}  # url → campos mínimos (huella incluida) para los clusters de duplicados
     for fp in OUT_JSON.glob('*.json'):
         data = json.loads(fp.read_text(encoding='utf-8'))
         for issue in data.get('issues', []):
-            rows.append({
-                'url': data['url'],
-                'status': data['status'],
-                'category': issue['category'],
-                'severity': issue['severity'],
-                'message': issue['message'],
-                'title': data.get('title'),
-                'meta_description': data.get('meta_description'),
-            })
+            rows.append(_issue_row(data, issue))
+        if data.get('status', 0) < 400:
+            pages[data['url']] = {k: data.get(k) for k in ('url', 'status', 'title', 'meta_description', 'simhash', 'word_count')}
+    for url, issues in duplicate_issues(pages.values()).items():
+        rows.extend(_issue_row(pages[url], issue) for issue in issues)
+    # title/description/H1 repetidos: del índice del crawl (solo URLs con JSON vigente)
+    for url, issues in DuplicateIndex.load(SITE_INDEX).issues().items():
+        if url in pages:
+            rows.extend(_issue_row(pages[url], issue) for issue in issues)
     if not rows:
         print('No hay issues. Ejecuta crawl primero.')
         return
@@ -57,11 +234,35 @@ def main():
     sub = ap.add_subparsers(dest='cmd', required=True)
     p1 = sub.add_parser('crawl', help='Crawlea URLs desde data/urls.txt')
     p1.add_argument('--max-pages', type=int, default=None)
+    p1.add_argument('--workers', type=int, default=1, help='Descargas en paralelo')
+    p1.add_argument('--per-host', type=int, default=2, help='Máximo de peticiones simultáneas por host')
+    p1.add_argument('--parse-workers', type=int, default=config.PARSE_WORKERS,
+                    help='Procesos de parseo/checks (0 = en los hilos de descarga)')
+    p1.add_argument('--follow', action='store_true',
+                    help='Sigue enlaces desde las URLs semilla (frontera deduplicada)')
+    p1.add_argument('--max-depth', type=int, default=3, help='Profundidad máxima con --follow')
+    p1.add_argument('--scope', choices=SCOPES, default='host',
+                    help='Alcance con --follow: mismo host o prefijo de ruta de las semillas')
+    p1.add_argument('--sitemap', action='append', default=None, metavar='URL',
+                    help='Toma las URLs de este sitemap o índice (.xml / .xml.gz); repetible')
+    p1.add_argument('--since', type=datetime.fromisoformat, default=None, metavar='AAAA-MM-DD',
+                    help='Con --sitemap: solo URLs con lastmod igual o posterior')
+    p1.add_argument('--robots-sitemaps', action='store_true',
+                    help='Añade los sitemaps declarados en el robots.txt de los hosts semilla '
+                         '(sin --sitemap, las URLs de data/urls.txt se siguen crawleando)')
+    p1.add_argument('--ignore-robots', action='store_true',
+                    help='Descarga también las URLs bloqueadas por robots.txt (se siguen marcando)')
     sub.add_parser('export', help='Exporta issues a CSV')
     sub.add_parser('report', help='Alias de export (HTML opcional en el futuro)')
     args = ap.parse_args()
 
     if args.cmd == 'crawl':
-        crawl(DATA, max_pages=args.max_pages)
+        crawl(DATA, max_pages=args.max_pages, workers=args.workers, per_host=args.per_host,
+              parse_workers=args.parse_workers, follow=args.follow, max_depth=args.max_depth,
+              scope=args.scope, sitemaps=args.sitemap, since=args.since,
+              obey_robots=config.ENABLE_ROBOTS and not args.ignore_robots, robots_sitemaps=args.robots_sitemaps)
     elif args.cmd in ('export','report'):
         export_csv()
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,29 @@ ENABLE_SAFE_BROWSING     = os.getenv("ENABLE_SAFE_BROWSING", "True") == "True"
 ENABLE_KG                = os.getenv("ENABLE_KG", "True") == "True"
 ENABLE_TRENDS            = os.getenv("ENABLE_TRENDS", "False") == "True"
 ENABLE_TOPIC_GAP         = os.getenv("ENABLE_TOPIC_GAP", "True") == "True"
+ENABLE_HTTP_CACHE        = os.getenv("ENABLE_HTTP_CACHE", "True") == "True"
+ENABLE_RATE_LIMIT        = os.getenv("ENABLE_RATE_LIMIT", "True") == "True"
+ENABLE_ROBOTS            = os.getenv("ENABLE_ROBOTS", "True") == "True"  # el crawl respeta robots.txt
 
 # === TIMEOUTS / RETRIES (puedes ajustar) ===
 HTTP_TIMEOUT_SEC = 25
+
+# === CACHÉ HTTP (revalidación ETag/Last-Modified) ===
+HTTP_CACHE_DIR    = os.getenv("OPUN_HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs", "cache"))
+HTTP_CACHE_MAX_MB = int(os.getenv("OPUN_HTTP_CACHE_MAX_MB", "512"))
+
+# === ROBOTS.TXT (caché en HTTP_CACHE_DIR/robots.json) ===
+ROBOTS_USER_AGENT = os.getenv("OPUN_ROBOTS_USER_AGENT", "Googlebot")  # grupo de reglas que se evalúa
+ROBOTS_TTL_H      = float(os.getenv("OPUN_ROBOTS_TTL_H", "24"))
+
+# === PARSEO HTML (html.parser | lxml, ver html_backend.py) ===
+HTML_PARSER_BACKEND = os.getenv("OPUN_HTML_PARSER", "lxml")
+KW_FOLD_ACCENTS     = os.getenv("OPUN_KW_FOLD_ACCENTS", "True") == "True"  # "cafe" coincide con "café"
+PARSE_WORKERS       = int(os.getenv("OPUN_PARSE_WORKERS", "0"))  # procesos de parseo en el crawl (0 = en hilos)
+STREAM_PARSE_MIN_KB = int(os.getenv("OPUN_STREAM_PARSE_MIN_KB", "512"))  # crawl: páginas mayores sin árbol bs4 (0 = nunca)
+
+# === RENDIMIENTO (muestreo de TTFB en audit_performance) ===
+PERF_TTFB_SAMPLES      = int(os.getenv("OPUN_PERF_TTFB_SAMPLES", "5"))
+PERF_TTFB_COLD_SAMPLE  = os.getenv("OPUN_PERF_TTFB_COLD_SAMPLE", "True") == "True"
+PERF_SAMPLE_CONCURRENCY= int(os.getenv("OPUN_PERF_SAMPLE_CONCURRENCY", "3"))
+ENABLE_PAGE_WEIGHT     = os.getenv("ENABLE_PAGE_WEIGHT", "True") == "True"
@@ -0,0 +1,189 @@
+# opun_seo_lite/crawler.py
+import multiprocessing
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).netloc or "").lower()
+
+
+class ConcurrentCrawler:
+    """
+    Motor de crawl concurrente con cortesía por host:
+      - `workers` hilos descargando/procesando en paralelo
+      - como máximo `per_host` peticiones simultáneas contra un mismo host
+      - cola de trabajo acotada (`max_pending`): las URLs se leen del iterable
+        solo cuando hay hueco, así una semilla de 100k URLs no se carga entera
+    `worker(url)` devuelve el resultado; `on_result(url, result)` se llama en
+    cuanto termina cada página (serializado con un lock) y `on_error(url, exc)`
+    si el worker lanza.
+
+    Con `parse` el trabajo se parte en dos etapas: `worker(url)` solo descarga
+    (I/O, hilos) y devuelve un payload picklable, y `parse(payload)` (CPU:
+    parseo + checks) corre en un pool de `parse_workers` procesos, fuera del GIL.
+    `parse` debe ser una función de módulo. Como mucho `max_parse_pending`
+    payloads esperan al pool: si se llena, los hilos de descarga se bloquean
+    (backpressure) en vez de acumular HTML en memoria. Con parse_workers=0
+    `parse` se ejecuta en el propio hilo.
+    """
+    def __init__(
+        self,
+        worker: Callable[[str], dict],
+        workers: int = 8,
+        per_host: int = 2,
+        max_pending: Optional[int] = None,
+        on_result: Optional[Callable[[str, dict], None]] = None,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+        parse: Optional[Callable[[dict], dict]] = None,
+        parse_workers: int = 0,
+        max_parse_pending: Optional[int] = None,
+    ):
+        self.worker = worker
+        self.workers = max(1, int(workers))
+        self.per_host = max(1, int(per_host))
+        self.max_pending = max(self.workers, int(max_pending or self.workers * 4))
+        self.on_result = on_result
+        self.on_error = on_error
+
+        self._cond = threading.Condition()
+        self._ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._active: Dict[str, int] = defaultdict(int)     # peticiones en curso por host
+        self._waiting: Dict[str, deque] = defaultdict(deque)  # URLs aparcadas por host saturado
+        self._admitted = 0                                   # admitidas y aún no terminadas
+        self._result_lock = threading.Lock()
+        self.stats = {"ok": 0, "errors": 0}
+
+        self.parse = parse
+        self.parse_workers = max(0, int(parse_workers or 0)) if parse else 0
+        self.max_parse_pending = max(1, int(max_parse_pending or self.parse_workers * 2 or 1))
+        self._parse_slots = threading.BoundedSemaphore(self.max_parse_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # ---- planificación por host ----
+    def _admit(self, url: str) -> None:
+        with self._cond:
+            while self._admitted >= self.max_pending:
+                self._cond.wait()
+            self._admitted += 1
+            host = host_of(url)
+            if self._active[host] < self.per_host:
+                self._active[host] += 1
+                self._ready.put(url)
+            else:
+                self._waiting[host].append(url)
+
+    def _release_host(self, url: str) -> None:
+        """Libera el hueco del host (la descarga terminó) sin cerrar la página."""
+        with self._cond:
+            host = host_of(url)
+            pending = self._waiting.get(host)
+            if pending:
+                # el hueco pasa directamente a la siguiente URL del mismo host
+                self._ready.put(pending.popleft())
+                if not pending:
+                    del self._waiting[host]
+            else:
+                self._active[host] -= 1
+                if self._active[host] <= 0:
+                    del self._active[host]
+
+    def _finish(self) -> None:
+        with self._cond:
+            self._admitted -= 1
+            self._cond.notify_all()
+
+    # ---- resultados ----
+    def _deliver(self, url: str, result=None, error: Optional[Exception] = None) -> None:
+        """Entrega a los callbacks; si uno lanza cuenta como error y el worker sigue vivo."""
+        with self._result_lock:
+            if error is None:
+                try:
+                    if self.on_result:
+                        self.on_result(url, result)
+                    self.stats["ok"] += 1
+                    return
+                except Exception as e:  # p. ej. OSError al escribir el JSON de la página
+                    error = e
+            self.stats["errors"] += 1
+            if self.on_error:
+                try:
+                    self.on_error(url, error)
+                except Exception:
+                    pass  # un on_error roto no puede tumbar el crawl
+
+    def _on_parsed(self, url: str, fut) -> None:
+        self._parse_slots.release()
+        try:
+            try:
+                exc = fut.exception()
+            except CancelledError as e:  # pool cerrado con tareas pendientes
+                exc = e
+            self._deliver(url, None if exc else fut.result(), exc)
+        finally:
+            self._finish()
+
+    # ---- workers ----
+    def _loop(self) -> None:
+        while True:
+            url = self._ready.get()
+            if url is None:
+                return
+            handed_off = False
+            try:
+                payload = self.worker(url)
+            except Exception as e:
+                self._release_host(url)
+                self._deliver(url, error=e)
+            else:
+                self._release_host(url)
+                if self._pool is not None:
+                    self._parse_slots.acquire()  # backpressure: espera hueco en el pool
+                    try:
+                        fut = self._pool.submit(self.parse, payload)
+                    except Exception as e:
+                        self._parse_slots.release()
+                        self._deliver(url, error=e)
+                    else:
+                        handed_off = True
+                        fut.add_done_callback(lambda f, u=url: self._on_parsed(u, f))
+                elif self.parse is not None:
+                    try:
+                        result = self.parse(payload)
+                    except Exception as e:
+                        self._deliver(url, error=e)
+                    else:
+                        self._deliver(url, result)
+                else:
+                    self._deliver(url, payload)
+            finally:
+                if not handed_off:
+                    self._finish()
+
+    def run(self, urls: Iterable[str]) -> Dict[str, int]:
+        if self.parse_workers:
+            # spawn: hacer fork de un proceso con hilos de red activos puede heredar locks tomados
+            self._pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            for url in urls:
+                self._admit(url)
+            with self._cond:
+                while self._admitted > 0:
+                    self._cond.wait()
+        finally:
+            for _ in threads:
+                self._ready.put(None)
+            for t in threads:
+                t.join()
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        return dict(self.stats)
@@ -0,0 +1,179 @@
+# opun_seo_lite/dedupe.py
+"""
+Detección de contenido casi duplicado en un crawl (SimHash-64 + LSH por bandas).
+
+  - simhash(index): huella de 64 bits del texto visible a partir de shingles de
+    3 palabras (TokenIndex ya tokenizado y plegado). Hash estable entre
+    procesos y ejecuciones (blake2b por término + mezcla splitmix64 vectorizada),
+    así que se calcula en el pool de parseo y se guarda en el JSON de la página.
+  - NearDuplicateIndex: dos huellas a distancia de Hamming ≤ 3 comparten al
+    menos una de las 4 bandas de 16 bits (palomar), así que solo se comparan
+    las páginas que caen en el mismo cubo; las huellas idénticas se agrupan
+    antes. Los clusters salen de un union-find. Memoria por página: la huella,
+    un id y 4 entradas de cubo, apto para 100k páginas.
+"""
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from token_index import TokenIndex
+
+SHINGLE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_HAMMING = 3            # ≤ BANDS - 1 para que el palomar garantice el candidato
+THIN_WORDS = 150           # por debajo: contenido escaso
+_CHUNK = 1 << 16           # shingles por bloque al sumar bits (memoria acotada en páginas enormes)
+
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_P1 = np.uint64(0x9E3779B97F4A7C15)
+_P2 = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """Finalizador splitmix64 (vectorizado, aritmética uint64 con desbordamiento)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * _M1
+    x = x ^ (x >> np.uint64(27))
+    x = x * _M2
+    return x ^ (x >> np.uint64(31))
+
+
+def simhash(index: TokenIndex) -> int:
+    """SimHash-64 de los shingles de SHINGLE palabras (unigramas si la página es más corta)."""
+    if not index.n_tokens:
+        return 0
+    term_h = np.fromiter((_term_hash(t) for t in index.terms), dtype=np.uint64, count=len(index.terms))
+    seq = term_h[index.ids]
+    with np.errstate(over="ignore"):
+        if len(seq) >= SHINGLE:
+            h = seq[: len(seq) - 2] * _P1 + seq[1: len(seq) - 1] * _P2 + seq[2:]
+        else:
+            h = seq
+        h = _mix(h)
+    ones = np.zeros(64, dtype=np.int64)
+    for i in range(0, len(h), _CHUNK):
+        bits = np.unpackbits(h[i:i + _CHUNK].view(np.uint8).reshape(-1, 8), axis=1)
+        ones += bits.sum(axis=0, dtype=np.int64)
+    fp = np.packbits(ones * 2 > len(h)).view(np.uint64)[0]
+    return int(fp)
+
+
+def simhash_text(text: Optional[str]) -> int:
+    return simhash(TokenIndex.from_text(text))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def make(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x: int) -> int:
+        p = self.parent
+        while p[x] != x:
+            p[x] = p[p[x]]  # compresión por mitades
+            x = p[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class NearDuplicateIndex:
+    """
+    idx = NearDuplicateIndex()
+    for url, fp, words in páginas: idx.add(url, fp, words)
+    idx.clusters()  → [[url, url, ...], ...] (≥ 2 páginas, los más grandes primero)
+    Las páginas sin texto (fp 0 / 0 palabras) no se agrupan.
+    """
+    def __init__(self, max_hamming: int = MAX_HAMMING):
+        if max_hamming >= BANDS:
+            raise ValueError(f"max_hamming debe ser < {BANDS} con {BANDS} bandas")
+        self.max_hamming = max_hamming
+        self.urls: List[str] = []
+        self._uf = UnionFind()
+        self._by_fp: Dict[int, int] = {}               # huella → nodo representante
+        self._fps: List[int] = []                      # huella de cada nodo representante
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._node_of: List[int] = []                  # página → nodo
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, url: str, fingerprint: int, words: int = 0) -> None:
+        self.urls.append(url)
+        if not fingerprint or not words:
+            self._node_of.append(-1)
+            return
+        node = self._by_fp.get(fingerprint)
+        if node is not None:
+            self._node_of.append(node)  # huella idéntica: mismo nodo, sin comparar
+            return
+        node = self._uf.make()
+        self._by_fp[fingerprint] = node
+        self._fps.append(fingerprint)
+        self._node_of.append(node)
+        seen = set()
+        for b in range(BANDS):
+            band = (fingerprint >> (b * BAND_BITS)) & 0xFFFF
+            bucket = self._buckets[b][band]
+            for other in bucket:
+                if other in seen:
+                    continue
+                seen.add(other)
+                self.comparisons += 1
+                if hamming(fingerprint, self._fps[other]) <= self.max_hamming:
+                    self._uf.union(node, other)
+            bucket.append(node)
+
+    def clusters(self, min_size: int = 2) -> List[List[str]]:
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for page, node in enumerate(self._node_of):
+            if node >= 0:
+                groups[self._uf.find(node)].append(page)
+        out = [g for g in groups.values() if len(g) >= min_size]
+        out.sort(key=lambda g: (-len(g), g[0]))
+        return [[self.urls[p] for p in g] for g in out]
+
+
+def duplicate_issues(pages: Iterable[dict], max_hamming: int = MAX_HAMMING,
+                     max_listed: int = 3) -> Dict[str, List[dict]]:
+    """
+    {url: [issue, ...]} de clusters de casi duplicados a partir de resultados de
+    crawl con "url", "simhash" (hex) y "word_count" (ver cli._parse_one).
+    Cada issue lista como mucho `max_listed` otras páginas: O(n) en total.
+    """
+    idx = NearDuplicateIndex(max_hamming)
+    for p in pages:
+        fp = p.get("simhash")
+        idx.add(p["url"], int(fp, 16) if fp else 0, p.get("word_count", 0))
+    issues: Dict[str, List[dict]] = defaultdict(list)
+    for n, urls in enumerate(idx.clusters(), start=1):
+        head = urls[:max_listed + 1]  # basta para listar `max_listed` otras sin recorrer el cluster
+        more = " …" if len(urls) - 1 > max_listed else ""
+        for u in urls:
+            others = [x for x in head if x != u][:max_listed]
+            issues[u].append({
+                "category": "content",
+                "severity": "warn",
+                "message": f"Contenido casi duplicado (cluster {n}, {len(urls)} páginas): "
+                           + ", ".join(others) + more,
+            })
+    return issues
@@ -3,6 +3,9 @@ import requests, ssl, certifi
 from urllib3.util import Retry
 from requests.adapters import HTTPAdapter
 
+import http_cache
+import ratelimit
+
 # UA y cabeceras "de navegador"
 BROWSER_HEADERS = {
     "User-Agent": (
@@ -49,5 +52,13 @@ _session.mount("http://", HTTPAdapter(max_retries=retries))
 
 def get(url: str, timeout: int = 20) -> requests.Response:
     # Nota: verify y certs los maneja el adapter con certifi
-    resp = _session.get(url, headers=BROWSER_HEADERS, timeout=(10, timeout), allow_redirects=True)
+    cache = http_cache.get_cache()
+    entry = cache.lookup(url) if cache else None
+    headers = {**BROWSER_HEADERS, **http_cache.HttpCache.conditional_headers(entry)}
+    with ratelimit.limited(url) as report:
+        resp = _session.get(url, headers=headers, timeout=(10, timeout), allow_redirects=True)
+        report(status=resp.status_code, ttfb_ms=int(resp.elapsed.total_seconds() * 1000),
+               retry_after=resp.headers.get("Retry-After"))
+    if cache:
+        resp = cache.finalize(url, entry, resp)
     return resp
@@ -0,0 +1,251 @@
+# opun_seo_lite/frontier.py
+"""
+Frontera de crawl con descubrimiento de enlaces:
+  - canonical_url(): utils.normalize_url + host en minúsculas, sin puerto por
+    defecto ni fragmento y sin parámetros de tracking (serp_service.TRACK_PARAMS)
+  - SeenSet: set exacto hasta `exact_limit` URLs y, a partir de ahí, filtro de
+    Bloom de tamaño fijo (memoria plana en sitios de millones de URLs; un falso
+    positivo solo hace que una URL nueva no se visite)
+  - Frontier: cola BFS con alcance (mismo host o prefijo de las semillas),
+    profundidad máxima y tope de páginas; alimenta a ConcurrentCrawler.run()
+    mientras haya URLs en cola o páginas en curso que puedan descubrir más.
+"""
+import hashlib
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from serp_service import strip_tracking_query
+from utils import normalize_url
+
+SCOPES = ("host", "prefix")
+SKIP_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".avif", ".bmp",
+    ".css", ".js", ".json", ".xml", ".txt", ".pdf", ".zip", ".gz", ".rar", ".7z",
+    ".mp3", ".mp4", ".webm", ".avi", ".mov", ".woff", ".woff2", ".ttf", ".eot",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".exe", ".dmg",
+}
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_EXHAUSTED = object()
+
+
+def canonical_url(link: str, base: Optional[str] = None) -> Optional[str]:
+    """Forma canónica para deduplicar, o None si no es una URL http(s) rastreable."""
+    link = (link or "").strip()
+    if not link:
+        return None
+    if base:
+        link = urljoin(base, link)
+    p = urlparse(link)
+    if p.scheme and p.scheme.lower() not in _DEFAULT_PORTS:
+        return None  # mailto:, tel:, javascript:, data:...
+    p = urlparse(normalize_url(link))
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").rstrip(".")
+    if not host:
+        return None
+    netloc = host
+    if p.port and str(p.port) != _DEFAULT_PORTS[scheme]:
+        netloc = f"{host}:{p.port}"
+    if p.username:
+        netloc = f"{p.username}{':' + p.password if p.password else ''}@{netloc}"
+    return urlunparse((scheme, netloc, p.path or "/", p.params, strip_tracking_query(p.query), ""))
+
+
+class BloomFilter:
+    """Bloom de `capacity` elementos con tasa de falsos positivos `error_rate` (bits en un bytearray)."""
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, int(capacity))
+        self.bits_n = max(64, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.bits_n / self.capacity * math.log(2))))
+        self._bits = bytearray((self.bits_n + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        d = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits_n for i in range(self.k)]  # doble hashing
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Añade; True si no estaba (según el filtro)."""
+        new = False
+        bits = self._bits
+        for p in self._positions(item):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class SeenSet:
+    """
+    URLs ya vistas: exacto (set) hasta `exact_limit`; al superarlo se vuelca a
+    un Bloom dimensionado para `capacity` y el set se libera.
+    """
+    def __init__(self, exact_limit: int = 200_000, capacity: int = 10_000_000, error_rate: float = 0.001):
+        self.exact_limit = int(exact_limit)
+        self.capacity = int(capacity)
+        self.error_rate = error_rate
+        self._exact: Optional[set] = set()
+        self._bloom: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self) -> bool:
+        return self._bloom is None
+
+    def __len__(self) -> int:
+        return len(self._exact) if self._bloom is None else self._bloom.count
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._exact if self._bloom is None else url in self._bloom
+
+    def add(self, url: str) -> bool:
+        """True si `url` es nueva (y queda registrada)."""
+        with self._lock:
+            if self._bloom is not None:
+                return self._bloom.add(url)
+            if url in self._exact:
+                return False
+            self._exact.add(url)
+            if len(self._exact) > self.exact_limit:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(self._exact)), self.error_rate)
+                for u in self._exact:
+                    self._bloom.add(u)
+                self._exact = None
+            return True
+
+
+class Frontier:
+    """
+    fr = Frontier(seeds, scope="host", max_depth=3, max_pages=1000)
+    engine.run(fr)                     # itera URLs según se van descubriendo
+    on_result → fr.done(url, links)    # encola los enlaces de la página
+    on_error  → fr.done(url)
+    La iteración termina cuando no queda nada en cola ni en curso, o al llegar a max_pages.
+    Las semillas se consumen perezosamente (un generador de sitemap no se agota
+    por adelantado) y se emiten antes que los enlaces descubiertos. Su host o
+    prefijo entra en el alcance al emitirse: un enlace hacia el host de una
+    semilla que aún no ha salido cuenta como fuera de alcance.
+    """
+    def __init__(self, seeds: Iterable[str], scope: str = "host", max_depth: int = 3,
+                 max_pages: Optional[int] = None, seen: Optional[SeenSet] = None):
+        if scope not in SCOPES:
+            raise ValueError(f"scope debe ser uno de {SCOPES}")
+        self.scope = scope
+        self.max_depth = max(0, int(max_depth))
+        self.max_pages = max_pages
+        self.seen = seen or SeenSet()
+        self._queue: deque = deque()
+        self._inflight: Dict[str, int] = {}   # URL emitida → profundidad (solo las que están en curso)
+        self._cond = threading.Condition()
+        self.issued = 0
+        self.stats = {"discovered": 0, "out_of_scope": 0, "too_deep": 0, "skipped_ext": 0}
+        self._hosts = set()
+        self._prefixes: List[str] = []
+        self._seeds: Optional[Iterator[str]] = iter(seeds)
+
+    def _add_scope(self, url: str) -> None:
+        p = urlparse(url)
+        self._hosts.add(p.netloc)
+        pre = urlunparse((p.scheme, p.netloc, p.path.rsplit("/", 1)[0] + "/", "", "", ""))
+        if pre not in self._prefixes:  # semillas de un sitemap: miles de URLs, pocos prefijos
+            self._prefixes.append(pre)
+
+    def _next_seed(self) -> Optional[str]:
+        """Siguiente semilla nueva (canónica) con su alcance registrado; None si se agotaron."""
+        while self._seeds is not None:
+            # fuera del lock: el generador puede bloquear (sitemaps) mientras los workers llaman a done()
+            s = next(self._seeds, _EXHAUSTED)
+            if s is _EXHAUSTED:
+                self._seeds = None
+                break
+            u = canonical_url(s)
+            if not u:
+                continue
+            with self._cond:
+                self._add_scope(u)
+                if self.seen.add(u):
+                    self.stats["discovered"] += 1
+                    return u
+        return None
+
+    def in_scope(self, url: str) -> bool:
+        if self.scope == "host":
+            return urlparse(url).netloc in self._hosts
+        return any(url.startswith(pre) for pre in self._prefixes)
+
+    def _push(self, url: str, depth: int) -> None:
+        if self.seen.add(url):
+            self._queue.append((url, depth))
+            self.stats["discovered"] += 1
+
+    def add_links(self, links: Iterable[str], parent_depth: int, base: Optional[str] = None) -> int:
+        """Encola los enlaces en alcance a profundidad parent_depth + 1; devuelve cuántos son nuevos."""
+        depth = parent_depth + 1
+        links = list(links)
+        if depth > self.max_depth:
+            self.stats["too_deep"] += len(links)
+            return 0
+        with self._cond:
+            before = len(self._queue)
+            for link in links:
+                u = canonical_url(link, base)
+                if not u:
+                    continue
+                if not self.in_scope(u):
+                    self.stats["out_of_scope"] += 1
+                    continue
+                path = urlparse(u).path.lower()
+                if any(path.endswith(ext) for ext in SKIP_EXTENSIONS):
+                    self.stats["skipped_ext"] += 1
+                    continue
+                self._push(u, depth)
+            self._cond.notify_all()
+            return len(self._queue) - before
+
+    def done(self, url: str, links: Optional[Iterable[str]] = None, final_url: Optional[str] = None) -> None:
+        """Cierra una URL emitida; `links` (ya absolutos o relativos a final_url) se encolan."""
+        with self._cond:
+            depth = self._inflight.pop(url, 0)
+            if final_url:
+                u = canonical_url(final_url)
+                if u:
+                    self.seen.add(u)  # tras un redirect, el destino cuenta como visto
+            if links:
+                self.add_links(links, depth, base=final_url or url)
+            self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            if self._seeds is not None and not (self.max_pages and self.issued >= self.max_pages):
+                u = self._next_seed()
+                if u is not None:
+                    with self._cond:
+                        self._inflight[u] = 0
+                        self.issued += 1
+                    yield u
+                    continue
+            with self._cond:
+                while not self._queue and self._inflight:
+                    self._cond.wait()
+                if not self._queue or (self.max_pages and self.issued >= self.max_pages):
+                    return
+                url, depth = self._queue.popleft()
+                self._inflight[url] = depth
+                self.issued += 1
+            yield url
@@ -0,0 +1,149 @@
+# opun_seo_lite/head_extract.py
+"""
+Extractor rápido del <head>: parser incremental (html.parser.HTMLParser, estilo SAX)
+que lee el documento por trozos y se detiene en </head> o en el primer contenido
+de <body>, sin construir ningún árbol. Devuelve title, description, robots,
+canonical, Open Graph, Twitter y hreflang.
+
+Pensado para ir junto a una descarga parcial (HEAD_MAX_BYTES): las auditorías
+social y de metadatos no necesitan los megas del body.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, Optional
+
+HEAD_MAX_BYTES = 128 * 1024   # descarga parcial suficiente para casi cualquier <head>
+FEED_CHUNK = 16 * 1024
+
+# Etiquetas válidas dentro de <head>; cualquier otra abre implícitamente el body
+_HEAD_TAGS = {"html", "head", "title", "meta", "link", "base", "style", "script", "noscript", "template"}
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.I)
+
+
+class _HeadDone(Exception):
+    pass
+
+
+class HeadExtractor(HTMLParser):
+    """Acumula metadatos del <head>; `done` pasa a True al salir del head."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self.title = None
+        self.meta: Dict[str, str] = {}      # name/property en minúsculas → content (primera aparición)
+        self.canonical = ""
+        self.hreflang = []
+        self._in_title = False
+        self._title_parts = []
+        self._noscript = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "noscript":
+            self._noscript += 1
+        if tag not in _HEAD_TAGS:
+            if self._noscript:
+                return  # <noscript><img …></noscript> de píxeles de seguimiento en el head
+            self._finish()
+        a = {k.lower(): (v or "") for k, v in attrs}
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            key = (a.get("name") or a.get("property") or "").strip().lower()
+            if key and key not in self.meta:
+                self.meta[key] = a.get("content", "").strip()
+        elif tag == "link":
+            rel = a.get("rel", "").lower().split()
+            href = a.get("href", "").strip()
+            if "canonical" in rel and href and not self.canonical:
+                self.canonical = href
+            elif "alternate" in rel and a.get("hreflang") and href:
+                self.hreflang.append({"lang": a["hreflang"].strip(), "href": href})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "noscript":
+            self._noscript = max(0, self._noscript - 1)
+        elif tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = re.sub(r"\s+", " ", "".join(self._title_parts)).strip()
+        elif tag == "head":
+            self._finish()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+        elif data.strip() and not self.cdata_elem and not self._noscript:
+            # texto suelto fuera de title/script/style: ya es contenido del body
+            self._finish()
+
+    def _finish(self):
+        self.done = True
+        raise _HeadDone()
+
+    def feed(self, data: str) -> bool:
+        """Alimenta un trozo; devuelve True cuando el head ya está completo."""
+        if self.done:
+            return True
+        try:
+            super().feed(data)
+        except _HeadDone:
+            pass
+        return self.done
+
+    def result(self) -> Dict:
+        if self.title is None and self._title_parts:
+            self.title = re.sub(r"\s+", " ", "".join(self._title_parts)).strip()
+        m = self.meta
+        return {
+            "title": self.title or "",
+            "description": m.get("description", ""),
+            "robots": m.get("robots", "").lower(),
+            "canonical": self.canonical,
+            "og": {k: v for k, v in m.items() if k.startswith("og:")},
+            "twitter": {k: v for k, v in m.items() if k.startswith("twitter:")},
+            "hreflang": self.hreflang,
+            "complete": self.done,
+        }
+
+
+def sniff_encoding(data: bytes, declared: Optional[str] = None) -> str:
+    """Charset de la cabecera, BOM o <meta charset>; utf-8 por defecto."""
+    if data.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for candidate in (declared, *(m.decode("ascii") for m in _META_CHARSET.findall(data[:2048])[:1])):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+
+def extract_head(data, encoding: Optional[str] = None) -> Dict:
+    """
+    Metadatos del <head> de `data` (bytes o str). Decodifica y parsea por trozos
+    y deja de leer en cuanto el head termina. `bytes_read` indica cuánto se consumió.
+    """
+    parser = HeadExtractor()
+    decode = None
+    if not isinstance(data, str):
+        decode = codecs.getincrementaldecoder(sniff_encoding(data, encoding))(errors="replace").decode
+    pos = 0
+    while pos < len(data):
+        chunk = data[pos:pos + FEED_CHUNK]
+        pos += len(chunk)
+        if parser.feed(decode(chunk) if decode else chunk):
+            break
+    out = parser.result()
+    out["bytes_read"] = pos
+    return out
+
+
+def og_twitter_from_head(head: Dict):
+    """Mismo formato que utils.parse_og_twitter (claves fijas, '' si faltan)."""
+    og = {k: head["og"].get(k, "") for k in ["og:title", "og:description", "og:image", "og:type", "og:url", "og:site_name"]}
+    tw = {k: head["twitter"].get(k, "") for k in ["twitter:card", "twitter:title", "twitter:description", "twitter:image"]}
+    return og, tw
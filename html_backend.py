@@ -0,0 +1,134 @@
+# opun_seo_lite/html_backend.py
+"""
+Backends de parseo HTML compartidos por utils.get_html_soup y parse.soup,
+para que ambos módulos extraigan lo mismo de la misma página
+(config.HTML_PARSER_BACKEND):
+
+  html.parser   BeautifulSoup + parser de la stdlib (lento, sin dependencias)
+  lxml          BeautifulSoup + lxml (por defecto)
+
+Las auditorías trabajan con la API de BeautifulSoup, así que esos son los
+únicos backends de make_soup. `extract_signals` normaliza lo que leen las
+auditorías (title, description, robots, canonical, h1-h3, OG/Twitter,
+enlaces e imágenes) y admite además dos backends sin BeautifulSoup, solo
+para comparar en `python bench.py parsers` (paridad, tiempo y memoria):
+
+  lxml-direct   árbol lxml.html
+  lxml-stream   eventos de lxml sin árbol, memoria plana (ver stream_extract.py)
+"""
+import re
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+
+import config
+
+SOUP_BACKENDS = ("html.parser", "lxml")
+BACKENDS = SOUP_BACKENDS + ("lxml-direct", "lxml-stream")   # los que acepta extract_signals
+OG_KEYS = ("og:title", "og:description", "og:image", "og:type", "og:url", "og:site_name")
+TW_KEYS = ("twitter:card", "twitter:title", "twitter:description", "twitter:image")
+
+
+def resolve_backend(backend: Optional[str] = None, allowed=SOUP_BACKENDS) -> str:
+    name = (backend or config.HTML_PARSER_BACKEND or "lxml").strip().lower()
+    if name not in allowed:
+        raise ValueError(f"Backend HTML desconocido: {name!r} (opciones: {', '.join(allowed)})")
+    return name
+
+
+def make_soup(content, backend: Optional[str] = None) -> BeautifulSoup:
+    """BeautifulSoup con el backend configurado (html.parser o lxml)."""
+    return BeautifulSoup(content, resolve_backend(backend))
+
+
+def lxml_tree(content):
+    """Árbol lxml.html; decodifica igual que BeautifulSoup (UnicodeDammit) para no divergir en charset."""
+    import lxml.html
+
+    if isinstance(content, bytes):
+        text = UnicodeDammit(content, is_html=True).unicode_markup
+        if text is not None:
+            content = text
+    if isinstance(content, str):
+        # lxml rechaza str con declaración de encoding XML
+        content = re.sub(r"^\s*<\?xml[^>]*\?>", "", content)
+    if not content.strip():
+        content = "<html></html>"
+    return lxml.html.document_fromstring(content)
+
+
+def _collapse(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def _signals_bs4(soup: BeautifulSoup, base_url: str) -> Dict:
+    from utils import extract_links_and_images, parse_meta_tags, parse_og_twitter
+
+    meta = parse_meta_tags(soup)
+    og, tw = parse_og_twitter(soup)
+    links, images = extract_links_and_images(soup, base_url)
+    return {
+        "title": meta.get("title", ""),
+        "description": meta.get("description", ""),
+        "robots": meta.get("robots", ""),
+        "canonical": meta.get("canonical", ""),
+        "h1": meta["headings"]["h1"],
+        "h2": meta["headings"]["h2"],
+        "h3": meta["headings"]["h3"],
+        "og": og,
+        "twitter": tw,
+        "num_links": len(links),
+        "num_images": len(images),
+    }
+
+
+def _signals_lxml(tree) -> Dict:
+    """Misma semántica que parse_meta_tags/parse_og_twitter, con XPath sobre lxml."""
+    def _text(el) -> str:
+        # get_text(strip=True) de bs4: cada trozo de texto recortado y unido sin separador
+        return _collapse("".join(t.strip() for t in el.itertext()))
+
+    def _meta(attr: str, value: str, ci: bool = False, lower: bool = False) -> str:
+        for el in tree.iter("meta"):
+            v = el.get(attr)
+            if v is not None and (v.lower() == value if ci else v == value):
+                c = (el.get("content") or "").strip()
+                return c.lower() if lower else c
+        return ""
+
+    title = next(tree.iter("title"), None)
+    canonical = ""
+    for link in tree.iter("link"):
+        if link.get("href") is not None and any(r.lower() == "canonical" for r in (link.get("rel") or "").split()):
+            canonical = link.get("href").strip()
+            break
+    return {
+        "title": _text(title) if title is not None else "",
+        "description": _meta("name", "description", ci=True),
+        "robots": _meta("name", "robots", ci=True, lower=True),
+        "canonical": canonical,
+        "h1": [_text(h) for h in tree.iter("h1")],
+        "h2": [_text(h) for h in tree.iter("h2")][:10],
+        "h3": [_text(h) for h in tree.iter("h3")][:10],
+        "og": {k: _meta("property", k) for k in OG_KEYS},
+        "twitter": {k: _meta("name", k) for k in TW_KEYS},
+        "num_links": len(tree.xpath("//a[@href]")),
+        "num_images": len(tree.xpath("//img[@src]")),
+    }
+
+
+def extract_signals(content, backend: Optional[str] = None, base_url: str = "") -> Dict:
+    """Señales SEO normalizadas de `content` (bytes o str) con el backend indicado."""
+    name = resolve_backend(backend, BACKENDS)
+    if name == "lxml-direct":
+        return _signals_lxml(lxml_tree(content))
+    if name == "lxml-stream":
+        from stream_extract import extract_signals_stream
+        return extract_signals_stream(content)
+    return _signals_bs4(make_soup(content, name), base_url)
+
+
+def diff_signals(a: Dict, b: Dict) -> Dict:
+    """Campos en los que difieren dos extracciones: {campo: (a, b)}."""
+    return {k: (a.get(k), b.get(k)) for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)}
@@ -0,0 +1,196 @@
+# opun_seo_lite/http_cache.py
+"""
+Caché HTTP persistente (SQLite) con revalidación ETag / Last-Modified.
+
+Flujo en la capa de red (utils._fetch_url_core y fetch.get):
+    entry = cache.lookup(url)                       # antes de pedir
+    headers.update(cache.conditional_headers(entry))
+    resp = session.get(url, headers=headers, ...)
+    resp = cache.finalize(url, entry, resp)         # 304 → respuesta desde caché
+
+Siempre se revalida contra el origen (nunca se sirve sin preguntar), así que
+el contenido auditado es el actual; lo que se ahorra son los bytes del cuerpo.
+Tamaño limitado con expulsión LRU y contadores por ejecución.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url           TEXT PRIMARY KEY,
+    final_url     TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    headers       TEXT NOT NULL,
+    body          BLOB NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    size          INTEGER NOT NULL,
+    stored_at     REAL NOT NULL,
+    last_access   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+"""
+
+# Cabeceras que un 304 puede actualizar sobre la respuesta guardada
+_UPDATABLE = ("etag", "last-modified", "cache-control", "expires", "date", "vary", "age")
+
+
+class HttpCache:
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.reset_stats()
+
+    # ---- contadores por ejecución ----
+    def reset_stats(self) -> None:
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size_bytes": self._total}
+
+    # ---- lectura / validadores ----
+    def lookup(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT final_url, status, headers, body, etag, last_modified FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        final_url, status, headers, body, etag, last_modified = row
+        return {
+            "url": url,
+            "final_url": final_url,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        h = {}
+        if entry.get("etag"):
+            h["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            h["If-Modified-Since"] = entry["last_modified"]
+        return h
+
+    # ---- escritura ----
+    def store(self, url: str, resp: requests.Response) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if resp.status_code != 200 or not (etag or last_modified):
+            return
+        if "no-store" in (resp.headers.get("Cache-Control") or "").lower():
+            return
+        if getattr(resp, "truncated", False) or getattr(resp, "body_skipped", False):
+            return  # cuerpo incompleto: no sirve para revalidar
+        body = resp.content or b""
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, resp.url, resp.status_code, json.dumps(dict(resp.headers)), body,
+                 etag, last_modified, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._stats["stores"] += 1
+            self._evict_locked()
+            self._db.commit()
+
+    def _evict_locked(self) -> None:
+        """LRU: borra por last_access más antiguo hasta quedar bajo max_bytes."""
+        while self._total > self.max_bytes:
+            victims = self._db.execute(
+                "SELECT url, size FROM responses ORDER BY last_access ASC LIMIT 32"
+            ).fetchall()
+            if not victims:
+                self._total = 0
+                return
+            for url, size in victims:
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total -= size
+                self._stats["evictions"] += 1
+                if self._total <= self.max_bytes:
+                    break
+
+    def finalize(self, url: str, entry: Optional[dict], resp: requests.Response) -> requests.Response:
+        """
+        Tras la petición condicional: si el origen respondió 304 devuelve la
+        respuesta guardada (con cabeceras actualizadas); si no, guarda la nueva.
+        """
+        if entry is not None and resp.status_code == 304:
+            cached = self._from_entry(entry, resp)
+            with self._lock:
+                self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += len(cached.content)
+            return cached
+        with self._lock:
+            self._stats["misses"] += 1
+        self.store(url, resp)
+        return resp
+
+    @staticmethod
+    def _from_entry(entry: dict, not_modified: requests.Response) -> requests.Response:
+        r = requests.Response()
+        headers = CaseInsensitiveDict(entry["headers"])
+        for k in _UPDATABLE:
+            if k in not_modified.headers:
+                headers[k] = not_modified.headers[k]
+        r.status_code = entry["status"]
+        r.headers = headers
+        r.url = entry["final_url"]
+        r._content = entry["body"]
+        r._content_consumed = True
+        r.encoding = requests.utils.get_encoding_from_headers(headers)
+        r.elapsed = not_modified.elapsed
+        r.history = not_modified.history
+        r.request = not_modified.request
+        r.timing = getattr(not_modified, "timing", None)
+        r.from_cache = True
+        r.truncated = False
+        r.body_skipped = False
+        return r
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Instancia global según config (None si ENABLE_HTTP_CACHE está apagado)."""
+    global _cache
+    if not config.ENABLE_HTTP_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(
+                os.path.join(config.HTTP_CACHE_DIR, "http.sqlite"),
+                max_bytes=config.HTTP_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _cache
@@ -0,0 +1,169 @@
+# opun_seo_lite/kw_match.py
+"""
+Matcher multi-keyword compilado una vez por auditoría (autómata Aho-Corasick).
+
+Sustituye al patrón "para cada keyword × campo: re.escape + lower + re.search":
+cada campo se pasa a minúsculas una sola vez y se recorre una sola vez,
+obteniendo a la vez el tipo de coincidencia de todas las keywords.
+
+Keywords y campos se comparan plegados (text_norm.fold: NFKD + casefold +
+tipografía, y sin acentos si `strip_accents`):
+  exact    la keyword (plegada + strip) aparece sin letra/dígito pegado a los lados
+  partial  aparece como subcadena
+  none     no aparece (o texto/keyword vacíos)
+`present` es la subcadena sin strip (el antiguo _contains), `count` las
+apariciones no solapadas (densidad) y `spans` la primera aparición en el
+texto original gracias al mapa de offsets.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import config
+from text_norm import FoldedText, fold, is_word_char
+
+_RANK = {"exact": 0, "partial": 1, "none": 2}
+
+
+def best_match(types: Iterable[str]) -> str:
+    """Mejor tipo de una lista (exact > partial > none); 'none' si está vacía."""
+    return min(types, key=_RANK.__getitem__, default="none")
+
+
+class FieldScan:
+    """Resultado de recorrer un texto: tipo de match por keyword, presencia y nº de apariciones."""
+    __slots__ = ("types", "present", "counts", "spans")
+
+    def __init__(self):
+        self.types: Dict[str, str] = {}      # keyword → exact|partial (las ausentes no aparecen)
+        self.present: set = set()            # keywords presentes como subcadena
+        self.counts: Dict[str, int] = {}     # keyword → apariciones no solapadas del patrón sin strip
+        self.spans: Dict[str, Tuple[int, int]] = {}  # keyword → (inicio, fin) en el texto original
+
+    def match(self, kw: str) -> str:
+        return self.types.get(kw, "none")
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Optional[Iterable[str]], strip_accents: Optional[bool] = None):
+        self.strip_accents = config.KW_FOLD_ACCENTS if strip_accents is None else bool(strip_accents)
+        self.keywords: List[str] = list(dict.fromkeys(k for k in (keywords or []) if k))
+        self._patterns: List[str] = []
+        self._pid: Dict[str, int] = {}
+        self._exact_of: Dict[int, List[str]] = {}  # patrón (lower+strip) → keywords
+        self._raw_of: Dict[int, List[str]] = {}    # patrón (lower)       → keywords
+        self._blank: List[str] = []                 # keywords solo de espacios (patrón vacío)
+        for kw in self.keywords:
+            raw = fold(kw, self.strip_accents).text
+            stripped = raw.strip()
+            if stripped:
+                self._exact_of.setdefault(self._add(stripped), []).append(kw)
+            else:
+                self._blank.append(kw)
+            if raw:
+                self._raw_of.setdefault(self._add(raw), []).append(kw)
+        self._build()
+
+    def _add(self, pattern: str) -> int:
+        if pattern not in self._pid:
+            self._pid[pattern] = len(self._patterns)
+            self._patterns.append(pattern)
+        return self._pid[pattern]
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, pat in enumerate(self._patterns):
+            state = 0
+            for ch in pat:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(pid)
+        fail = [0] * len(goto)
+        q = deque(goto[0].values())
+        while q:
+            state = q.popleft()
+            for ch, nxt in goto[state].items():
+                q.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _occurrences(self, text: str):
+        """(pid, inicio, fin) de cada aparición de cada patrón, en una pasada."""
+        goto, fail, out, pats = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in out[state]:
+                end = i + 1
+                yield pid, end - len(pats[pid]), end
+
+    def fold(self, text: Optional[str]) -> FoldedText:
+        """Pliega un campo con los mismos parámetros que las keywords (reutilizable entre scans)."""
+        return fold(text, self.strip_accents)
+
+    def scan(self, text: Union[str, FoldedText, None]) -> FieldScan:
+        """Recorre un campo (str, o FoldedText ya plegado con self.fold) una sola vez."""
+        res = FieldScan()
+        if not text or not (self._patterns or self._blank):
+            return res
+        ft = text if isinstance(text, FoldedText) else self.fold(text)
+        t = ft.text
+        n = len(t)
+        first: Dict[int, Tuple[int, int]] = {}
+        last_end: Dict[int, int] = {}
+        counts: Dict[int, int] = {}
+        exact_pids = set()
+        seen_pids = set()
+        for pid, start, end in self._occurrences(t):
+            seen_pids.add(pid)
+            first.setdefault(pid, (start, end))
+            if start >= last_end.get(pid, 0):  # no solapadas, de izquierda a derecha (como re.findall)
+                counts[pid] = counts.get(pid, 0) + 1
+                last_end[pid] = end
+            if pid not in exact_pids and pid in self._exact_of:
+                before = t[start - 1] if start > 0 else ""
+                after = t[end] if end < n else ""
+                if not is_word_char(before) and not is_word_char(after):
+                    exact_pids.add(pid)
+        for pid in seen_pids:
+            for kw in self._exact_of.get(pid, ()):
+                res.types[kw] = "exact" if pid in exact_pids else "partial"
+                res.spans[kw] = ft.to_original(*first[pid])
+            for kw in self._raw_of.get(pid, ()):
+                res.present.add(kw)
+                res.counts[kw] = counts[pid]
+        if self._blank:
+            # patrón vacío: como re.search("", …) siempre hay match; exact si hay una frontera libre
+            padded = " " + t + " "
+            free = any(not is_word_char(a) and not is_word_char(b) for a, b in zip(padded, padded[1:]))
+            for kw in self._blank:
+                res.types[kw] = "exact" if free else "partial"
+        return res
+
+    def matrix(self, fields: Dict[str, Union[str, List[str]]]) -> Dict[str, Dict[str, Union[str, List[str]]]]:
+        """
+        Matriz keyword × campo en un recorrido por campo:
+        {kw: {campo: "exact|partial|none" | [tipo por elemento] (campos lista)}}
+        """
+        scans = {
+            name: ([self.scan(v) for v in value] if isinstance(value, (list, tuple)) else self.scan(value))
+            for name, value in fields.items()
+        }
+        return {
+            kw: {
+                name: ([s.match(kw) for s in sc] if isinstance(sc, list) else sc.match(kw))
+                for name, sc in scans.items()
+            }
+            for kw in self.keywords
+        }
@@ -0,0 +1,239 @@
+# opun_seo_lite/page_weight.py
+"""
+Peso completo de página: descubre subrecursos (CSS, JS, imágenes, preloads)
+y mide su tamaño en paralelo sin descargarlos enteros:
+  1) HEAD → Content-Length
+  2) si HEAD falla o no trae tamaño: GET con Range: bytes=0-0 → Content-Range
+  3) si el servidor ignora Range: GET en streaming contando bytes (con tope)
+La concurrencia está acotada (global y por host) y AssetCache (una
+instancia de módulo por defecto, con TTL) deduplica recursos compartidos
+entre páginas auditadas seguidas: CSS/JS/fuentes comunes se sondean una vez.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urldefrag, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import DEFAULT_HEADERS, absolutize, header_value
+
+ASSET_TIMEOUT = 10           # seconds
+ASSET_CONCURRENCY = 16
+ASSET_PER_HOST = 6           # como un navegador con HTTP/1.1
+MAX_ASSETS = 300
+STREAM_COUNT_CAP = 10_000_000  # tope al contar bytes si el servidor ignora Range
+ASSET_CACHE_TTL = 600        # s: un recurso sondeado vale para las auditorías de los próximos minutos
+ASSET_CACHE_MAX = 5000
+
+_TEXT_KINDS = {"stylesheet", "script"}  # las fuentes (woff2) ya van comprimidas
+_PRELOAD_AS = {"style": "stylesheet", "script": "script", "font": "font", "image": "image"}
+_RANGE_TOTAL = re.compile(r"/\s*(\d+)\s*$")
+
+
+def _is_compressed(headers) -> bool:
+    enc = header_value(headers, "content-encoding").lower()
+    return any(x in enc for x in ["br", "gzip", "deflate", "zstd"])
+
+
+def _is_cacheable(headers) -> bool:
+    cc = header_value(headers, "cache-control").lower()
+    if "no-store" in cc or "no-cache" in cc:
+        return False
+    return any(k in cc for k in ["max-age", "s-maxage", "immutable"]) or bool(header_value(headers, "expires"))
+
+
+def _rel(tag) -> List[str]:
+    rel = tag.get("rel") or []
+    if isinstance(rel, str):
+        rel = rel.split()
+    return [str(r).lower() for r in rel]
+
+
+def discover_subresources(soup, base_url: str) -> List[Dict[str, str]]:
+    """[{url, kind}] sin duplicados, en orden de aparición."""
+    found: Dict[str, str] = {}
+
+    def _add(href: Optional[str], kind: str):
+        href = (href or "").strip()
+        if not href or href.startswith(("data:", "blob:", "javascript:")):
+            return
+        u = urldefrag(absolutize(base_url, href))[0]
+        if u.startswith(("http://", "https://")) and u not in found:
+            found[u] = kind
+
+    if not soup:
+        return []
+    for link in soup.find_all("link", href=True):
+        rel = _rel(link)
+        if "stylesheet" in rel:
+            _add(link["href"], "stylesheet")
+        elif "preload" in rel or "modulepreload" in rel:
+            _add(link["href"], _PRELOAD_AS.get((link.get("as") or "").lower(), "script" if "modulepreload" in rel else "other"))
+    for script in soup.find_all("script", src=True):
+        _add(script["src"], "script")
+    for img in soup.find_all("img"):
+        src = img.get("src") or (img.get("srcset") or "").split(",")[0].strip().split(" ")[0]
+        _add(src, "image")
+    return [{"url": u, "kind": k} for u, k in found.items()]
+
+
+class AssetCache:
+    """Resultados de sondeo por URL, compartidos entre páginas (thread-safe, con TTL y tope de entradas)."""
+    def __init__(self, ttl: float = ASSET_CACHE_TTL, max_entries: int = ASSET_CACHE_MAX):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._data: Dict[str, tuple] = {}   # url → (instante, info), en orden de inserción
+        self.hits = 0
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(url)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._data[url]
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, url: str, info: dict) -> None:
+        with self._lock:
+            self._data.pop(url, None)
+            self._data[url] = (time.monotonic(), info)
+            while len(self._data) > self.max_entries:
+                del self._data[next(iter(self._data))]  # la más antigua
+
+
+_asset_cache = AssetCache()
+
+
+def get_asset_cache() -> AssetCache:
+    """Instancia de módulo que usa analyze_page_weight si no se le pasa otra."""
+    return _asset_cache
+
+
+def _build_asset_session(pool_size: int) -> requests.Session:
+    s = requests.Session()
+    retries = Retry(total=1, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                    allowed_methods=["GET", "HEAD"], raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({**DEFAULT_HEADERS, "Accept": "*/*", "Connection": "keep-alive"})
+    return s
+
+
+def probe_asset(sess: requests.Session, url: str) -> dict:
+    """Tamaño de transferencia + compresión/caché de un recurso, sin descargarlo entero."""
+    info = {"url": url, "status": None, "bytes": None, "content_type": "", "compressed": False,
+            "cacheable": False, "cache_control": "", "method": "", "error": None}
+    try:
+        r = sess.head(url, timeout=ASSET_TIMEOUT, allow_redirects=True)
+        info["method"] = "HEAD"
+        size = header_value(r.headers, "content-length")
+        if r.status_code < 400 and size.isdigit():
+            info["bytes"] = int(size)
+        else:
+            r = sess.get(url, timeout=ASSET_TIMEOUT, allow_redirects=True, stream=True,
+                         headers={"Range": "bytes=0-0"})
+            info["method"] = "GET-range"
+            try:
+                m = _RANGE_TOTAL.search(header_value(r.headers, "content-range"))
+                size = header_value(r.headers, "content-length")
+                if r.status_code == 206 and m:
+                    info["bytes"] = int(m.group(1))
+                elif size.isdigit():
+                    info["bytes"] = int(size)
+                else:
+                    # ni Range ni Content-Length: contamos en streaming (bytes en la red)
+                    info["method"] = "GET-stream"
+                    n = 0
+                    for chunk in r.raw.stream(64 * 1024, decode_content=False):
+                        n += len(chunk)
+                        if n >= STREAM_COUNT_CAP:
+                            break
+                    info["bytes"] = n
+            finally:
+                r.close()
+        info["status"] = 200 if r.status_code == 206 else r.status_code
+        info["content_type"] = header_value(r.headers, "content-type").split(";")[0].strip()
+        info["compressed"] = _is_compressed(r.headers)
+        info["cache_control"] = header_value(r.headers, "cache-control")
+        info["cacheable"] = _is_cacheable(r.headers)
+    except requests.RequestException as e:
+        info["error"] = f"{e.__class__.__name__}"
+    return info
+
+
+def analyze_page_weight(
+    soup,
+    base_url: str,
+    html_bytes: int = 0,
+    concurrency: int = ASSET_CONCURRENCY,
+    per_host: int = ASSET_PER_HOST,
+    cache: Optional[AssetCache] = None,
+    max_assets: int = MAX_ASSETS,
+) -> Dict:
+    """
+    Peso total (HTML + subrecursos), desglose por tipo, recursos más pesados y
+    compresión/caché por recurso. Los recursos ya vistos en `cache` (por defecto
+    get_asset_cache()) no se piden otra vez.
+    """
+    if cache is None:
+        cache = get_asset_cache()
+    assets = discover_subresources(soup, base_url)
+    skipped = max(0, len(assets) - max_assets)
+    assets = assets[:max_assets]
+
+    host_slots: Dict[str, threading.Semaphore] = defaultdict(lambda: threading.Semaphore(per_host))
+    slots_lock = threading.Lock()
+
+    def _probe(sess, asset):
+        cached = cache.get(asset["url"])
+        if cached is not None:
+            return {**cached, "kind": asset["kind"], "from_batch_cache": True}
+        host = urlparse(asset["url"]).netloc.lower()
+        with slots_lock:
+            sem = host_slots[host]
+        with sem:
+            info = probe_asset(sess, asset["url"])
+        if not info["error"]:
+            cache.set(asset["url"], info)  # un fallo puntual no se arrastra durante el TTL
+        return {**info, "kind": asset["kind"], "from_batch_cache": False}
+
+    results: List[dict] = []
+    if assets:
+        workers = max(1, min(int(concurrency), len(assets)))
+        with _build_asset_session(workers) as sess, ThreadPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(lambda a: _probe(sess, a), assets))
+
+    by_kind: Dict[str, dict] = {}
+    for r in results:
+        k = by_kind.setdefault(r["kind"], {"count": 0, "bytes": 0})
+        k["count"] += 1
+        k["bytes"] += r["bytes"] or 0
+
+    sized = [r for r in results if r["bytes"] is not None]
+    subresource_bytes = sum(r["bytes"] for r in sized)
+    return {
+        "total_bytes": int(html_bytes or 0) + subresource_bytes,
+        "html_bytes": int(html_bytes or 0),
+        "subresource_bytes": subresource_bytes,
+        "num_assets": len(results),
+        "num_unsized": len(results) - len(sized),
+        "num_skipped": skipped,
+        "by_kind": by_kind,
+        "largest": sorted(sized, key=lambda r: r["bytes"], reverse=True)[:10],
+        "uncompressed_text": [r["url"] for r in results
+                              if r["kind"] in _TEXT_KINDS and not r["compressed"] and not r["error"]
+                              and (r["bytes"] or 0) > 1024],
+        "uncached": [r["url"] for r in results if not r["cacheable"] and not r["error"]],
+        "assets": results,
+    }
@@ -1,45 +1,95 @@
 # opun_seo_lite/parse.py
-from bs4 import BeautifulSoup
+from functools import cached_property
+
+from bs4 import BeautifulSoup, CData, NavigableString
+
+from html_backend import make_soup
+from token_index import TokenIndex
+
+_INVISIBLE = ('script', 'style', 'noscript')
 
 def soup(html: str) -> BeautifulSoup:
-    return BeautifulSoup(html, 'lxml')
+    return make_soup(html)
+
+def visible_text(s: BeautifulSoup) -> str:
+    """Texto visible sin script/style/noscript, sin modificar el árbol."""
+    parts = []
+    for node in s.find_all(string=True):
+        if type(node) not in (NavigableString, CData):
+            continue  # comentarios, doctype, etc.
+        if any(p.name in _INVISIBLE for p in node.parents):
+            continue
+        parts.append(node)
+    # compactar espacios
+    return ' '.join(' '.join(parts).split())
+
+class ParsedDocument:
+    """
+    Un solo parseo por página: cada campo se calcula la primera vez que se
+    pide y queda memorizado. head_info/headings/social_info/page_text
+    son envoltorios de esta clase.
+    """
+    def __init__(self, html: str):
+        self.html = html or ''
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return soup(self.html)
+
+    def _meta(self, attr: str, value: str):
+        tag = self.soup.find('meta', attrs={attr: value})
+        return tag.get('content') if tag and tag.has_attr('content') else None
+
+    @cached_property
+    def head_info(self) -> dict:
+        s = self.soup
+        title = s.title.string.strip() if s.title and s.title.string else None
+        meta_description = self._meta('name', 'description')
+        link = s.find('link', attrs={'rel':'canonical'})
+        canonical = link.get('href') if link and link.has_attr('href') else None
+        robots = self._meta('name', 'robots')
+        meta_robots = robots.lower() if robots is not None else None
+        return {'title':title,'meta_description':meta_description,'canonical':canonical,'meta_robots':meta_robots}
+
+    @cached_property
+    def headings(self) -> dict:
+        out = {f'h{i}': [] for i in range(1,7)}
+        # una sola pasada por el árbol para los seis niveles
+        for h in self.soup.find_all(list(out)):
+            out[h.name].append(h.get_text(strip=True))
+        return out
+
+    @cached_property
+    def social_info(self) -> dict:
+        def _og(prop):
+            return self._meta('property', prop) or self._meta('name', prop)
+        return {
+            'og_title': _og('og:title'),
+            'og_description': _og('og:description'),
+            'og_image': _og('og:image'),
+            'twitter_card': self._meta('name', 'twitter:card'),
+        }
+
+    @cached_property
+    def text(self) -> str:
+        return visible_text(self.soup)
+
+    @cached_property
+    def token_index(self) -> TokenIndex:
+        return TokenIndex.from_text(self.text)
+
+def _doc(html) -> ParsedDocument:
+    return html if isinstance(html, ParsedDocument) else ParsedDocument(html)
 
 def head_info(html: str) -> dict:
-    s = soup(html)
-    title = s.title.string.strip() if s.title and s.title.string else None
-    md = s.find('meta', attrs={'name':'description'})
-    meta_description = md.get('content') if md and md.has_attr('content') else None
-    link = s.find('link', attrs={'rel':'canonical'})
-    canonical = link.get('href') if link and link.has_attr('href') else None
-    robots = s.find('meta', attrs={'name':'robots'})
-    meta_robots = robots.get('content').lower() if robots and robots.has_attr('content') else None
-    return {'title':title,'meta_description':meta_description,'canonical':canonical,'meta_robots':meta_robots}
+    return _doc(html).head_info
 
 def headings(html: str) -> dict:
-    s = soup(html)
-    out = {}
-    for i in range(1,7):
-        tag = f'h{i}'
-        out[tag] = [h.get_text(strip=True) for h in s.find_all(tag)]
-    return out
+    return _doc(html).headings
 
 def social_info(html: str) -> dict:
-    s = soup(html)
-    def _meta(p, a, v):
-        tag = s.find(p, attrs={a: v})
-        return tag.get('content') if tag and tag.has_attr('content') else None
-    og_title = _meta('meta', 'property', 'og:title') or _meta('meta', 'name', 'og:title')
-    og_desc  = _meta('meta', 'property', 'og:description') or _meta('meta', 'name', 'og:description')
-    og_image = _meta('meta', 'property', 'og:image') or _meta('meta', 'name', 'og:image')
-    tw_card  = _meta('meta', 'name', 'twitter:card')
-    return {'og_title': og_title, 'og_description': og_desc, 'og_image': og_image, 'twitter_card': tw_card}
+    return _doc(html).social_info
 
 def page_text(html: str) -> str:
     """Texto visible básico: quita script/style/noscript y normaliza espacios."""
-    s = soup(html)
-    for tag in s(['script','style','noscript']):
-        tag.decompose()
-    text = s.get_text(separator=' ')
-    # compactar espacios
-    text = ' '.join(text.split())
-    return text
+    return _doc(html).text
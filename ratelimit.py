@@ -0,0 +1,267 @@
+# opun_seo_lite/ratelimit.py
+"""
+Limitador adaptativo por host (AIMD) para la capa de red.
+
+Cada host tiene un token bucket (peticiones/s) y un tope de concurrencia:
+  - aumento aditivo (+INCREASE_RATE req/s, +1/concurrencia) mientras el TTFB se mantiene
+  - reducción multiplicativa (×DECREASE) ante 429/5xx, errores de red o TTFB al alza
+    (frente a una línea base que baja al instante y sube despacio, BASE_ALPHA)
+  - Retry-After bloquea el host hasta la fecha indicada
+  - Crawl-delay (robots.txt) fija un techo de 1/delay req/s y concurrencia 1
+`rates()` expone el estado actual por host.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import config
+
+INITIAL_RATE = 4.0          # req/s
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+INITIAL_CONCURRENCY = 4.0
+MAX_CONCURRENCY = 32.0
+INCREASE_RATE = 0.5         # req/s por respuesta sana
+DECREASE = 0.5              # factor multiplicativo ante señal de saturación
+LATENCY_FACTOR = 2.0        # TTFB > LATENCY_FACTOR × línea base = saturación
+DECREASE_COOLDOWN = 1.0     # s: una ráfaga de errores en vuelo cuenta como una sola señal
+EWMA_ALPHA = 0.2
+BASE_ALPHA = 0.02           # la línea base sube despacio hacia el TTFB sostenido (baja al instante)
+BACKOFF_STATUS = {429, 500, 502, 503, 504}
+
+
+def host_key(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos a esperar según Retry-After (numérico o fecha HTTP)."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    def __init__(self):
+        self.rate = INITIAL_RATE
+        self.concurrency = INITIAL_CONCURRENCY
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.crawl_delay = None
+        self.ttfb_ewma = None
+        self.ttfb_base = None
+        self.last_decrease = 0.0
+
+    def max_rate(self) -> float:
+        return min(MAX_RATE, 1.0 / self.crawl_delay) if self.crawl_delay else MAX_RATE
+
+    def max_concurrency(self) -> float:
+        return 1.0 if self.crawl_delay else MAX_CONCURRENCY
+
+    def refill(self, now: float) -> None:
+        cap = max(1.0, self.rate)
+        self.tokens = min(cap, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+def _reporter():
+    """(outcome, report): report() marca la petición como respondida; sin llamarlo cuenta como error."""
+    outcome = {"error": True}
+
+    def report(status: Optional[int] = None, ttfb_ms: Optional[int] = None, retry_after: Optional[str] = None):
+        outcome.update(error=False, status=status, ttfb_ms=ttfb_ms, retry_after=retry_after)
+
+    return outcome, report
+
+
+class HostRateLimiter:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = _HostState()
+        return st
+
+    # ---- adquisición / liberación ----
+    def _try_acquire_locked(self, st: _HostState) -> float:
+        """Toma token y hueco si hay (0.0) o devuelve cuántos segundos conviene esperar."""
+        now = time.monotonic()
+        st.refill(now)
+        if now < st.blocked_until:
+            return st.blocked_until - now
+        if st.in_flight >= int(st.concurrency):
+            return 0.1
+        if st.tokens < 1.0:
+            return (1.0 - st.tokens) / st.rate
+        st.tokens -= 1.0
+        st.in_flight += 1
+        return 0.0
+
+    def try_acquire(self, url: str) -> float:
+        """Versión sin bloqueo de acquire() (para asyncio): 0.0 si se obtuvo el hueco, si no la espera sugerida."""
+        with self._cond:
+            return self._try_acquire_locked(self._state(host_key(url)))
+
+    def acquire(self, url: str, cancel: Optional[threading.Event] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Bloquea hasta que el host tenga token y hueco de concurrencia.
+        Devuelve False si `cancel` se activa o vence `timeout`.
+        """
+        host = host_key(url)
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            st = self._state(host)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return False
+                if end is not None and time.monotonic() >= end:
+                    return False
+                wait_for = self._try_acquire_locked(st)
+                if wait_for <= 0:
+                    return True
+                # despertamos como mucho cada 100 ms para revisar cancelación
+                self._cond.wait(min(wait_for, 0.1))
+
+    def release(self, url: str, status: Optional[int] = None, ttfb_ms: Optional[int] = None,
+                retry_after: Optional[str] = None, error: bool = False) -> None:
+        """Libera el hueco y ajusta el ritmo del host según la respuesta (AIMD)."""
+        host = host_key(url)
+        with self._cond:
+            st = self._state(host)
+            st.in_flight = max(0, st.in_flight - 1)
+            now = time.monotonic()
+
+            wait_s = parse_retry_after(retry_after) if status in (429, 503) else None
+            if wait_s:
+                st.blocked_until = max(st.blocked_until, now + wait_s)
+
+            congested = error or (status in BACKOFF_STATUS)
+            if ttfb_ms is not None and not congested:
+                st.ttfb_ewma = ttfb_ms if st.ttfb_ewma is None else (1 - EWMA_ALPHA) * st.ttfb_ewma + EWMA_ALPHA * ttfb_ms
+                if st.ttfb_base is None or st.ttfb_ewma < st.ttfb_base:
+                    st.ttfb_base = st.ttfb_ewma
+                else:
+                    # mínimo con olvido: un TTFB estable más alto pasa a ser la nueva normalidad
+                    st.ttfb_base += BASE_ALPHA * (st.ttfb_ewma - st.ttfb_base)
+                if st.ttfb_ewma > LATENCY_FACTOR * max(st.ttfb_base, 50):
+                    congested = True
+
+            if congested:
+                if now - st.last_decrease >= DECREASE_COOLDOWN:
+                    st.rate = max(MIN_RATE, st.rate * DECREASE)
+                    st.concurrency = max(1.0, st.concurrency * DECREASE)
+                    st.last_decrease = now
+            else:
+                st.rate = min(st.max_rate(), st.rate + INCREASE_RATE)
+                st.concurrency = min(st.max_concurrency(), st.concurrency + 1.0 / st.concurrency)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url: str, cancel: Optional[threading.Event] = None):
+        """
+        with limiter.slot(url) as report:
+            resp = session.get(url)
+            report(status=resp.status_code, ttfb_ms=..., retry_after=resp.headers.get("Retry-After"))
+        Si el bloque lanza, cuenta como error de red. Si `cancel` se activa
+        durante la espera, lanza InterruptedError.
+        """
+        if not self.acquire(url, cancel=cancel):
+            raise InterruptedError(f"espera cancelada para {host_key(url)}")
+        outcome, report = _reporter()
+        try:
+            yield report
+        finally:
+            self._release_outcome(url, outcome)
+
+    @asynccontextmanager
+    async def slot_async(self, url: str):
+        """slot() para asyncio: la espera es asyncio.sleep, no bloquea el event loop."""
+        while True:
+            wait_for = self.try_acquire(url)
+            if wait_for <= 0:
+                break
+            await asyncio.sleep(min(wait_for, 0.1))
+        outcome, report = _reporter()
+        try:
+            yield report
+        finally:
+            self._release_outcome(url, outcome)
+
+    def _release_outcome(self, url: str, outcome: dict) -> None:
+        self.release(url, status=outcome.get("status"), ttfb_ms=outcome.get("ttfb_ms"),
+                     retry_after=outcome.get("retry_after"), error=outcome["error"])
+
+    # ---- configuración / observabilidad ----
+    def set_crawl_delay(self, host: str, seconds: Optional[float]) -> None:
+        with self._cond:
+            st = self._state(host.lower())
+            st.crawl_delay = float(seconds) if seconds else None
+            st.rate = min(st.rate, st.max_rate())
+            st.concurrency = min(st.concurrency, st.max_concurrency())
+
+    def rates(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                host: {
+                    "rate_rps": round(st.rate, 2),
+                    "concurrency": int(st.concurrency),
+                    "in_flight": st.in_flight,
+                    "ttfb_ewma_ms": None if st.ttfb_ewma is None else int(st.ttfb_ewma),
+                    "crawl_delay": st.crawl_delay,
+                    "blocked_for_s": round(max(0.0, st.blocked_until - now), 1),
+                }
+                for host, st in self._hosts.items()
+            }
+
+
+_limiter: Optional[HostRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> Optional[HostRateLimiter]:
+    """Instancia global según config (None si ENABLE_RATE_LIMIT está apagado)."""
+    global _limiter
+    if not config.ENABLE_RATE_LIMIT:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter()
+        return _limiter
+
+
+@contextmanager
+def limited(url: str, cancel: Optional[threading.Event] = None):
+    """slot() del limitador global, o un no-op si está desactivado."""
+    limiter = get_limiter()
+    if limiter is None:
+        yield lambda **_: None
+        return
+    with limiter.slot(url, cancel=cancel) as report:
+        yield report
+
+
+@asynccontextmanager
+async def limited_async(url: str):
+    """slot_async() del limitador global, o un no-op si está desactivado."""
+    limiter = get_limiter()
+    if limiter is None:
+        yield lambda **_: None
+        return
+    async with limiter.slot_async(url) as report:
+        yield report
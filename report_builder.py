@@ -306,6 +306,37 @@ def _kw_table_social(soc_kw_block: Dict) -> str:
     """
     return _table(thead + "<tbody>" + "".join(body_rows) + "</tbody>" + tfoot, min_width=820)
 
+def _weight_rows(weight: Dict) -> str:
+    if not weight:
+        return ""
+    rows = [_krow("Peso total de la página", f"{weight.get('total_readable', '—')} ({weight.get('num_assets', 0)} recursos)")]
+    for a in (weight.get("largest") or [])[:5]:
+        flags = ("comprimido" if a.get("compressed") else "sin compresión") + " · " + ("con caché" if a.get("cacheable") else "sin caché")
+        rows.append(_krow(f"↳ {a.get('kind', '')}", f"{a.get('url', '')} — {a.get('bytes', 0):,} B ({flags})"))
+    return "".join(rows)
+
+
+def _samples_row(samples: Dict) -> str:
+    if not samples.get("n"):
+        return ""
+    value = (f"{samples['n']} muestras · min {samples['min_ms']} · p50 {samples['p50_ms']} · p95 {samples['p95_ms']}"
+             f" · max {samples['max_ms']} · jitter {samples['jitter_ms']} ms")
+    if samples.get("cold_ms") is not None:
+        value += f" · frío {samples['cold_ms']} ms"
+    return _krow("TTFB muestreado", value)
+
+
+def _timing_rows(hops: List[Dict]) -> str:
+    """Una fila por salto: DNS / TCP / TLS / espera (TTFB) / descarga."""
+    rows = []
+    for i, h in enumerate(hops, 1):
+        label = f"Tiempos salto {i} ({h.get('status') or '—'})" if len(hops) > 1 else "Desglose de tiempos"
+        value = (f"DNS {h.get('dns_ms') or 0:.0f} · TCP {h.get('connect_ms') or 0:.0f} · TLS {h.get('tls_ms') or 0:.0f}"
+                 f" · espera {h.get('ttfb_ms') or 0:.0f} · descarga {h.get('download_ms') or 0:.0f} ms")
+        rows.append(_krow(label, value))
+    return "".join(rows)
+
+
 def _render_plan(plan_df: pd.DataFrame) -> str:
     if plan_df is None or plan_df.empty:
         return '<p style="color:#6b7280;">No hay tareas en el plan de acciones.</p>'
@@ -409,7 +440,10 @@ def build_html_report(
     # --------- Rendimiento (mini WPO) ----------
     perf_rows = "".join([
         _krow("TTFB (ms)", str(perf.get("ttfb_ms","—")), perf.get("ttfb_status")),
+        _samples_row(perf.get("ttfb_samples") or {}),
+        _timing_rows(perf.get("timing_hops") or []),
         _krow("Peso HTML", perf.get("html_size_readable","—")),
+        _weight_rows(perf.get("page_weight") or {}),
         _krow("# Imágenes en HTML", str(perf.get("num_images","—"))),
         _krow("# Enlaces en HTML", str(perf.get("num_links","—"))),
         _krow("Compresión (gzip/br)", "Sí" if perf.get("compression",{}).get("value") else "No", perf.get("compression",{}).get("status")),
@@ -444,12 +478,21 @@ def build_html_report(
         _krow("URL final", rb.get("final_url") or "—"),
         _krow("Status", str(rb.get("status") or "—")),
     ])
+    if rb.get("allowed") is not None:
+        rb_rows += _krow("Permite esta URL", "Sí" if rb["allowed"] else f'No ({rb.get("rule")})',
+                         None if rb["allowed"] else "red")
+    if rb.get("crawl_delay"):
+        rb_rows += _krow("Crawl-delay", f'{rb["crawl_delay"]:g} s')
     sm_rows = "".join([
         _krow("Declarado", sm.get("declared") or "—"),
         _krow("Accesible", "Sí" if sm.get("ok") else "No"),
         _krow("URL final", sm.get("final_url") or "—"),
         _krow("Status", str(sm.get("status") or "—")),
     ])
+    if sm.get("urls") is not None:
+        sm_rows += _krow("URLs listadas", f'{sm["urls"]}{"+" if sm.get("truncated") else ""}')
+        sm_rows += _krow("Incluye esta URL", {True: "Sí", False: "No"}.get(sm.get("contains_url"), "—"),
+                         "red" if sm.get("contains_url") is False else None)
     crawl_html = f"""
     <div style="display:grid;grid-template-columns:repeat(12,1fr);gap:12px;">
       <div style="grid-column:span 6;">
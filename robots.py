@@ -0,0 +1,303 @@
+# opun_seo_lite/robots.py
+"""
+robots.txt: descarga una vez por host, caché con TTL y reglas compiladas.
+
+  - RobotsTxt.parse(): grupos por User-agent (RFC 9309), Sitemap: globales y
+    Crawl-delay por grupo. El grupo aplicable es el del token más largo que
+    sea prefijo del agente (googlebot-news → googlebot) o, si no hay, "*".
+  - RobotsRules: Allow/Disallow compilados una vez; los patrones sin comodín
+    quedan como prefijo (str.startswith) y los que llevan `*` o `$` como
+    regex. Ordenados por longitud descendente (Allow antes en empate), la
+    primera coincidencia es la regla más específica: comprobar una URL cuesta
+    microsegundos.
+  - RobotsCache: memoria + JSON en disco (config.HTTP_CACHE_DIR/robots.json)
+    con TTL; un lock por host evita descargas duplicadas desde varios hilos.
+    Al leer un robots.txt su Crawl-delay se aplica al limitador (ratelimit).
+
+Respuestas: 2xx se interpreta; 4xx = sin restricciones; 5xx = todo
+bloqueado (criterio de Google); error de red = sin restricciones, con el
+error anotado (no se persiste).
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import config
+import ratelimit
+from utils import REQUEST_TIMEOUT, _build_session
+
+MAX_ROBOTS_BYTES = 500 * 1024   # Google ignora lo que pasa de 500 KiB
+CACHE_VERSION = 1
+_PCT = re.compile(r"%[0-9a-fA-F]{2}")
+_SAFE = "/?&=:;@!$'()*+,%"
+_NEEDS_ENCODING = re.compile(r"[^A-Za-z0-9/?&=:;@!$'()*+,\-._~]")
+
+
+def _encode(s: str) -> str:
+    """Percent-encoding homogéneo para comparar reglas y rutas (no ASCII codificado, %xx en mayúsculas)."""
+    if not _NEEDS_ENCODING.search(s):
+        return s  # caso habitual: nada que codificar
+    return _PCT.sub(lambda m: m.group(0).upper(), quote(s, safe=_SAFE))
+
+
+def path_of(url: str) -> str:
+    """Ruta + query de una URL, tal como se compara con las reglas."""
+    p = urlsplit(url)
+    return _encode((p.path or "/") + (f"?{p.query}" if p.query else ""))
+
+
+def root_of(url: str) -> str:
+    p = urlsplit(url)
+    return f"{p.scheme.lower()}://{p.netloc.lower()}"
+
+
+class RobotsRules:
+    """Allow/Disallow de un grupo, compilados. match() → (allow, regla, nº de línea) o None."""
+    def __init__(self, rules: List[Tuple[bool, str, int]], crawl_delay: Optional[float] = None,
+                 disallow_all: bool = False):
+        self.crawl_delay = crawl_delay
+        self.disallow_all = disallow_all
+        compiled = []
+        for allow, pattern, line in rules:
+            pat = pattern if pattern.startswith(("/", "*")) else "/" + pattern
+            pat = _encode(re.sub(r"\*+", "*", pat))
+            if "*" in pat or pat.endswith("$"):
+                anchored = pat.endswith("$")
+                body = pat[:-1] if anchored else pat
+                rx = re.compile(".*".join(re.escape(part) for part in body.split("*")) + ("$" if anchored else ""),
+                                re.DOTALL)
+                test = rx.match
+            else:
+                test = (lambda prefix: lambda path: path.startswith(prefix))(pat)
+            compiled.append((len(pattern), allow, pattern, line, test))
+        compiled.sort(key=lambda r: (-r[0], not r[1]))  # más larga primero; Allow gana en empate
+        self._rules = [(allow, pattern, line, test) for _, allow, pattern, line, test in compiled]
+
+    def __len__(self):
+        return len(self._rules)
+
+    def match(self, path: str) -> Optional[Tuple[bool, str, int]]:
+        for allow, pattern, line, test in self._rules:
+            if test(path):
+                return allow, pattern, line
+        return None
+
+    def allowed(self, path: str) -> bool:
+        if self.disallow_all:
+            return False
+        if path == "/robots.txt":
+            return True
+        m = self.match(path)
+        return m is None or m[0]
+
+
+class RobotsTxt:
+    """robots.txt de un host (texto + estado de la descarga) y sus grupos parseados."""
+    def __init__(self, url: str, status: Optional[int] = None, text: str = "", final_url: str = "",
+                 error: Optional[str] = None, fetched_at: Optional[float] = None):
+        self.url = url
+        self.status = status
+        self.text = text or ""
+        self.final_url = final_url or url
+        self.error = error
+        self.fetched_at = fetched_at or time.time()
+        self.sitemaps: List[str] = []
+        self._groups: Dict[str, dict] = {}   # token en minúsculas → {"rules": [...], "crawl_delay": ...}
+        self._by_agent: Dict[str, RobotsRules] = {}
+        self._lock = threading.Lock()
+        if status is not None and 200 <= status < 300:
+            self._parse(self.text)
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+    def _parse(self, text: str) -> None:
+        agents: List[str] = []
+        in_rules = False
+        for n, raw in enumerate(text.splitlines(), start=1):
+            line = raw.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            key, value = (x.strip() for x in line.split(":", 1))
+            key = key.lower()
+            if key == "user-agent":
+                if in_rules:
+                    agents, in_rules = [], False
+                token = value.lower()
+                agents.append(token)
+                self._groups.setdefault(token, {"rules": [], "crawl_delay": None})
+            elif key in ("allow", "disallow"):
+                in_rules = True
+                if not value:
+                    continue  # "Disallow:" vacío no restringe nada
+                for a in agents:
+                    self._groups[a]["rules"].append((key == "allow", value, n))
+            elif key == "crawl-delay":
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for a in agents:
+                    self._groups[a]["crawl_delay"] = delay
+            elif key == "sitemap" and value:
+                self.sitemaps.append(value)
+
+    def _group_for(self, agent: str) -> Optional[dict]:
+        agent = agent.lower()
+        best = None
+        for token in self._groups:
+            if token != "*" and agent.startswith(token) and (best is None or len(token) > len(best)):
+                best = token
+        return self._groups.get(best or "*")
+
+    def rules_for(self, agent: Optional[str] = None) -> RobotsRules:
+        agent = (agent or config.ROBOTS_USER_AGENT).lower()
+        with self._lock:
+            rules = self._by_agent.get(agent)
+            if rules is None:
+                if self.status is not None and self.status >= 500:
+                    rules = RobotsRules([], disallow_all=True)
+                else:
+                    g = self._group_for(agent) or {"rules": [], "crawl_delay": None}
+                    rules = RobotsRules(g["rules"], g["crawl_delay"])
+                self._by_agent[agent] = rules
+            return rules
+
+    def check(self, url: str, agent: Optional[str] = None) -> dict:
+        """{"allowed", "rule" (texto de la regla o ""), "line"} para `url`."""
+        rules = self.rules_for(agent)
+        path = path_of(url)
+        if rules.disallow_all:
+            return {"allowed": False, "rule": f"robots.txt HTTP {self.status}", "line": None}
+        if path == "/robots.txt":
+            return {"allowed": True, "rule": "", "line": None}
+        m = rules.match(path)
+        if m is None:
+            return {"allowed": True, "rule": "", "line": None}
+        allow, pattern, line = m
+        return {"allowed": allow, "rule": f"{'Allow' if allow else 'Disallow'}: {pattern}", "line": line}
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "final_url": self.final_url, "status": self.status,
+                "text": self.text, "fetched_at": self.fetched_at}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RobotsTxt":
+        return cls(data["url"], data.get("status"), data.get("text", ""), data.get("final_url", ""),
+                   fetched_at=data.get("fetched_at"))
+
+
+def fetch_robots(root: str) -> RobotsTxt:
+    """Descarga {root}/robots.txt (tope MAX_ROBOTS_BYTES) a través del limitador."""
+    url = f"{root}/robots.txt"
+    try:
+        sess = _build_session()
+        with ratelimit.limited(url) as report:
+            resp = sess.get(url, stream=True, timeout=(10, REQUEST_TIMEOUT), allow_redirects=True)
+            report(status=resp.status_code, ttfb_ms=int(resp.elapsed.total_seconds() * 1000))
+        try:
+            body = resp.raw.read(MAX_ROBOTS_BYTES, decode_content=True) if resp.status_code < 300 else b""
+        finally:
+            resp.close()
+    except Exception as e:
+        return RobotsTxt(url, None, error=f"{e}")
+    return RobotsTxt(url, resp.status_code, body.decode("utf-8", errors="replace").lstrip("\ufeff"),
+                     final_url=resp.url)
+
+
+class RobotsCache:
+    """
+    robots = RobotsCache(path, ttl_s)
+    robots.get(url)            → RobotsTxt del host (descarga como mucho una vez por TTL)
+    robots.check(url)          → {"allowed", "rule", "line", "robots_url"}
+    robots.allowed(url)        → bool
+    """
+    def __init__(self, path: Optional[str] = None, ttl: float = 24 * 3600, agent: Optional[str] = None):
+        self.path = path
+        self.ttl = float(ttl)
+        self.agent = agent
+        self._mem: Dict[str, RobotsTxt] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._disk = self._load()
+        self.stats = {"fetched": 0, "from_disk": 0}
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return data.get("hosts", {}) if data.get("version") == CACHE_VERSION else {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            payload = {"version": CACHE_VERSION, "hosts": dict(self._disk)}
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    def get(self, url: str) -> RobotsTxt:
+        root = root_of(url)
+        robots = self._mem.get(root)
+        if robots is not None and self._fresh(robots.fetched_at):
+            return robots
+        with self._lock:
+            host_lock = self._host_locks.setdefault(root, threading.Lock())
+        with host_lock:
+            robots = self._mem.get(root)
+            if robots is not None and self._fresh(robots.fetched_at):
+                return robots  # otro hilo lo descargó mientras esperábamos
+            cached = self._disk.get(root)
+            if cached and self._fresh(cached.get("fetched_at") or 0):
+                robots = RobotsTxt.from_dict(cached)
+                self.stats["from_disk"] += 1
+            else:
+                robots = fetch_robots(root)
+                self.stats["fetched"] += 1
+                if robots.error is None:
+                    with self._lock:
+                        self._disk[root] = robots.to_dict()
+                    self._save()
+            self._mem[root] = robots
+        limiter = ratelimit.get_limiter()
+        delay = robots.rules_for(self.agent).crawl_delay
+        if limiter is not None and delay:
+            limiter.set_crawl_delay(ratelimit.host_key(url), delay)
+        return robots
+
+    def check(self, url: str) -> dict:
+        robots = self.get(url)
+        return {**robots.check(url, self.agent), "robots_url": robots.url}
+
+    def allowed(self, url: str) -> bool:
+        return self.get(url).rules_for(self.agent).allowed(path_of(url))
+
+
+_robots: Optional[RobotsCache] = None
+_robots_lock = threading.Lock()
+
+
+def get_robots() -> RobotsCache:
+    """Instancia global (caché en disco junto a la caché HTTP)."""
+    global _robots
+    with _robots_lock:
+        if _robots is None:
+            _robots = RobotsCache(os.path.join(config.HTTP_CACHE_DIR, "robots.json"),
+                                  ttl=config.ROBOTS_TTL_H * 3600)
+        return _robots
@@ -49,14 +49,15 @@ def _utc_now_iso() -> str:
 # -----------------------------
 #   Normalización de URLs
 # -----------------------------
-_TRACK_PARAMS = {"utm_source","utm_medium","utm_campaign","utm_term","utm_content",
-                 "gclid","fbclid","msclkid","gbraid","wbraid"}
+TRACK_PARAMS = {"utm_source","utm_medium","utm_campaign","utm_term","utm_content",
+                "gclid","fbclid","msclkid","gbraid","wbraid"}
 
-def _strip_tracking_query(query: str) -> str:
+def strip_tracking_query(query: str) -> str:
+    """Query sin parámetros de tracking (TRACK_PARAMS); también la usa frontier.canonical_url."""
     if not query:
         return ""
     pairs = parse_qsl(query, keep_blank_values=True)
-    clean = [(k, v) for (k, v) in pairs if k.lower() not in _TRACK_PARAMS]
+    clean = [(k, v) for (k, v) in pairs if k.lower() not in TRACK_PARAMS]
     return urlencode(clean, doseq=True)
 
 def normalize_url(u: str) -> Dict[str, str]:
@@ -68,7 +69,7 @@ def normalize_url(u: str) -> Dict[str, str]:
         path = p.path or "/"
         if path != "/":
             path = path.rstrip("/")
-        query = _strip_tracking_query(p.query)
+        query = strip_tracking_query(p.query)
         return {"domain": domain, "path": path, "query": query}
     except Exception:
         return {"domain": "", "path": "", "query": ""}
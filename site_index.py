@@ -0,0 +1,142 @@
+# opun_seo_lite/site_index.py
+"""
+Índice incremental de title / meta description / H1 duplicados en un sitio.
+
+Cada valor se normaliza (text_norm: NFKD + casefold + tipografía + espacios
+colapsados) y se resume en un hash de 8 bytes; el índice guarda
+hash → {valor de muestra, URLs} por campo y url → hashes, así que:
+  - add() es O(1) y se llama según termina cada página del crawl
+  - volver a añadir una URL (recrawl) sustituye sus valores anteriores
+  - issues() recorre los grupos una vez: O(n) en tiempo y memoria
+  - save()/load() en JSON para reutilizarlo en un recrawl incremental
+"""
+import hashlib
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from text_norm import fold_str
+
+FIELDS = ("title", "description", "h1")
+FIELD_LABELS = {"title": "Title duplicado", "description": "Meta description duplicada", "h1": "H1 duplicado"}
+INDEX_VERSION = 1
+SAMPLE_CHARS = 120
+
+
+def _key(value: Optional[str]) -> Optional[str]:
+    norm = " ".join(fold_str(value or "", strip_accents=False).split())
+    if not norm:
+        return None
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class DuplicateIndex:
+    def __init__(self):
+        # campo → hash → {"value": muestra, "urls": {url: None}} (dict = set ordenado)
+        self._groups: Dict[str, Dict[str, dict]] = {f: {} for f in FIELDS}
+        self._by_url: Dict[str, Dict[str, str]] = {}
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._by_url
+
+    def add(self, url: str, title: Optional[str] = None, description: Optional[str] = None,
+            h1: Optional[str] = None) -> None:
+        """Registra (o actualiza) los valores de una página; los vacíos no cuentan."""
+        self.remove(url)
+        keys = {}
+        for field, value in zip(FIELDS, (title, description, h1)):
+            k = _key(value)
+            if k is None:
+                continue
+            group = self._groups[field].get(k)
+            if group is None:
+                group = self._groups[field][k] = {"value": " ".join((value or "").split())[:SAMPLE_CHARS], "urls": {}}
+            group["urls"][url] = None
+            keys[field] = k
+        self._by_url[url] = keys
+
+    def add_result(self, result: dict) -> None:
+        """Atajo para un resultado del crawl (cli._parse_one); las páginas con error salen del índice."""
+        if (result.get("status") or 0) >= 400:
+            self.remove(result["url"])
+            return
+        h1s = (result.get("headings") or {}).get("h1") or []
+        self.add(result["url"], result.get("title"), result.get("meta_description"), h1s[0] if h1s else None)
+
+    def remove(self, url: str) -> None:
+        for field, k in (self._by_url.pop(url, None) or {}).items():
+            group = self._groups[field].get(k)
+            if group is None:
+                continue
+            group["urls"].pop(url, None)
+            if not group["urls"]:
+                del self._groups[field][k]
+
+    def groups(self, min_size: int = 2) -> Iterator[Tuple[str, str, List[str]]]:
+        """(campo, valor de muestra, urls) de cada grupo con ≥ min_size páginas."""
+        for field in FIELDS:
+            for group in self._groups[field].values():
+                if len(group["urls"]) >= min_size:
+                    yield field, group["value"], list(group["urls"])
+
+    def issues(self, max_listed: int = 3) -> Dict[str, List[dict]]:
+        """{url: [issue, ...]} con una issue por campo duplicado."""
+        out: Dict[str, List[dict]] = defaultdict(list)
+        for field, value, urls in self.groups():
+            severity = "info" if field == "h1" else "warn"
+            head = urls[:max_listed + 1]  # basta para listar `max_listed` otras sin recorrer el grupo
+            more = " …" if len(urls) - 1 > max_listed else ""
+            for u in urls:
+                others = [x for x in head if x != u][:max_listed]
+                out[u].append({
+                    "category": "duplicates",
+                    "severity": severity,
+                    "message": f"{FIELD_LABELS[field]} en {len(urls)} páginas («{value}»): {', '.join(others)}{more}",
+                })
+        return out
+
+    # ---- persistencia ----
+    def to_dict(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "groups": {
+                field: {k: {"value": g["value"], "urls": list(g["urls"])} for k, g in groups.items()}
+                for field, groups in self._groups.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DuplicateIndex":
+        idx = cls()
+        if (data or {}).get("version") != INDEX_VERSION:
+            return idx
+        for field, groups in (data.get("groups") or {}).items():
+            if field not in idx._groups:
+                continue
+            for k, g in groups.items():
+                urls = dict.fromkeys(g.get("urls") or [])
+                idx._groups[field][k] = {"value": g.get("value", ""), "urls": urls}
+                for u in urls:
+                    idx._by_url.setdefault(u, {})[field] = k
+        return idx
+
+    def save(self, path) -> None:
+        path = os.fspath(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False)
+        os.replace(tmp, path)  # atómico: un crawl interrumpido no deja el índice a medias
+
+    @classmethod
+    def load(cls, path) -> "DuplicateIndex":
+        """Índice guardado o uno vacío si no existe / no es legible."""
+        try:
+            with open(os.fspath(path), encoding="utf-8") as fh:
+                return cls.from_dict(json.load(fh))
+        except (OSError, ValueError):
+            return cls()
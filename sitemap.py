@@ -0,0 +1,350 @@
+# opun_seo_lite/sitemap.py
+"""
+Ingesta de sitemaps (urlset y sitemapindex, también .xml.gz) en streaming:
+
+  - la respuesta se lee por trozos (requests stream=True) y, si viene en gzip,
+    se descomprime al vuelo; lxml.etree.iterparse va emitiendo cada <url> /
+    <sitemap> y el elemento se libera en cuanto se lee, así que la memoria no
+    depende del tamaño del fichero (50k URLs o 50 MB descomprimidos)
+  - los sitemaps hijos de un índice se descargan en paralelo (pool de hilos);
+    las URLs pasan por una cola acotada, de modo que el consumidor (el crawler)
+    marca el ritmo: iter_sitemap_urls() es un generador de (loc, lastmod)
+  - SitemapCoverage cruza las URLs del sitemap con las rastreadas
+"""
+import gzip
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+import ratelimit
+from frontier import canonical_url
+from utils import PROBE_TTL, REQUEST_TIMEOUT, _build_session, _purge_expired
+
+SITEMAP_CONCURRENCY = 8
+MAX_SITEMAPS = 1000           # tope de ficheros por ingesta (índices anidados incluidos)
+QUEUE_MAX = 10_000            # URLs leídas y aún no consumidas por el crawler
+SAMPLE_MAX = 20               # URLs de ejemplo en el informe de cobertura
+_GZIP_MAGIC = b"\x1f\x8b"
+_DONE = object()
+
+
+class SitemapReport:
+    """Contadores de una ingesta (se rellenan mientras se consume el generador)."""
+    def __init__(self):
+        self.sitemaps: List[str] = []
+        self.urls = 0
+        self.skipped_old = 0
+        self.skipped_sitemaps = 0
+        self.errors: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, field: str, value=1) -> None:
+        """Suma `value` a un contador o lo añade a una lista (sitemaps, errors); seguro entre hilos."""
+        with self._lock:
+            current = getattr(self, field)
+            if isinstance(current, list):
+                current.append(value)
+            else:
+                setattr(self, field, current + value)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"sitemaps": list(self.sitemaps), "urls": self.urls, "skipped_old": self.skipped_old,
+                    "skipped_sitemaps": self.skipped_sitemaps, "errors": list(self.errors)}
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def parse_sitemap_stream(fileobj) -> Iterator[Tuple[str, str, str]]:
+    """
+    (tipo, loc, lastmod) de un sitemap leído de `fileobj` (binario, ya sin gzip);
+    tipo = "url" (urlset) o "sitemap" (sitemapindex). Memoria constante.
+    """
+    ctx = etree.iterparse(fileobj, events=("end",), resolve_entities=False, no_network=True,
+                          huge_tree=True, recover=True)
+    for _, elem in ctx:
+        kind = _local(elem.tag)
+        if kind in ("url", "sitemap"):
+            loc, lastmod = "", ""
+            for child in elem:
+                name = _local(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (child.text or "").strip()
+            if loc:
+                yield kind, loc, lastmod
+            # liberar lo ya leído: el elemento y sus hermanos anteriores
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+class _PeekReader:
+    """File-like de solo lectura sobre el stream crudo que permite mirar los primeros bytes."""
+    def __init__(self, raw, peek: int = 2):
+        self._raw = raw
+        self._buf = raw.read(peek) or b""
+        self.head = self._buf
+
+    def read(self, n: int = -1) -> bytes:
+        buf, self._buf = self._buf, b""
+        if n is None or n < 0:
+            return buf + self._raw.read()
+        if len(buf) >= n:
+            self._buf = buf[n:]
+            return buf[:n]
+        return buf + (self._raw.read(n - len(buf)) or b"")
+
+
+def _open_stream(raw):
+    """Stream binario del XML: descomprime si empieza por la firma gzip (.xml.gz servido sin Content-Encoding)."""
+    src = _PeekReader(raw)
+    return gzip.GzipFile(fileobj=src) if src.head == _GZIP_MAGIC else src
+
+
+def read_sitemap(url: str) -> Iterator[Tuple[str, str, str]]:
+    """Descarga `url` en streaming y emite (tipo, loc, lastmod). Lanza RuntimeError si no es 200."""
+    sess = _build_session()
+    with ratelimit.limited(url) as report:
+        resp = sess.get(url, stream=True, timeout=(10, REQUEST_TIMEOUT), allow_redirects=True)
+        report(status=resp.status_code, ttfb_ms=int(resp.elapsed.total_seconds() * 1000))
+    try:
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code} al leer el sitemap {url}")
+        resp.raw.decode_content = True  # Content-Encoding: gzip lo deshace urllib3
+        yield from parse_sitemap_stream(_open_stream(resp.raw))
+    finally:
+        resp.close()
+
+
+def _parse_lastmod(value: str) -> Optional[datetime]:
+    """W3C datetime (AAAA-MM-DD[Thh:mm[:ss][TZ]]) → datetime con zona; None si no se entiende."""
+    if not value:
+        return None
+    v = value.strip().replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(v)
+    except ValueError:
+        try:
+            dt = datetime.strptime(v[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def iter_sitemap_urls(roots: Iterable[str], concurrency: int = SITEMAP_CONCURRENCY,
+                      max_sitemaps: int = MAX_SITEMAPS, since: Optional[datetime] = None,
+                      report: Optional[SitemapReport] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Generador de (loc, lastmod) de uno o varios sitemaps/índices. Los hijos se
+    leen en paralelo; con `since` se omiten las URLs con lastmod anterior (las
+    que no tienen lastmod se incluyen). Si se deja de consumir, los hilos paran.
+    """
+    report = report if report is not None else SitemapReport()
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    out: "queue.Queue" = queue.Queue(maxsize=QUEUE_MAX)
+    cancel = threading.Event()
+    lock = threading.Lock()
+    seen = set()
+    pending = [0]
+    pool = ThreadPoolExecutor(max_workers=max(1, int(concurrency)))
+
+    def put(item) -> bool:
+        while not cancel.is_set():
+            try:
+                out.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def submit(url: str) -> None:
+        with lock:
+            if url in seen:
+                return
+            if len(seen) >= max_sitemaps:
+                report.add("skipped_sitemaps")
+                return
+            seen.add(url)
+            pending[0] += 1
+        pool.submit(work, url)
+
+    def work(url: str) -> None:
+        try:
+            report.add("sitemaps", url)
+            for kind, loc, lastmod in read_sitemap(url):
+                if cancel.is_set():
+                    return
+                if kind == "sitemap":
+                    submit(loc)
+                    continue
+                if since is not None:
+                    dt = _parse_lastmod(lastmod)
+                    if dt is not None and dt < since:
+                        report.add("skipped_old")
+                        continue
+                if not put((loc, lastmod)):
+                    return
+        except Exception as e:
+            report.add("errors", {"url": url, "error": f"{e}"})
+        finally:
+            with lock:
+                pending[0] -= 1
+                last = pending[0] == 0
+            if last:
+                put(_DONE)
+
+    try:
+        for root in roots:
+            submit(root)
+        if not seen:
+            return
+        while True:
+            item = out.get()
+            if item is _DONE:
+                return
+            report.add("urls")
+            yield item
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SitemapCoverage:
+    """
+    Cobertura sitemap ↔ crawl sobre URLs canónicas (frontier.canonical_url):
+      add_listed(url)                     según se leen del sitemap
+      add_crawled(url, status, final_url) según termina cada página
+    """
+    def __init__(self):
+        self._listed: Dict[str, str] = {}     # URL canónica → lastmod
+        self._crawled: Dict[str, int] = {}
+        self._redirected: Dict[str, str] = {}
+
+    def add_listed(self, url: str, lastmod: str = "") -> None:
+        u = canonical_url(url)
+        if u:
+            self._listed[u] = lastmod or ""
+
+    def lastmod(self, url: str) -> Optional[str]:
+        """lastmod declarado ("" si no tiene) o None si la URL no está en el sitemap."""
+        u = canonical_url(url)
+        return self._listed.get(u) if u else None
+
+    def add_crawled(self, url: str, status: Optional[int] = None, final_url: Optional[str] = None) -> None:
+        u = canonical_url(url)
+        if not u:
+            return
+        self._crawled[u] = int(status or 0)
+        f = canonical_url(final_url) if final_url else None
+        if f and f != u:
+            self._redirected[u] = f
+
+    def issues_for(self, url: str, result: dict) -> List[dict]:
+        """Issues de un resultado del crawl (cli._parse_one) pedido como `url`, si está en el sitemap."""
+        if self.lastmod(url) is None:
+            return []
+        out = []
+        if result.get("robots_blocked"):
+            out.append({"category": "sitemap", "severity": "error",
+                        "message": f"URL del sitemap bloqueada por robots.txt ({result['robots_blocked']})"})
+        status = result.get("status") or 0
+        if status >= 400:
+            out.append({"category": "sitemap", "severity": "error",
+                        "message": f"URL del sitemap responde {status}"})
+        requested = canonical_url(url)
+        final = canonical_url(result["url"])
+        if requested and final and requested != final:
+            out.append({"category": "sitemap", "severity": "warn",
+                        "message": f"URL del sitemap redirige a {final}"})
+        if "noindex" in (result.get("meta_robots") or "").lower():
+            out.append({"category": "sitemap", "severity": "warn",
+                        "message": "URL del sitemap con meta robots noindex"})
+        return out
+
+    def report(self, sample: int = SAMPLE_MAX) -> dict:
+        crawled = self._crawled.keys()
+        not_crawled = [u for u in self._listed if u not in self._crawled]
+        not_listed = [u for u in crawled if u not in self._listed]
+        listed_errors = [{"url": u, "status": s} for u, s in self._crawled.items() if u in self._listed and s >= 400]
+        listed_redirects = [{"url": u, "final_url": f} for u, f in self._redirected.items() if u in self._listed]
+        listed = len(self._listed)
+        return {
+            "listed": listed,
+            "crawled": len(self._crawled),
+            "listed_and_crawled": listed - len(not_crawled),
+            "coverage": round((listed - len(not_crawled)) / listed, 4) if listed else 0.0,
+            "not_crawled": {"count": len(not_crawled), "sample": sorted(not_crawled)[:sample]},
+            "not_in_sitemap": {"count": len(not_listed), "sample": sorted(not_listed)[:sample]},
+            "listed_errors": {"count": len(listed_errors), "sample": listed_errors[:sample]},
+            "listed_redirects": {"count": len(listed_redirects), "sample": listed_redirects[:sample]},
+        }
+
+
+_listing_cache: Dict[str, Tuple[float, dict]] = {}   # sitemap → (momento, listado)
+_listing_locks: Dict[str, threading.Lock] = {}
+_listing_lock = threading.Lock()
+LISTING_CACHE_MAX = 8   # sitemaps en memoria (≈ 50k URLs canónicas cada uno)
+
+
+def _sitemap_listing(sitemap_url: str, max_urls: int, max_sitemaps: int) -> dict:
+    """URLs canónicas de un sitemap (acotado), reutilizadas PROBE_TTL s entre auditorías del mismo sitio."""
+    with _listing_lock:
+        lock = _listing_locks.setdefault(sitemap_url, threading.Lock())
+    with lock:
+        cached = _listing_cache.get(sitemap_url)
+        if cached and time.monotonic() - cached[0] < PROBE_TTL:
+            return cached[1]
+        report = SitemapReport()
+        urls = set()
+        n = 0
+        gen = iter_sitemap_urls([sitemap_url], max_sitemaps=max_sitemaps, report=report)
+        try:
+            for loc, _ in gen:
+                n += 1
+                u = canonical_url(loc)
+                if u:
+                    urls.add(u)
+                if n >= max_urls:
+                    break
+        finally:
+            gen.close()
+        listing = {
+            "urls": frozenset(urls),
+            "count": n,
+            "truncated": n >= max_urls or report.skipped_sitemaps > 0,
+            "sitemaps": len(report.sitemaps),
+            "errors": report.errors,
+        }
+        with _listing_lock:
+            now = time.monotonic()
+            _listing_cache[sitemap_url] = (now, listing)
+            while len(_listing_cache) > LISTING_CACHE_MAX:
+                del _listing_cache[min(_listing_cache, key=lambda k: _listing_cache[k][0])]
+            _purge_expired(_listing_cache, _listing_locks, PROBE_TTL, now)
+        return listing
+
+
+def sitemap_summary(sitemap_url: str, target_url: Optional[str] = None, max_urls: int = 50_000,
+                    max_sitemaps: int = 10) -> dict:
+    """Resumen acotado para la auditoría de una página: nº de URLs y si `target_url` está listada."""
+    listing = _sitemap_listing(sitemap_url, max_urls, max_sitemaps)
+    target = canonical_url(target_url) if target_url else None
+    return {
+        "urls": listing["count"],
+        "truncated": listing["truncated"],
+        "sitemaps": listing["sitemaps"],
+        "contains_url": (target in listing["urls"]) if target else None,
+        "errors": listing["errors"],
+    }
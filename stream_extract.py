@@ -0,0 +1,298 @@
+# opun_seo_lite/stream_extract.py
+"""
+Extractor de señales SEO en una sola pasada y sin árbol: el parser HTML de
+lxml se usa con la interfaz "parser target" (start/end/data), así que nunca
+se materializa el DOM. Se alimenta por trozos (bytes) y la memoria se
+mantiene plana sea cual sea el tamaño de la página: solo se guardan los
+textos de title/h1-h3 y contadores.
+
+Dos targets:
+  SignalCollector  el dict de html_backend.extract_signals (backend "lxml-stream",
+                   comparado en `python bench.py stream/parsers`)
+  PageCollector    lo que lee el crawl (cli._parse_one) con la misma semántica
+                   que parse.ParsedDocument: head_info, h1-h6, texto visible y
+                   enlaces; el crawl lo usa en páginas grandes
+                   (config.STREAM_PARSE_MIN_KB) en lugar del árbol de bs4
+"""
+import codecs
+import re
+from typing import Dict, Iterable, Optional, Union
+
+from lxml import etree
+
+from head_extract import sniff_encoding
+from html_backend import OG_KEYS, TW_KEYS
+
+STREAM_FEED_CHUNK = 64 * 1024
+MAX_HEADINGS = 10  # h2/h3: como parse_meta_tags
+
+
+def _collapse(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class SignalCollector:
+    """Target de lxml: recibe eventos y acumula solo lo que leen las auditorías."""
+    def __init__(self):
+        self.title = None
+        self.headings = {"h1": [], "h2": [], "h3": []}
+        self.meta_ci: Dict[str, str] = {}   # description / robots (name sin distinguir mayúsculas)
+        self.og: Dict[str, str] = {}
+        self.twitter: Dict[str, str] = {}
+        self.canonical = None
+        self.num_links = 0
+        self.num_images = 0
+        self._open = []       # capturas activas: [tag, [trozos]]
+        self._text = []       # nodo de texto en curso (lxml puede partirlo en varios data())
+
+    # -- texto --
+    def _flush(self):
+        if self._text:
+            piece = "".join(self._text).strip()
+            self._text = []
+            if piece:
+                for cap in self._open:
+                    cap[1].append(piece)
+
+    def data(self, text):
+        if self._open:
+            self._text.append(text)
+
+    # -- etiquetas --
+    def start(self, tag, attrib):
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        if tag == "title":
+            if self.title is None:
+                self._open.append(["title", []])
+        elif tag in self.headings:
+            if tag == "h1" or len(self.headings[tag]) < MAX_HEADINGS:
+                self._open.append([tag, []])
+        elif tag == "meta":
+            content = (attrib.get("content") or "").strip()
+            name = attrib.get("name")
+            prop = attrib.get("property")
+            if name is not None:
+                key = name.lower()
+                if key in ("description", "robots") and key not in self.meta_ci:
+                    self.meta_ci[key] = content.lower() if key == "robots" else content
+                if name in TW_KEYS and name not in self.twitter:
+                    self.twitter[name] = content
+            if prop in OG_KEYS and prop not in self.og:
+                self.og[prop] = content
+        elif tag == "link":
+            href = attrib.get("href")
+            if href is not None and self.canonical is None and \
+                    any(r.lower() == "canonical" for r in (attrib.get("rel") or "").split()):
+                self.canonical = href.strip()
+        elif tag == "a":
+            if attrib.get("href") is not None:
+                self.num_links += 1
+        elif tag == "img":
+            if attrib.get("src") is not None:
+                self.num_images += 1
+
+    def end(self, tag):
+        self._flush()
+        if not self._open or self._open[-1][0] != tag:
+            return
+        name, parts = self._open.pop()
+        text = _collapse("".join(parts))
+        if name == "title":
+            self.title = text
+        else:
+            self.headings[name].append(text)
+
+    def close(self) -> Dict:
+        self._flush()
+        # capturas sin cerrar (documento truncado): se cierran con lo que haya
+        while self._open:
+            self.end(self._open[-1][0])
+        return {
+            "title": self.title or "",
+            "description": self.meta_ci.get("description", ""),
+            "robots": self.meta_ci.get("robots", ""),
+            "canonical": self.canonical or "",
+            "h1": self.headings["h1"],
+            "h2": self.headings["h2"][:MAX_HEADINGS],
+            "h3": self.headings["h3"][:MAX_HEADINGS],
+            "og": {k: self.og.get(k, "") for k in OG_KEYS},
+            "twitter": {k: self.twitter.get(k, "") for k in TW_KEYS},
+            "num_links": self.num_links,
+            "num_images": self.num_images,
+        }
+
+
+class PageCollector:
+    """
+    Target de lxml con los campos que cli._parse_one lee de parse.ParsedDocument
+    (bs4 con lxml recibe estos mismos eventos, así que la semántica coincide):
+      title      primer <title>, .string.strip() (None si está vacío)
+      meta       primer <meta name="description|robots"> (nombre exacto) → content o None
+      canonical  href del primer <link rel="canonical">
+      headings   h1-h6 como get_text(strip=True)
+      text       texto visible (parse.visible_text: fuera de script/style/noscript/template)
+      hrefs      href de cada <a href> (solo si want_links)
+    """
+    # bs4 guarda el texto de script/style/template como Script/Stylesheet/TemplateString,
+    # que ni get_text ni visible_text leen; el de <noscript> solo lo descarta visible_text
+    _RAW = {"script", "style", "template"}
+
+    def __init__(self, want_links: bool = False):
+        self.want_links = want_links
+        self.title = None
+        self._title_state = 0   # 0 = aún no, 1 = dentro del primero, 2 = visto
+        self._title_parts = []
+        self.meta: Dict[str, Optional[str]] = {}
+        self.canonical = None
+        self._canonical_seen = False
+        self.headings = {f"h{i}": [] for i in range(1, 7)}
+        self.hrefs = []
+        self._raw = 0           # profundidad dentro de script/style/template
+        self._noscript = 0
+        self._open = []         # headings abiertos: [tag, [trozos], posición en headings]
+        self._buf = []          # nodo de texto en curso (lxml puede partirlo en varios data())
+        self._visible = []
+
+    def _flush(self):
+        if not self._buf:
+            return
+        node = "".join(self._buf)
+        self._buf = []
+        if self._title_state == 1:
+            self._title_parts.append(node)
+        if self._raw:
+            return
+        if not self._noscript:
+            self._visible.append(node)
+        piece = node.strip()
+        if piece:
+            for cap in self._open:
+                cap[1].append(piece)
+
+    def data(self, text):
+        self._buf.append(text)
+
+    def comment(self, text):
+        self._flush()  # un comentario separa dos nodos de texto
+
+    def start(self, tag, attrib):
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        if tag in self._RAW:
+            self._raw += 1
+        elif tag == "noscript":
+            self._noscript += 1
+        elif tag == "title":
+            if self._title_state == 0:
+                self._title_state = 1
+        elif tag in self.headings:
+            # hueco reservado al abrir: orden de documento, como find_all
+            self.headings[tag].append("")
+            self._open.append([tag, [], len(self.headings[tag]) - 1])
+        elif tag == "meta":
+            name = attrib.get("name")
+            if name in ("description", "robots") and name not in self.meta:
+                self.meta[name] = attrib.get("content")
+        elif tag == "link":
+            if not self._canonical_seen and "canonical" in (attrib.get("rel") or "").split():
+                self._canonical_seen = True
+                self.canonical = attrib.get("href")
+        elif tag == "a":
+            href = attrib.get("href")
+            if self.want_links and href is not None:
+                self.hrefs.append(href)
+
+    def end(self, tag):
+        self._flush()
+        if tag in self._RAW:
+            self._raw = max(0, self._raw - 1)
+        elif tag == "noscript":
+            self._noscript = max(0, self._noscript - 1)
+        elif tag == "title" and self._title_state == 1:
+            self._title_state = 2
+            self.title = "".join(self._title_parts).strip() if self._title_parts else None
+        elif self._open and self._open[-1][0] == tag:
+            name, parts, idx = self._open.pop()
+            self.headings[name][idx] = "".join(parts)
+
+    def close(self) -> Dict:
+        self._flush()
+        while self._open:  # documento truncado: se cierran con lo que haya
+            self.end(self._open[-1][0])
+        if self._title_state == 1:
+            self.end("title")
+        robots = self.meta.get("robots")
+        return {
+            "head_info": {
+                "title": self.title,
+                "meta_description": self.meta.get("description"),
+                "canonical": self.canonical,
+                "meta_robots": robots.lower() if robots is not None else None,
+            },
+            "headings": self.headings,
+            "text": " ".join(" ".join(self._visible).split()),
+            "hrefs": self.hrefs,
+        }
+
+
+class StreamingExtractor:
+    """
+    ex = StreamingExtractor(encoding)   # charset de la cabecera si se conoce
+    for chunk in resp.iter_content(64 * 1024):
+        ex.feed(chunk)
+    signals = ex.close()
+    El charset se decide con el primer trozo (cabecera, BOM o <meta charset>).
+    `target` cambia lo que se recoge (por defecto SignalCollector).
+    """
+    def __init__(self, encoding: Optional[str] = None, target=None):
+        self._declared = encoding
+        self._decode = None
+        self._parser = etree.HTMLParser(target=target or SignalCollector(), recover=True, no_network=True)
+        self.bytes_fed = 0
+
+    def feed(self, chunk: Union[bytes, str]) -> None:
+        if not chunk:
+            return
+        if isinstance(chunk, bytes):
+            self.bytes_fed += len(chunk)
+            if self._decode is None:
+                self._decode = codecs.getincrementaldecoder(sniff_encoding(chunk, self._declared))(errors="replace").decode
+            chunk = self._decode(chunk)
+        else:
+            self.bytes_fed += len(chunk)
+        if chunk:
+            self._parser.feed(chunk)
+
+    def close(self) -> Dict:
+        if self._decode is not None:
+            tail = self._decode(b"", final=True)
+            if tail:
+                self._parser.feed(tail)
+        if not self.bytes_fed:
+            self._parser.feed("<html></html>")
+        return self._parser.close()
+
+
+def _run(ex: StreamingExtractor, data: Union[bytes, str, Iterable[bytes]]) -> Dict:
+    if isinstance(data, (bytes, str)):
+        for i in range(0, len(data), STREAM_FEED_CHUNK):
+            ex.feed(data[i:i + STREAM_FEED_CHUNK])
+    else:
+        for chunk in data:
+            ex.feed(chunk)
+    return ex.close()
+
+
+def extract_signals_stream(data: Union[bytes, str, Iterable[bytes]], encoding: Optional[str] = None) -> Dict:
+    """Señales de `data` (bytes, str o iterable de trozos) en una pasada."""
+    return _run(StreamingExtractor(encoding), data)
+
+
+def parse_page_stream(data: Union[bytes, str, Iterable[bytes]], want_links: bool = False,
+                      encoding: Optional[str] = None) -> Dict:
+    """Campos del crawl (ver PageCollector) en una pasada, sin árbol."""
+    return _run(StreamingExtractor(encoding, PageCollector(want_links)), data)
+
@@ -0,0 +1,75 @@
+# opun_seo_lite/tests/test_fetch_fallbacks.py
+"""Fallbacks escalonados de utils._fetch_url_core (sin red: _fetch_attempt simulado)."""
+import time
+
+import pytest
+
+import utils
+
+
+def _fake_attempts(monkeypatch, behaviours):
+    """behaviours[(url, verify)] = (segundos, resultado o excepción); None = se cuelga hasta cancelarse."""
+    started = []
+
+    def fake(sess, cache, try_url, verify_flag, max_bytes, cancel, live=None):
+        started.append((try_url, verify_flag))
+        spec = behaviours[(try_url, verify_flag)]
+        if spec is None:
+            cancel.wait(60)
+            raise utils.FetchCancelled()
+        delay, outcome = spec
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, [], int(delay * 1000)
+
+    monkeypatch.setattr(utils, "_fetch_attempt", fake)
+    monkeypatch.setattr(utils.http_cache, "get_cache", lambda: None)
+    return started
+
+
+def test_hung_https_falls_back_to_http_within_deadline(monkeypatch):
+    started = _fake_attempts(monkeypatch, {
+        ("https://example.test/", True): None,
+        ("http://example.test/", True): (0.05, "http"),
+        ("https://example.test/", False): None,
+    })
+    t0 = time.monotonic()
+    resp, _, _ = utils._fetch_url_core("https://example.test/", deadline=3, hedge_delay=0.2, grace=0.3)
+    assert resp == "http"
+    assert time.monotonic() - t0 < 1.5
+    assert ("http://example.test/", True) in started
+
+
+def test_earlier_attempt_wins_within_grace(monkeypatch):
+    _fake_attempts(monkeypatch, {
+        ("https://example.test/", True): (0.4, "https"),
+        ("http://example.test/", True): (0.0, "http"),
+        ("https://example.test/", False): (0.0, "insecure"),
+    })
+    resp, _, _ = utils._fetch_url_core("https://example.test/", deadline=3, hedge_delay=0.1, grace=1.0)
+    assert resp == "https"
+
+
+def test_failure_starts_next_attempt_immediately(monkeypatch):
+    _fake_attempts(monkeypatch, {
+        ("https://example.test/", True): (0.0, ConnectionError("tls")),
+        ("http://example.test/", True): (0.0, ConnectionError("refused")),
+        ("https://example.test/", False): (0.0, "insecure"),
+    })
+    t0 = time.monotonic()
+    resp, _, _ = utils._fetch_url_core("https://example.test/", deadline=3, hedge_delay=10, grace=10)
+    assert resp == "insecure"
+    assert time.monotonic() - t0 < 1
+
+
+def test_all_hung_raises_at_deadline(monkeypatch):
+    _fake_attempts(monkeypatch, {
+        ("https://example.test/", True): None,
+        ("http://example.test/", True): None,
+        ("https://example.test/", False): None,
+    })
+    t0 = time.monotonic()
+    with pytest.raises(RuntimeError):
+        utils._fetch_url_core("https://example.test/", deadline=0.5, hedge_delay=0.1, grace=0.1)
+    assert time.monotonic() - t0 < 1.5
@@ -0,0 +1,107 @@
+# opun_seo_lite/text_norm.py
+"""
+Normalización de texto para comparar keywords con campos de la página:
+  - NFKD (ligaduras, anchos completos, superíndices… → forma compatible)
+  - casefold (ß → ss, Σ/ς → σ, mayúsculas acentuadas)
+  - variantes tipográficas (comillas curvas, guiones largos, espacios raros)
+  - opcionalmente, sin acentos/diacríticos (café → cafe, ação → acao)
+
+fold() se hace una vez por campo y devuelve un FoldedText con el texto
+normalizado y el mapa de offsets al original, de modo que las coincidencias
+encontradas sobre el texto plegado se pueden señalar en el texto real.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Variantes tipográficas que NFKD no unifica
+_TYPO = {
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u00b4": "'",   # ‘ ’ ‚ ‛ ´
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u00ab": '"', "\u00bb": '"',   # “ ” „ « »
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-",   # guiones
+    "\u2015": "-", "\u2212": "-",
+    "\u00ad": "",                                                          # guion blando
+    "\u200b": "", "\u200c": "", "\u200d": "", "\ufeff": "",                 # anchura cero
+}
+_WORD = re.compile(r"[^\W_]+")
+
+
+@lru_cache(maxsize=4096)
+def _fold_char(ch: str, strip_accents: bool) -> str:
+    ch = _TYPO.get(ch, ch)
+    out = unicodedata.normalize("NFKD", ch).casefold()
+    if strip_accents:
+        out = "".join(c for c in out if not unicodedata.combining(c))
+    elif out != ch:
+        # sin quitar acentos: recomponer para que "é" siga siendo un único carácter
+        out = unicodedata.normalize("NFC", out)
+    return out
+
+
+class FoldedText:
+    """Texto plegado + offsets: offsets[i] = índice en el original del carácter plegado i."""
+    __slots__ = ("original", "text", "offsets")
+
+    def __init__(self, original: str, text: str, offsets: Optional[List[int]]):
+        self.original = original
+        self.text = text
+        self.offsets = offsets  # None = identidad (texto ASCII)
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Span [start, end) del texto plegado → span en el original."""
+        if self.offsets is None or start >= end:
+            return start, end
+        o = self.offsets
+        return o[start], (o[end] if end < len(o) else len(self.original))
+
+    def __len__(self):
+        return len(self.text)
+
+
+def fold(text: Optional[str], strip_accents: bool = True) -> FoldedText:
+    text = text or ""
+    if text.isascii():
+        return FoldedText(text, text.lower(), None)
+    parts: List[str] = []
+    offsets: List[int] = []
+    for i, ch in enumerate(text):
+        f = ch.lower() if ch.isascii() else _fold_char(ch, strip_accents)
+        if f:
+            parts.append(f)
+            offsets.extend([i] * len(f))
+    return FoldedText(text, "".join(parts), offsets)
+
+
+def fold_str(text: Optional[str], strip_accents: bool = True) -> str:
+    return fold(text, strip_accents).text
+
+
+def is_word_char(ch: str) -> bool:
+    """Letra o dígito en cualquier alfabeto (los límites de 'exact' en kw_match)."""
+    return bool(ch) and ch.isalnum()
+
+
+def word_tokens(folded: str) -> List[str]:
+    """Palabras (letras/dígitos Unicode) de un texto ya plegado."""
+    return _WORD.findall(folded)
+
+
+@lru_cache(maxsize=65536)
+def _chunk_tokens(chunk: str, strip_accents: bool) -> Tuple[str, ...]:
+    return tuple(_WORD.findall(fold(chunk, strip_accents).text))
+
+
+def fold_tokens(text: Optional[str], strip_accents: bool = True) -> List[str]:
+    """
+    word_tokens(fold(text).text) sin construir offsets: el plegado es carácter a
+    carácter y los espacios siguen siendo separadores, así que se pliega cada
+    trozo entre espacios una vez (caché: en un texto largo las palabras se repiten).
+    """
+    text = text or ""
+    if text.isascii():
+        return _WORD.findall(text.lower())
+    out: List[str] = []
+    for chunk in text.split():
+        out.extend(_chunk_tokens(chunk, strip_accents))
+    return out
@@ -0,0 +1,135 @@
+# opun_seo_lite/timing.py
+"""
+Desglose de tiempos por petición (y por cada salto de redirección):
+  dns_ms      resolución DNS
+  connect_ms  conexión TCP
+  tls_ms      handshake TLS (0 en http)
+  ttfb_ms     desde la petición enviada hasta las cabeceras de respuesta
+  download_ms transferencia del cuerpo
+  reused      la conexión venía del pool (sin DNS/TCP/TLS)
+
+TimingHTTPAdapter sustituye las clases de conexión de urllib3 por variantes
+instrumentadas y deja el desglose en `response.timing`. Las mediciones viajan
+en un thread-local, así que funciona con varios hilos sobre la misma sesión.
+"""
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+_local = threading.local()
+
+TIMING_KEYS = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _current_hop() -> Optional[dict]:
+    return getattr(_local, "hop", None)
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        hop = _current_hop()
+        if hop is None:
+            return super()._new_conn()
+        host = self._dns_host
+        t0 = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)
+        except OSError:
+            infos = []  # el propio urllib3 volverá a fallar y lanzará NameResolutionError
+        t1 = time.perf_counter()
+        hop["dns_ms"] += _ms(t1 - t0)
+        # conectamos a las IPs ya resueltas para no medir el DNS dos veces; como
+        # create_connection, se prueban en orden hasta que una acepta
+        ips = list(dict.fromkeys(info[4][0] for info in infos)) or [host]
+        try:
+            for i, ip in enumerate(ips):
+                self._dns_host = ip
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (ConnectTimeoutError, NewConnectionError):
+                    if i == len(ips) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        if infos:
+            hop["ip"] = ip
+        hop["connect_ms"] += _ms(time.perf_counter() - t1)
+        hop["reused"] = False
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        hop = _current_hop()
+        if hop is None:
+            return super().connect()
+        before = hop["dns_ms"] + hop["connect_ms"]
+        t0 = time.perf_counter()
+        super().connect()
+        total = _ms(time.perf_counter() - t0)
+        hop["tls_ms"] += max(0.0, round(total - (hop["dns_ms"] + hop["connect_ms"] - before), 1))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter que mide DNS/TCP/TLS/TTFB/descarga de cada petición (incluidos redirects)."""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        hop = {"url": request.url, "status": None, "ip": "", "reused": True,
+               "dns_ms": 0.0, "connect_ms": 0.0, "tls_ms": 0.0, "ttfb_ms": 0.0, "download_ms": None}
+        _local.hop = hop
+        t0 = time.perf_counter()
+        try:
+            resp = super().send(request, **kwargs)
+        finally:
+            _local.hop = None
+        to_headers = _ms(time.perf_counter() - t0)
+        hop["ttfb_ms"] = max(0.0, round(to_headers - hop["dns_ms"] - hop["connect_ms"] - hop["tls_ms"], 1))
+        hop["status"] = resp.status_code
+        if resp.is_redirect:
+            # requests consumirá el cuerpo del 3xx igualmente: lo medimos aquí
+            t1 = time.perf_counter()
+            _ = resp.content
+            hop["download_ms"] = _ms(time.perf_counter() - t1)
+        resp.timing = hop
+        return resp
+
+
+def total_ms(hop: Dict) -> float:
+    return round(sum(hop.get(k) or 0.0 for k in TIMING_KEYS), 1)
+
+
+def summarize(hops: List[Dict]) -> Dict:
+    """Suma de la cadena completa (todos los saltos) por fase."""
+    out = {k: round(sum(h.get(k) or 0.0 for h in hops), 1) for k in TIMING_KEYS}
+    out["total_ms"] = round(sum(out.values()), 1)
+    out["hops"] = len(hops)
+    return out
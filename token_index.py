@@ -0,0 +1,293 @@
+# opun_seo_lite/token_index.py
+"""
+Índice de tokens por página sobre el texto visible (parse.page_text / PageSnapshot.text).
+
+El texto se pliega una vez (text_norm) y se tokeniza a un array de ids; los
+unigramas, bigramas y trigramas se cuentan de una sola vez con numpy
+(claves uint64 ordenadas + recuentos), así que densidad, prominencia y
+co-ocurrencia de cualquier nº de keywords son búsquedas binarias, no
+re-escaneos del texto. SiteTokenIndex suma índices de página (recuento total
+y nº de páginas por n-grama) sin volver a tokenizar.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from text_norm import fold_tokens
+
+MAX_N = 3
+BASE = 1 << 21  # tamaño máximo de vocabulario: clave de trigrama < 2**63 en uint64
+STOPWORDS = frozenset(
+    "a al algo ante como con de del desde donde e el ella en entre es esta este esto hay la las le lo los mas "
+    "me mi mucho muy no nos o para pero por que se sin sobre su sus te tu un una uno y ya "
+    "an and are as at be by for from has have in is it its of on or that the this to was were will with you your".split()
+)
+
+
+def _encode(ids: np.ndarray, n: int) -> np.ndarray:
+    """Claves de los n-gramas consecutivos de `ids` (uint64, base BASE)."""
+    if len(ids) < n:
+        return np.empty(0, dtype=np.uint64)
+    keys = ids[: len(ids) - n + 1].astype(np.uint64)
+    for k in range(1, n):
+        keys = keys * np.uint64(BASE) + ids[k: len(ids) - n + 1 + k].astype(np.uint64)
+    return keys
+
+
+class TokenIndex:
+    """
+    idx = TokenIndex.from_text(page_text)
+    idx.count("zapatillas running"), idx.density(kw), idx.prominence(kw), idx.cooccurrence(a, b)
+    Las frases se pliegan con los mismos parámetros que el texto; más de MAX_N
+    palabras se resuelven verificando el resto de tokens sobre los candidatos.
+    """
+    def __init__(self, tokens: List[str], strip_accents: Optional[bool] = None):
+        self.strip_accents = config.KW_FOLD_ACCENTS if strip_accents is None else bool(strip_accents)
+        self.vocab: Dict[str, int] = {}
+        for t in tokens:
+            if t not in self.vocab:
+                self.vocab[t] = len(self.vocab)
+        if len(self.vocab) >= BASE:
+            raise ValueError("Vocabulario demasiado grande para el índice de tokens")
+        self.terms: List[str] = list(self.vocab)
+        self.ids = np.fromiter((self.vocab[t] for t in tokens), dtype=np.int64, count=len(tokens))
+        self.n_tokens = len(tokens)
+        # por n: claves únicas ordenadas, recuentos, primera posición y posiciones ordenadas por clave
+        self._keys: Dict[int, np.ndarray] = {}
+        self._counts: Dict[int, np.ndarray] = {}
+        self._first: Dict[int, np.ndarray] = {}
+        self._order: Dict[int, np.ndarray] = {}
+        self._starts: Dict[int, np.ndarray] = {}
+        for n in range(1, MAX_N + 1):
+            keys = _encode(self.ids, n)
+            order = np.argsort(keys, kind="stable")
+            uniq, first, counts = np.unique(keys, return_index=True, return_counts=True)
+            self._keys[n], self._counts[n], self._first[n] = uniq, counts, first
+            self._order[n] = order
+            self._starts[n] = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+
+    @classmethod
+    def from_text(cls, text: Optional[str], strip_accents: Optional[bool] = None) -> "TokenIndex":
+        strip = config.KW_FOLD_ACCENTS if strip_accents is None else bool(strip_accents)
+        return cls(fold_tokens(text, strip), strip)
+
+    # ---- términos ----
+    def term_ids(self, phrase: str) -> Optional[List[int]]:
+        """Ids de las palabras de `phrase` (plegada igual que la página); None si alguna no aparece."""
+        ids = []
+        for t in fold_tokens(phrase, self.strip_accents):
+            i = self.vocab.get(t)
+            if i is None:
+                return None
+            ids.append(i)
+        return ids or None
+
+    def _slot(self, ids: List[int]) -> Tuple[int, int]:
+        """(n, índice en _keys[n]) del n-grama, o (n, -1) si no aparece."""
+        n = len(ids)
+        key = np.uint64(0)
+        for i in ids:
+            key = key * np.uint64(BASE) + np.uint64(i)
+        keys = self._keys[n]
+        j = int(np.searchsorted(keys, key))
+        return n, (j if j < len(keys) and keys[j] == key else -1)
+
+    def positions(self, phrase: str) -> np.ndarray:
+        """Posiciones (índice de token) de cada aparición de `phrase`, ordenadas."""
+        ids = self.term_ids(phrase)
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        n, j = self._slot(ids[:MAX_N])
+        if j < 0:
+            return np.empty(0, dtype=np.int64)
+        start = self._starts[n][j]
+        pos = np.sort(self._order[n][start: start + self._counts[n][j]])
+        # frases de más de MAX_N palabras: verificar el resto sobre los candidatos (vectorizado)
+        for k in range(MAX_N, len(ids)):
+            pos = pos[pos + k < self.n_tokens]
+            pos = pos[self.ids[pos + k] == ids[k]]
+        return pos
+
+    # ---- métricas ----
+    def count(self, phrase: str) -> int:
+        ids = self.term_ids(phrase)
+        if not ids:
+            return 0
+        if len(ids) <= MAX_N:
+            n, j = self._slot(ids)
+            return int(self._counts[n][j]) if j >= 0 else 0
+        return int(len(self.positions(phrase)))
+
+    def density(self, phrase: str) -> float:
+        """Apariciones / nº de palabras del texto (misma definición que la densidad de cabeceras)."""
+        return self.count(phrase) / self.n_tokens if self.n_tokens else 0.0
+
+    def prominence(self, phrase: str) -> float:
+        """1.0 si aparece en la primera palabra, → 0 cuanto más tarde aparece; 0 si no aparece."""
+        ids = self.term_ids(phrase)
+        if not ids or not self.n_tokens:
+            return 0.0
+        if len(ids) <= MAX_N:
+            n, j = self._slot(ids)
+            if j < 0:
+                return 0.0
+            first = int(self._first[n][j])
+        else:
+            pos = self.positions(phrase)
+            if not len(pos):
+                return 0.0
+            first = int(pos[0])
+        return round(1.0 - first / self.n_tokens, 4)
+
+    def cooccurrence(self, a: str, b: str, window: int = 10) -> int:
+        """Nº de apariciones de `a` con al menos una de `b` a ≤ `window` palabras."""
+        pa, pb = self.positions(a), self.positions(b)
+        if not len(pa) or not len(pb):
+            return 0
+        lo = np.searchsorted(pb, pa - window, side="left")
+        hi = np.searchsorted(pb, pa + window, side="right")
+        return int(np.count_nonzero(hi > lo))
+
+    def top_ngrams(self, n: int = 1, k: int = 20, skip_stopwords: bool = True) -> List[Tuple[str, int]]:
+        keys, counts = self._keys[n], self._counts[n]
+        out = []
+        for j in np.argsort(-counts, kind="stable"):
+            words = self.decode(int(keys[j]), n)
+            if skip_stopwords and (words[0] in STOPWORDS or words[-1] in STOPWORDS):
+                continue
+            out.append((" ".join(words), int(counts[j])))
+            if len(out) >= k:
+                break
+        return out
+
+    def decode(self, key: int, n: int) -> List[str]:
+        ids = []
+        for _ in range(n):
+            key, i = divmod(key, BASE)
+            ids.append(i)
+        return [self.terms[i] for i in reversed(ids)]
+
+    def stats(self, keywords: Iterable[str]) -> Dict[str, dict]:
+        """{kw: {count, density, prominence}} para cada keyword (búsquedas, sin re-escanear)."""
+        out = {}
+        for kw in keywords:
+            c = self.count(kw)
+            out[kw] = {
+                "count": c,
+                "density": round(c / self.n_tokens, 4) if self.n_tokens else 0.0,
+                "prominence": self.prominence(kw) if c else 0.0,
+            }
+        return out
+
+
+class SiteTokenIndex:
+    """
+    Agregado de varias páginas: recuento total y nº de páginas (df) por n-grama.
+    add() re-codifica las claves de la página al vocabulario global con un mapeo
+    de ids (O(n-gramas únicos de la página)); no se vuelve a tokenizar nada.
+    """
+    def __init__(self, strip_accents: Optional[bool] = None):
+        self.strip_accents = config.KW_FOLD_ACCENTS if strip_accents is None else bool(strip_accents)
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.n_pages = 0
+        self.n_tokens = 0
+        self._parts: Dict[int, List[Tuple[np.ndarray, np.ndarray]]] = {n: [] for n in range(1, MAX_N + 1)}
+        self._merged: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def add(self, index: TokenIndex) -> None:
+        remap = np.empty(len(index.terms), dtype=np.uint64)
+        for local, term in enumerate(index.terms):
+            g = self.vocab.get(term)
+            if g is None:
+                g = self.vocab[term] = len(self.terms)
+                self.terms.append(term)
+            remap[local] = g
+        if len(self.terms) >= BASE:
+            raise ValueError("Vocabulario del sitio demasiado grande para el índice de tokens")
+        base = np.uint64(BASE)
+        for n in range(1, MAX_N + 1):
+            keys = index._keys[n]
+            gkeys = np.zeros(len(keys), dtype=np.uint64)
+            rest = keys.copy()
+            mult = np.uint64(1)
+            for _ in range(n):
+                gkeys += remap[(rest % base).astype(np.int64)] * mult
+                rest //= base
+                mult *= base
+            self._parts[n].append((gkeys, index._counts[n]))
+        self.n_pages += 1
+        self.n_tokens += index.n_tokens
+        self._merged.clear()
+
+    def _table(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(claves únicas, recuento total, nº de páginas) del sitio para n-gramas de orden n."""
+        if n not in self._merged:
+            parts = self._parts[n]
+            if not parts:
+                empty = np.empty(0, dtype=np.uint64)
+                self._merged[n] = (empty, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+            else:
+                keys = np.concatenate([p[0] for p in parts])
+                counts = np.concatenate([p[1] for p in parts]).astype(np.int64)
+                uniq, inv = np.unique(keys, return_inverse=True)
+                total = np.bincount(inv, weights=counts, minlength=len(uniq)).astype(np.int64)
+                df = np.bincount(inv, minlength=len(uniq)).astype(np.int64)  # una clave por página
+                self._merged[n] = (uniq, total, df)
+        return self._merged[n]
+
+    def lookup(self, phrase: str) -> Dict[str, int]:
+        """{count, pages} de una frase de hasta MAX_N palabras en todo el sitio."""
+        ids = []
+        for t in fold_tokens(phrase, self.strip_accents):
+            if t not in self.vocab:
+                return {"count": 0, "pages": 0}
+            ids.append(self.vocab[t])
+        if not ids or len(ids) > MAX_N:
+            return {"count": 0, "pages": 0}
+        key = np.uint64(0)
+        for i in ids:
+            key = key * np.uint64(BASE) + np.uint64(i)
+        uniq, total, df = self._table(len(ids))
+        j = int(np.searchsorted(uniq, key))
+        if j < len(uniq) and uniq[j] == key:
+            return {"count": int(total[j]), "pages": int(df[j])}
+        return {"count": 0, "pages": 0}
+
+    def page_keys(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(página, clave global, recuento) de todos los n-gramas de orden n, en orden de add()."""
+        parts = self._parts[n]
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(parts)), [len(p[0]) for p in parts])
+        keys = np.concatenate([p[0] for p in parts])
+        counts = np.concatenate([p[1] for p in parts]).astype(np.int64)
+        return rows, keys, counts
+
+    def edge_ids(self, keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids de la primera y la última palabra de cada clave de orden n (vectorizado)."""
+        keys = keys.astype(np.uint64)
+        first = keys // np.uint64(BASE ** (n - 1))
+        last = keys % np.uint64(BASE)
+        return first.astype(np.int64), last.astype(np.int64)
+
+    def decode(self, key: int, n: int) -> List[str]:
+        ids = []
+        for _ in range(n):
+            key, i = divmod(int(key), BASE)
+            ids.append(i)
+        return [self.terms[i] for i in reversed(ids)]
+
+    def top_ngrams(self, n: int = 1, k: int = 20, skip_stopwords: bool = True) -> List[Tuple[str, int, int]]:
+        """[(ngrama, recuento total, nº de páginas)] más frecuentes del sitio."""
+        uniq, total, df = self._table(n)
+        out = []
+        for j in np.argsort(-total, kind="stable"):
+            words = self.decode(uniq[j], n)
+            if skip_stopwords and (words[0] in STOPWORDS or words[-1] in STOPWORDS):
+                continue
+            out.append((" ".join(words), int(total[j]), int(df[j])))
+            if len(out) >= k:
+                break
+        return out
@@ -0,0 +1,289 @@
+# opun_seo_lite/topic_gap.py
+"""
+Topic gap local (sin LLM): qué términos y subtemas cubren los competidores y
+nuestra página no.
+
+  1. Cada página (la nuestra + competidores) → texto visible y H2/H3 con lxml
+     directo (sin BeautifulSoup) → TokenIndex (1–3-gramas ya contados).
+  2. SiteTokenIndex une los vocabularios y da, de una vez, (página, n-grama,
+     recuento) → matriz dispersa documentos × términos (scipy.sparse) con
+     TF sublineal · IDF y filas normalizadas L2. Todo vectorizado: 50
+     competidores se comparan en milisegundos una vez descargados.
+  3. Hueco = término presente en ≥ `min_share` de los competidores con peso
+     medio alto y ausente (o muy débil) en nuestra página. Subtemas = H2/H3 de
+     competidores cuyas palabras no aparecen en nuestro texto.
+
+Los competidores se pasan como URLs o se toman de resultados SERP
+(serp_service.serpapi_google_web: [{"url", "domain", ...}]).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import config
+from html_backend import lxml_tree
+from serp_service import normalize_url as serp_normalize_url
+from text_norm import fold_tokens
+from token_index import STOPWORDS, SiteTokenIndex, TokenIndex
+from utils import PageSnapshot, ensure_snapshot, header_value, is_non_html_type
+
+TOPIC_NGRAMS = (1, 2, 3)
+MIN_COMPETITOR_SHARE = 0.3   # fracción de competidores que deben usar el término
+WEAK_RATIO = 0.25            # nuestro peso < 25% del peso medio de competidores → "débil"
+SUBTOPIC_COVERAGE = 0.5      # un H2/H3 está cubierto si ≥ 50% de sus palabras están en nuestro texto
+MAX_COMPETITORS = 20
+FETCH_CONCURRENCY = 10
+
+_TEXT_XPATH = "//body//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]"
+
+
+def page_view(content) -> Dict:
+    """Texto visible + H2/H3 de un HTML (bytes o str) con lxml directo."""
+    tree = lxml_tree(content)
+    text = " ".join(" ".join(tree.xpath(_TEXT_XPATH)).split())
+    headings = [" ".join(h.text_content().split()) for h in tree.iter("h2", "h3")]
+    return {"text": text, "headings": [h for h in headings if h]}
+
+
+def _content_words(text: str) -> List[str]:
+    return [t for t in fold_tokens(text, config.KW_FOLD_ACCENTS) if _is_content_term(t)]
+
+
+def _is_content_term(t: str) -> bool:
+    return len(t) > 1 and not t.isdigit() and t not in STOPWORDS
+
+
+def tfidf_matrix(site: SiteTokenIndex, ngrams: Iterable[int] = TOPIC_NGRAMS):
+    """
+    Matriz TF-IDF (csr, páginas × términos) del agregado y descripción de columnas.
+    Se descartan n-gramas que empiezan o terminan en stopword, de 1 letra o numéricos.
+    Devuelve (X, counts, keys, orders): `counts` es la matriz de recuentos brutos
+    y keys[j]/orders[j] permiten decodificar la columna j con site.decode.
+    """
+    bad = np.fromiter((not _is_content_term(t) for t in site.terms), dtype=bool, count=len(site.terms))
+    rows_l, cols_l, vals_l, keys_l, orders_l = [], [], [], [], []
+    offset = 0
+    for n in ngrams:
+        rows, keys, counts = site.page_keys(n)
+        if not len(keys):
+            continue
+        first, last = site.edge_ids(keys, n)
+        keep = ~(bad[first] | bad[last])
+        rows, keys, counts = rows[keep], keys[keep], counts[keep]
+        uniq, cols = np.unique(keys, return_inverse=True)
+        rows_l.append(rows)
+        cols_l.append(cols + offset)
+        vals_l.append(counts)
+        keys_l.append(uniq)
+        orders_l.append(np.full(len(uniq), n, dtype=np.int8))
+        offset += len(uniq)
+    shape = (site.n_pages, offset)
+    if not offset:
+        empty = sparse.csr_matrix(shape, dtype=np.float64)
+        return empty, empty, np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int8)
+    counts = sparse.csr_matrix(
+        (np.concatenate(vals_l).astype(np.float64), (np.concatenate(rows_l), np.concatenate(cols_l))),
+        shape=shape,
+    )
+    df = np.bincount(counts.indices, minlength=offset)
+    idf = np.log((1 + site.n_pages) / (1 + df)) + 1.0
+    X = counts.copy()
+    X.data = 1.0 + np.log(X.data)              # TF sublineal
+    X = X @ sparse.diags(idf)                  # · IDF
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    X = sparse.diags(1.0 / norms) @ X          # filas L2
+    return X.tocsr(), counts, np.concatenate(keys_l), np.concatenate(orders_l)
+
+
+def topic_gap(ours: Dict, competitors: List[Dict], top_k: int = 30,
+              min_share: float = MIN_COMPETITOR_SHARE) -> Dict:
+    """
+    `ours` y cada competidor: {"url", "text", "headings"}, todos extraídos con
+    page_view para que los dos lados se tokenicen igual.
+    Devuelve términos ausentes, términos débiles, subtemas y similitud por competidor.
+    """
+    indexes = [TokenIndex.from_text(c["text"]) for c in [ours] + list(competitors)]
+    site = SiteTokenIndex()
+    for idx in indexes:
+        site.add(idx)
+    X, counts, keys, orders = tfidf_matrix(site)
+    n_comp = len(competitors)
+    out = {"missing_terms": [], "weak_terms": [], "subtopics": [], "similarity": [],
+           "competitors": n_comp, "terms": int(X.shape[1])}
+    if not n_comp or not X.shape[1]:
+        return out
+
+    comp = X[1:]
+    centroid = np.asarray(comp.mean(axis=0)).ravel()
+    share = np.bincount(counts[1:].indices, minlength=X.shape[1]) / n_comp
+    mine = X[0].toarray().ravel()
+    mine_count = counts[0].toarray().ravel()
+    # con un solo competidor cualquier término suyo cuenta; con más, al menos 2 páginas
+    need = max(min_share, (2 / n_comp) if n_comp > 1 else 0.0)
+    common = share >= need
+
+    def rows(mask):
+        sel = np.flatnonzero(mask)
+        sel = sel[np.argsort(-centroid[sel], kind="stable")][:top_k]
+        return [{
+            "term": " ".join(site.decode(keys[j], int(orders[j]))),
+            "ngram": int(orders[j]),
+            "score": round(float(centroid[j]), 4),
+            "competitor_share": round(float(share[j]), 2),
+            "our_count": int(mine_count[j]),
+        } for j in sel]
+
+    out["missing_terms"] = rows(common & (mine_count == 0))
+    out["weak_terms"] = rows(common & (mine_count > 0) & (mine < WEAK_RATIO * centroid))
+
+    sims = (comp @ X[0].T).toarray().ravel()
+    out["similarity"] = [{"url": c.get("url", ""), "cosine": round(float(s), 3)} for c, s in zip(competitors, sims)]
+    out["subtopics"] = _subtopics(indexes[0], competitors, top_k)
+    return out
+
+
+def _subtopics(ours: TokenIndex, competitors: List[Dict], top_k: int) -> List[Dict]:
+    """H2/H3 de competidores cuyas palabras de contenido no están en nuestro texto, agrupados."""
+    groups: Dict[str, Dict] = {}
+    for i, c in enumerate(competitors):
+        for h in c.get("headings", []):
+            words = _content_words(h)
+            if not words:
+                continue
+            missing = [w for w in words if w not in ours.vocab]
+            if len(words) - len(missing) >= SUBTOPIC_COVERAGE * len(words):
+                continue
+            g = groups.setdefault(" ".join(words), {"heading": h, "missing_words": missing, "pages": set()})
+            g["pages"].add(i)
+    ranked = sorted(groups.values(), key=lambda g: (-len(g["pages"]), g["heading"]))[:top_k]
+    return [{"heading": g["heading"], "missing_words": g["missing_words"], "competitors": len(g["pages"])}
+            for g in ranked]
+
+
+def competitors_from_serp(results: List[Dict], exclude_url: str = "", limit: int = MAX_COMPETITORS) -> List[str]:
+    """URLs de resultados SERP (orden de posición), sin nuestro dominio ni duplicados."""
+    own = serp_normalize_url(exclude_url)["domain"] if exclude_url else ""
+    seen, urls = set(), []
+    for r in sorted(results or [], key=lambda r: r.get("position") or 0):
+        u = r.get("url") or r.get("link") or ""
+        norm = serp_normalize_url(u)
+        key = (norm["domain"], norm["path"])
+        if not u or not norm["domain"] or norm["domain"] == own or key in seen:
+            continue
+        seen.add(key)
+        urls.append(u)
+        if len(urls) >= limit:
+            break
+    return urls
+
+
+def _fetch_competitors(urls: List[str], concurrency: int) -> Tuple[List[Dict], List[Dict]]:
+    """Descarga concurrente (async_fetch); devuelve (vistas OK, errores)."""
+    from async_fetch import fetch_many
+
+    views, errors = [], []
+    for u, res in fetch_many(urls, concurrency=concurrency, per_host=2):
+        if isinstance(res, Exception):
+            errors.append({"url": u, "error": f"{res}"})
+            continue
+        resp = res[0]
+        if resp.status_code >= 400:
+            errors.append({"url": u, "error": f"HTTP {resp.status_code}"})
+            continue
+        if is_non_html_type(header_value(resp.headers, "content-type")) or not (resp.content or b"").strip():
+            errors.append({"url": u, "error": "sin contenido HTML"})
+            continue
+        views.append({"url": u, **page_view(resp.content)})
+    return views, errors
+
+
+def audit_topic_gap(url: str, competitors: Optional[List[str]] = None, serp_results: Optional[List[Dict]] = None,
+                    snapshot: Optional[PageSnapshot] = None, max_competitors: int = MAX_COMPETITORS,
+                    concurrency: int = FETCH_CONCURRENCY, top_k: int = 30) -> Dict:
+    """
+    Topic gap de `url` frente a `competitors` (URLs) o a los resultados SERP.
+    Respeta config.ENABLE_TOPIC_GAP (status "disabled" si está apagado).
+    """
+    base: Dict = {
+        "status": "ok",
+        "error": None,
+        "url": url,
+        "competitors": [],
+        "fetch_errors": [],
+        "missing_terms": [],
+        "weak_terms": [],
+        "subtopics": [],
+        "similarity": [],
+        "suggestions": [],
+    }
+    if not config.ENABLE_TOPIC_GAP:
+        base["status"] = "disabled"
+        return base
+
+    urls = list(dict.fromkeys(u for u in (competitors or []) if u))[:max_competitors]
+    if not urls and serp_results:
+        urls = competitors_from_serp(serp_results, exclude_url=url, limit=max_competitors)
+    if not urls:
+        base["status"] = "skipped"
+        base["error"] = "Sin competidores (pasa URLs o resultados SERP)."
+        return base
+
+    try:
+        snap = ensure_snapshot(url, snapshot)
+    except Exception as e:
+        base["status"] = "error"
+        base["error"] = f"{e}"
+        return base
+    if snap.soup is None:
+        base["status"] = "error"
+        base["error"] = "La página no devolvió HTML."
+        return base
+
+    views, errors = _fetch_competitors(urls, concurrency)
+    base["competitors"] = [v["url"] for v in views]
+    base["fetch_errors"] = errors
+    if not views:
+        base["status"] = "error"
+        base["error"] = "No se pudo descargar ningún competidor."
+        return base
+
+    # mismo extractor que los competidores (page_view sobre el cuerpo ya descargado):
+    # PageSnapshot.text incluye <head> y <template>, y sesgaría el TF-IDF
+    gap = topic_gap({"url": url, **page_view(snap.resp.content)}, views, top_k=top_k)
+    base.update({k: gap[k] for k in ("missing_terms", "weak_terms", "subtopics", "similarity")})
+
+    suggestions: List[Dict] = []
+    if gap["missing_terms"]:
+        terms = ", ".join(t["term"] for t in gap["missing_terms"][:8])
+        suggestions.append({
+            "prioridad": "Media",
+            "categoria": "Contenido",
+            "tarea": f"Cubrir términos que usan los competidores y tu página no: {terms}.",
+            "impacto": "Medio",
+            "esfuerzo": "Medio",
+            "nota": f"Presentes en ≥{int(MIN_COMPETITOR_SHARE * 100)}% de {len(views)} competidores."
+        })
+    if gap["subtopics"]:
+        heads = "; ".join(s["heading"] for s in gap["subtopics"][:5])
+        suggestions.append({
+            "prioridad": "Media",
+            "categoria": "Contenido",
+            "tarea": f"Valorar secciones sobre subtemas que tratan los competidores: {heads}.",
+            "impacto": "Medio",
+            "esfuerzo": "Medio",
+            "nota": "H2/H3 de competidores cuyas palabras no aparecen en tu texto."
+        })
+    if gap["weak_terms"]:
+        terms = ", ".join(t["term"] for t in gap["weak_terms"][:8])
+        suggestions.append({
+            "prioridad": "Baja",
+            "categoria": "Contenido",
+            "tarea": f"Desarrollar más estos términos (mención testimonial frente a competidores): {terms}.",
+            "impacto": "Bajo",
+            "esfuerzo": "Medio",
+            "nota": "Peso TF-IDF muy inferior a la media de competidores."
+        })
+    base["suggestions"] = suggestions
+    return base
@@ -321,6 +321,22 @@ def render_perf_cards(perf: Dict, on_add=None) -> None:
         st.markdown('<div class="op-card">', unsafe_allow_html=True)
         st.markdown("**TTFB**", unsafe_allow_html=True)
         _kv("Tiempo hasta primer byte", f"{perf['ttfb_ms']} ms", perf["ttfb_status"])
+        samples = perf.get("ttfb_samples") or {}
+        if samples.get("n"):
+            cold = f" · frío {samples['cold_ms']} ms" if samples.get("cold_ms") is not None else ""
+            st.markdown(
+                f"<div class='tiny'>{samples['n']} muestras: min {samples['min_ms']} · p50 {samples['p50_ms']} · "
+                f"p95 {samples['p95_ms']} · max {samples['max_ms']} · jitter {samples['jitter_ms']} ms{cold}</div>",
+                unsafe_allow_html=True,
+            )
+        timing = perf.get("timing") or {}
+        if timing:
+            st.markdown(
+                f"<div class='tiny'>DNS {timing['dns_ms']:.0f} · TCP {timing['connect_ms']:.0f} · "
+                f"TLS {timing['tls_ms']:.0f} · espera {timing['ttfb_ms']:.0f} · "
+                f"descarga {timing['download_ms']:.0f} ms ({timing['hops']} salto/s)</div>",
+                unsafe_allow_html=True,
+            )
         if st.button("➕ Agregar al plan (TTFB)", use_container_width=True, key="add_ttfb"):
             if on_add:
                 on_add({
@@ -334,6 +350,11 @@ def render_perf_cards(perf: Dict, on_add=None) -> None:
         st.markdown('<div class="op-card">', unsafe_allow_html=True)
         st.markdown("**Peso HTML**", unsafe_allow_html=True)
         _kv("Tamaño del HTML", perf["html_size_readable"], None)
+        weight = perf.get("page_weight") or {}
+        if weight:
+            _kv("Peso total de la página", weight.get("total_readable", "—"), None)
+            kinds = " · ".join(f"{k} {v['count']}" for k, v in sorted(weight.get("by_kind", {}).items()))
+            st.markdown(f"<div class='tiny'>{weight.get('num_assets', 0)} recursos: {kinds}</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     with cols[2]:
@@ -414,6 +435,10 @@ def render_crawl_grid(crawl: Dict, on_add=None) -> None:
     _kv("Accesible", "Sí" if crawl["robots_info"].get("ok") else "No")
     _kv("URL final", crawl["robots_info"].get("final_url") or "—")
     _kv("Status", str(crawl["robots_info"].get("status") or "—"))
+    if crawl["robots_info"].get("allowed") is not None:
+        _kv("Permite esta URL", "Sí" if crawl["robots_info"]["allowed"] else f'No ({crawl["robots_info"].get("rule")})')
+    if crawl["robots_info"].get("crawl_delay"):
+        _kv("Crawl-delay", f'{crawl["robots_info"]["crawl_delay"]:g} s')
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="op-card col-6">', unsafe_allow_html=True)
@@ -422,6 +447,9 @@ def render_crawl_grid(crawl: Dict, on_add=None) -> None:
     _kv("Accesible", "Sí" if crawl["sitemap_info"].get("ok") else "No")
     _kv("URL final", crawl["sitemap_info"].get("final_url") or "—")
     _kv("Status", str(crawl["sitemap_info"].get("status") or "—"))
+    if crawl["sitemap_info"].get("urls") is not None:
+        _kv("URLs listadas", f'{crawl["sitemap_info"]["urls"]}{"+" if crawl["sitemap_info"].get("truncated") else ""}')
+        _kv("Incluye esta URL", {True: "Sí", False: "No"}.get(crawl["sitemap_info"].get("contains_url"), "—"))
     if st.button("➕ Agregar al plan (robots/sitemap)", use_container_width=True, key="add_rs"):
         if on_add:
             on_add({
@@ -502,6 +530,10 @@ def _kw_block_to_df_meta(kw_rel: dict) -> pd.DataFrame:
                 "Slug": d.get("url_slug", {}).get("match", "none"),
                 "Densidad": d.get("density", {}).get("value", 0.0),
             })
+            if "body" in d:
+                rows[-1]["Cuerpo (apariciones)"] = d["body"].get("count", 0)
+                rows[-1]["Densidad cuerpo"] = d["body"].get("density", 0.0)
+                rows[-1]["Prominencia"] = d["body"].get("prominence", 0.0)
         return pd.DataFrame(rows).sort_values(by="Score (0–100)", ascending=False)
 
     # Fallback legacy
@@ -584,3 +616,42 @@ def render_kw_relevance_social(social_result: dict) -> None:
         st.dataframe(df, use_container_width=True, hide_index=True)
     else:
         st.info("No hay datos de relevancia por keywords (Social).")
+
+# =========================
+# Render: Topic gap
+# =========================
+def render_topic_gap(gap: Dict) -> None:
+    if not isinstance(gap, dict):
+        return
+    if gap.get("status") in ("error", "skipped"):
+        st.warning(f"Topic gap: {gap.get('error')}")
+        return
+    if gap.get("status") != "ok":
+        return
+
+    comps = gap.get("competitors") or []
+    st.caption(f"Comparado con {len(comps)} competidores (TF-IDF local, sin IA).")
+    for err in gap.get("fetch_errors") or []:
+        st.caption(f"⚠️ {err.get('url')}: {err.get('error')}")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.write("**Términos que faltan**")
+        rows = [{"Término": t["term"], "Competidores": f"{int(t['competitor_share'] * 100)}%", "Peso": t["score"]}
+                for t in gap.get("missing_terms") or []]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("Sin términos ausentes relevantes.")
+    with c2:
+        st.write("**Subtemas (H2/H3) de competidores**")
+        rows = [{"Subtema": s["heading"], "Competidores": s["competitors"], "Palabras que faltan": ", ".join(s["missing_words"])}
+                for s in gap.get("subtopics") or []]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("Los subtemas de los competidores ya están cubiertos.")
+
+    weak = gap.get("weak_terms") or []
+    if weak:
+        st.write("**Términos poco desarrollados:** " + ", ".join(t["term"] for t in weak))
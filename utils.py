@@ -2,13 +2,22 @@
 import re
 import time
 import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import urlparse, urlunparse
 
 import requests
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
+import http_cache
+import ratelimit
+from timing import TimingHTTPAdapter
+from head_extract import extract_head
+from html_backend import make_soup
+from parse import visible_text
+from token_index import TokenIndex
+
 DEFAULT_HEADERS = {
     "User-Agent": "OpunSEO-Lite/1.0 (+https://opunnence.com) Python-Requests",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -19,6 +28,29 @@ DEFAULT_HEADERS = {
 
 REQUEST_TIMEOUT = 20  # seconds
 MAX_CONTENT = 3_500_000  # 3.5 MB max to parse
+MAX_DOWNLOAD = MAX_CONTENT  # tope de bytes leídos por respuesta (streaming)
+STREAM_CHUNK = 64 * 1024
+
+# Fallbacks escalonados (happy eyeballs): si un intento no responde en
+# FETCH_HEDGE_DELAY s arranca el siguiente en paralelo. Gana el primero en
+# orden: la respuesta de un fallback posterior solo se acepta si los anteriores
+# fallan o no responden en FETCH_PREFER_GRACE s (una web HTTPS algo lenta no
+# acaba auditada por http:// o sin TLS)
+FETCH_HEDGE_DELAY = 5    # seconds
+FETCH_PREFER_GRACE = 10  # seconds
+FETCH_DEADLINE = 45      # seconds, tope total de fetch_url con todos sus intentos
+
+# try_fetch: sondeo de recursos (robots/sitemap) sin descargar el cuerpo
+PROBE_TTL = 600          # seconds que se reutiliza el resultado de una URL sondeada
+PROBE_RANGE_BYTES = 1024 # GET con Range si el servidor rechaza HEAD
+_HEAD_REJECTED = {400, 403, 405, 501}
+
+# Content-Types que no se auditan como página: se corta la descarga al ver las cabeceras
+_NON_HTML_PREFIXES = (
+    "image/", "video/", "audio/", "font/",
+    "application/pdf", "application/zip", "application/gzip", "application/octet-stream",
+    "application/vnd.", "application/msword",
+)
 
 
 def normalize_url(url: str) -> str:
@@ -56,7 +88,7 @@ def _build_session() -> requests.Session:
         raise_on_status=False,
         respect_retry_after_header=True,
     )
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=5, pool_maxsize=10)
+    adapter = TimingHTTPAdapter(max_retries=retries, pool_connections=5, pool_maxsize=10)
     s.mount("https://", adapter)
     s.mount("http://", adapter)
     s.headers.update(DEFAULT_HEADERS)
@@ -69,52 +101,251 @@ def _swap_scheme(url: str, to_scheme: str) -> str:
     return urlunparse((to_scheme, p.netloc, p.path or "/", p.params, p.query, p.fragment))
 
 
-def _fetch_url_core(url: str):
+def is_non_html_type(ctype: str) -> bool:
+    ctype = (ctype or "").lower().strip()
+    return any(ctype.startswith(p) for p in _NON_HTML_PREFIXES)
+
+
+class FetchCancelled(Exception):
+    """Intento descartado porque otro fallback ya ganó (o venció el deadline)."""
+
+
+def _read_capped(resp: requests.Response, max_bytes: int, cancel: threading.Event = None) -> None:
+    """
+    Lee el cuerpo en streaming hasta `max_bytes` (ya descomprimido) y deja el
+    resultado en resp.content. Si el Content-Type no es HTML no descarga nada.
+    Marca resp.truncated (se cortó en el tope) y resp.body_skipped (no HTML).
+    Si `cancel` se activa a mitad de lectura, cierra y lanza FetchCancelled.
+    """
+    resp.truncated = False
+    resp.body_skipped = False
+    buf = bytearray()
+    try:
+        if is_non_html_type(resp.headers.get("Content-Type")):
+            resp.body_skipped = True
+        else:
+            for chunk in resp.iter_content(STREAM_CHUNK):
+                if cancel is not None and cancel.is_set():
+                    raise FetchCancelled()
+                buf += chunk
+                if len(buf) >= max_bytes:
+                    resp.truncated = len(buf) > max_bytes or bool(next(resp.iter_content(1), b""))
+                    break
+    finally:
+        resp.close()
+    resp._content = bytes(buf[:max_bytes])
+    resp._content_consumed = True
+
+
+def _fetch_attempt(sess, cache, try_url: str, verify_flag: bool, max_bytes: int, cancel: threading.Event,
+                   live: list = None):
+    """
+    Un intento de descarga (una estrategia de fallback). Devuelve (response, history, ttfb_ms).
+    La respuesta en curso se anota en `live` para poder cerrarla desde fuera (deadline).
+    """
+    entry = cache.lookup(try_url) if cache else None
+    with ratelimit.limited(try_url, cancel=cancel) as report:
+        start = time.perf_counter()
+        resp = sess.get(
+            try_url,
+            allow_redirects=True,
+            timeout=REQUEST_TIMEOUT,
+            verify=verify_flag,
+            stream=True,
+            headers=http_cache.HttpCache.conditional_headers(entry),
+        )
+        report(status=resp.status_code, ttfb_ms=int(resp.elapsed.total_seconds() * 1000),
+               retry_after=resp.headers.get("Retry-After"))
+        if live is not None:
+            live.append(resp)
+        if cancel.is_set():
+            resp.close()
+            raise FetchCancelled()
+        t_body = time.perf_counter()
+        _read_capped(resp, max_bytes, cancel)  # fuerza lectura acotada (errores tardíos)
+        if getattr(resp, "timing", None) is not None:
+            resp.timing["download_ms"] = round((time.perf_counter() - t_body) * 1000, 1)
+    if cache:
+        resp = cache.finalize(try_url, entry, resp)
+    # Desglose DNS/TCP/TLS/TTFB/descarga por salto (redirects + respuesta final)
+    resp.timings = [getattr(h, "timing", None) for h in resp.history] + [getattr(resp, "timing", None)]
+    resp.timings = [t for t in resp.timings if t is not None]
+    ttfb_ms = int((resp.elapsed.total_seconds() or (time.perf_counter() - start)) * 1000)
+    history = [(h.status_code, h.url) for h in resp.history]
+    return resp, history, ttfb_ms
+
+
+def _fetch_url_core(url: str, max_bytes: int = MAX_DOWNLOAD, deadline: float = FETCH_DEADLINE,
+                    hedge_delay: float = FETCH_HEDGE_DELAY, grace: float = FETCH_PREFER_GRACE):
     """
     Core con fallbacks:
       1) https verify=True
       2) http  verify=True
       3) https verify=False  (último recurso)
+    Cada fallback arranca cuando el anterior falla o lleva `hedge_delay` s sin
+    responder (None = estrictamente secuencial), y corre en paralelo con él.
+    Se queda la respuesta del primer intento en orden que funciona; la de uno
+    posterior se retiene hasta `grace` s por si el anterior aún responde. Al
+    terminar se cancelan los demás y se cierran sus respuestas. `deadline`
+    acota el tiempo total. El cuerpo se lee en streaming hasta `max_bytes`
+    (ver _read_capped).
     Devuelve: (response, history, ttfb_ms)
     Lanza RuntimeError si todo falla.
     """
     base = normalize_url(url)
     sess = _build_session()
+    cache = http_cache.get_cache()
 
-    attempts = [
+    attempts = []
+    for a in [
         (base, True),                         # HTTPS normal
         (_swap_scheme(base, "http"), True),   # HTTP (por TLS roto)
         (base, False),                        # HTTPS sin verificación (último recurso)
-    ]
-
+    ]:
+        if a not in attempts:
+            attempts.append(a)
+
+    cancel = threading.Event()
+    live: list = []  # respuestas abiertas de los intentos (para cortar a los perdedores)
+    pool = ThreadPoolExecutor(max_workers=len(attempts), thread_name_prefix="fetch")
+    futs = []        # en orden de prioridad
     last_exc = None
-    for try_url, verify_flag in attempts:
-        try:
-            start = time.perf_counter()
-            resp = sess.get(
-                try_url,
-                allow_redirects=True,
-                timeout=REQUEST_TIMEOUT,
-                verify=verify_flag,
-                stream=False,
-            )
-            _ = resp.content  # fuerza lectura (errores tardíos)
-            ttfb_ms = int((resp.elapsed.total_seconds() or (time.perf_counter() - start)) * 1000)
-            history = [(h.status_code, h.url) for h in resp.history]
-            return resp, history, ttfb_ms
-        except requests.RequestException as e:
-            last_exc = e
-            continue
-        except Exception as e:
-            last_exc = e
-            continue
+    end = time.monotonic() + deadline
+    next_start = time.monotonic()
+    held_since = None  # un fallback posterior ya respondió; esperamos a los anteriores
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                last_exc = TimeoutError(f"deadline de {deadline}s agotado")
+                break
+            pending = [f for f in futs if not f.done()]
+            if len(futs) < len(attempts) and (not pending or now >= next_start):
+                try_url, verify_flag = attempts[len(futs)]
+                futs.append(pool.submit(_fetch_attempt, sess, cache, try_url, verify_flag, max_bytes, cancel, live))
+                next_start = now + hedge_delay if hedge_delay is not None else float("inf")
+                continue
+            # el primer intento (en orden) que no ha fallado decide
+            first_pending = False
+            for f in futs:
+                if not f.done():
+                    first_pending = True
+                    break
+                if f.exception() is None:
+                    return f.result()
+                last_exc = f.exception()
+            if not first_pending:
+                if len(futs) == len(attempts):
+                    break  # todos fallaron
+                continue   # los lanzados fallaron: arranca ya el siguiente
+            later = next((f for f in futs if f.done() and f.exception() is None), None)
+            if later is not None:
+                held_since = held_since or now
+                if now - held_since >= grace:
+                    return later.result()
+            timeouts = [end - now]
+            if len(futs) < len(attempts):
+                timeouts.append(next_start - now)
+            if held_since is not None:
+                timeouts.append(held_since + grace - now)
+            wait(pending, timeout=max(0.0, min(timeouts)), return_when=FIRST_COMPLETED)
+    finally:
+        cancel.set()
+        for resp in live:  # perdedores que siguen leyendo: corta la conexión (el ganador ya está leído)
+            resp.close()
+        pool.shutdown(wait=False, cancel_futures=True)
 
     raise RuntimeError(f"Error al solicitar la URL (con fallbacks): {last_exc!r}")
 
 
-def fetch_url(url: str):
+def fetch_url(url: str, max_bytes: int = MAX_DOWNLOAD):
     """Descarga la URL con redirects y devuelve (response, history, ttfb_ms)."""
-    return _fetch_url_core(url)
+    return _fetch_url_core(url, max_bytes=max_bytes)
+
+
+class PageSnapshot:
+    """
+    Una única descarga de la página compartida por todas las auditorías:
+    respuesta, historial de redirects, TTFB y un árbol HTML parseado una sola vez.
+    Si la descarga falló, `resp` es None y `error` guarda el mensaje.
+    """
+    def __init__(self, url: str, resp=None, history=None, ttfb_ms=None, error=None):
+        self.url = url
+        self.resp = resp
+        self.history = history or []
+        self.ttfb_ms = ttfb_ms
+        self.error = error
+        self._soup = None
+        self._soup_parsed = False
+        self._head = None
+        self._text = None
+        self._token_index = None
+
+    @property
+    def ok(self) -> bool:
+        return self.resp is not None and self.error is None
+
+    @property
+    def truncated(self) -> bool:
+        """True si el cuerpo se cortó en MAX_DOWNLOAD (la página es más grande)."""
+        return bool(getattr(self.resp, "truncated", False))
+
+    @property
+    def timings(self) -> list:
+        """Desglose de tiempos por salto (ver timing.py); [] si no hay datos."""
+        return list(getattr(self.resp, "timings", None) or [])
+
+    @property
+    def soup(self):
+        """BeautifulSoup perezoso (None si no es HTML); se construye una sola vez."""
+        if not self._soup_parsed:
+            self._soup = get_html_soup(self.resp) if self.resp is not None else None
+            self._soup_parsed = True
+        return self._soup
+
+    @property
+    def head(self) -> dict:
+        """Metadatos del <head> con el extractor rápido (head_extract), sin construir el árbol."""
+        if self._head is None:
+            if self.resp is None:
+                return extract_head(b"")
+            m = re.search(r"charset=([\w\-]+)", header_value(self.resp.headers, "content-type"), re.I)
+            self._head = extract_head(self.resp.content or b"", encoding=m.group(1) if m else None)
+        return self._head
+
+    @property
+    def text(self) -> str:
+        """Texto visible del body (sin script/style/noscript); "" si no es HTML."""
+        if self._text is None:
+            self._text = visible_text(self.soup) if self.soup is not None else ""
+        return self._text
+
+    @property
+    def token_index(self) -> TokenIndex:
+        """Índice de 1–3-gramas del texto visible (token_index.py), construido una sola vez."""
+        if self._token_index is None:
+            self._token_index = TokenIndex.from_text(self.text)
+        return self._token_index
+
+
+def fetch_snapshot(url: str, max_bytes: int = MAX_DOWNLOAD) -> PageSnapshot:
+    """Descarga la URL una vez y devuelve un PageSnapshot (nunca lanza: el error queda en .error)."""
+    try:
+        resp, history, ttfb_ms = fetch_url(url, max_bytes=max_bytes)
+    except Exception as e:
+        return PageSnapshot(url, error=f"{e}")
+    return PageSnapshot(url, resp=resp, history=history, ttfb_ms=ttfb_ms)
+
+
+def ensure_snapshot(url: str, snapshot: PageSnapshot = None, max_bytes: int = MAX_DOWNLOAD) -> PageSnapshot:
+    """
+    Reutiliza el snapshot recibido o descarga uno nuevo (con `max_bytes` como tope,
+    p. ej. HEAD_MAX_BYTES si solo hace falta el <head>). Lanza RuntimeError si la descarga falló.
+    """
+    snap = snapshot if snapshot is not None else fetch_snapshot(url, max_bytes=max_bytes)
+    if not snap.ok:
+        raise RuntimeError(snap.error or f"Sin respuesta para {url}")
+    return snap
 # ====== FIN red ======
 
 
@@ -122,6 +353,7 @@ def get_html_soup(resp: requests.Response):
     """
     Devuelve BeautifulSoup si el contenido es HTML o 'parece' HTML.
     Algunos servidores no mandan Content-Type correcto.
+    El parser sale de config.HTML_PARSER_BACKEND (ver html_backend.py).
     """
     ctype = (resp.headers.get("Content-Type") or "").lower()
     content = resp.content[:MAX_CONTENT]
@@ -129,7 +361,7 @@ def get_html_soup(resp: requests.Response):
     if ("html" not in ctype) and not looks_html:
         return None
     try:
-        return BeautifulSoup(content, "html.parser")
+        return make_soup(content)
     except Exception:
         return None
 
@@ -150,14 +382,64 @@ def get_domain_root(url: str) -> str:
     return f"{p.scheme}://{p.netloc}"
 
 
+_probe_cache: dict = {}   # url → (momento, (ok, url final, status))
+_probe_locks: dict = {}
+_probe_lock = threading.Lock()
+
+
+def _purge_expired(cache: dict, locks: dict, ttl: float, now: float) -> None:
+    """
+    Quita de `cache` las entradas caducadas y de `locks` los de claves sin
+    entrada vigente que nadie tiene tomados (se llama con el lock global).
+    """
+    for key in [k for k, (t, _) in cache.items() if now - t >= ttl]:
+        del cache[key]
+    for key in [k for k, lk in locks.items() if k not in cache and not lk.locked()]:
+        del locks[key]
+
+
+def _probe(sess, path_url: str):
+    with ratelimit.limited(path_url) as report:
+        r = sess.head(path_url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        report(status=r.status_code, ttfb_ms=int(r.elapsed.total_seconds() * 1000))
+    if r.status_code not in _HEAD_REJECTED:
+        return r.url, r.status_code
+    # HEAD rechazado: GET de los primeros bytes, sin leer el resto del cuerpo
+    with ratelimit.limited(path_url) as report:
+        r = sess.get(path_url, timeout=REQUEST_TIMEOUT, allow_redirects=True, stream=True,
+                     headers={"Range": f"bytes=0-{PROBE_RANGE_BYTES - 1}"})
+        report(status=r.status_code, ttfb_ms=int(r.elapsed.total_seconds() * 1000))
+    r.close()
+    return r.url, 200 if r.status_code == 206 else r.status_code
+
+
 def try_fetch(path_url: str):
-    """GET simple para recursos robots/sitemap, devolviendo (ok, url, status)."""
-    try:
-        s = _build_session()
-        r = s.get(path_url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        return True, r.url, r.status_code
-    except requests.RequestException:
-        return False, path_url, None
+    """
+    Sondeo de recursos robots/sitemap, devolviendo (ok, url, status): HEAD y,
+    si el servidor lo rechaza, GET con Range de PROBE_RANGE_BYTES. El resultado
+    se reutiliza PROBE_TTL s, así que auditar N páginas de un dominio cuesta un
+    sondeo. ok = respuesta < 400.
+    """
+    now = time.monotonic()
+    cached = _probe_cache.get(path_url)
+    if cached and now - cached[0] < PROBE_TTL:
+        return cached[1]
+    with _probe_lock:
+        lock = _probe_locks.setdefault(path_url, threading.Lock())
+    with lock:
+        cached = _probe_cache.get(path_url)
+        if cached and time.monotonic() - cached[0] < PROBE_TTL:
+            return cached[1]  # otro hilo sondeó mientras esperábamos
+        try:
+            final_url, status = _probe(_build_session(), path_url)
+            result = (status < 400, final_url, status)
+        except requests.RequestException:
+            result = (False, path_url, None)
+        with _probe_lock:
+            now = time.monotonic()
+            _purge_expired(_probe_cache, _probe_locks, PROBE_TTL, now)
+            _probe_cache[path_url] = (now, result)
+        return result
 
 
 def parse_meta_tags(soup: BeautifulSoup):
@@ -234,10 +516,16 @@ def extract_links_and_images(soup: BeautifulSoup, base_url: str):
 
 
 def guess_sitemap_and_robots(url: str, soup: BeautifulSoup):
+    from robots import get_robots  # robots usa la sesión de este módulo
+
     root = get_domain_root(url)
     robots_url = f"{root}/robots.txt"
     sitemap_url = f"{root}/sitemap.xml"
 
+    # robots.txt (caché por host): reglas para la URL auditada y líneas Sitemap:
+    robots = get_robots().get(url)
+    verdict = robots.check(url)
+
     # intentos de detección html (<link rel="sitemap" ...>)
     html_sitemap = ""
     if soup:
@@ -245,18 +533,24 @@ def guess_sitemap_and_robots(url: str, soup: BeautifulSoup):
         if link_smap and link_smap.get("href"):
             html_sitemap = absolutize(root + "/", link_smap["href"])
 
-    robots_ok, robots_final, robots_status = try_fetch(robots_url)
-    sitemap_ok, sitemap_final, sitemap_status = try_fetch(html_sitemap or sitemap_url)
+    declared_sitemap = (robots.sitemaps[0] if robots.sitemaps else "") or html_sitemap or sitemap_url
+    sitemap_ok, sitemap_final, sitemap_status = try_fetch(declared_sitemap)
 
     return {
         "robots_txt": {
             "declared": robots_url,
-            "ok": robots_ok,
-            "final_url": robots_final,
-            "status": robots_status,
+            "ok": robots.ok,
+            "final_url": robots.final_url,
+            "status": robots.status,
+            "error": robots.error,
+            "allowed": verdict["allowed"],
+            "rule": verdict["rule"],
+            "line": verdict["line"],
+            "crawl_delay": robots.rules_for().crawl_delay,
+            "sitemaps": list(robots.sitemaps),
         },
         "sitemap": {
-            "declared": html_sitemap or sitemap_url,
+            "declared": declared_sitemap,
             "ok": sitemap_ok,
             "final_url": sitemap_final,
             "status": sitemap_status,